@@ -0,0 +1,355 @@
+import random
+
+from engine import (
+    MAX_LOAN_AMOUNT, LOAN_INTEREST_RATE, BRIBE_AMOUNT, POLICE_OPTIONS, action_succeeded
+)
+from metrics import metrics
+from repair import RepairError, repair_action
+
+
+class Agent:
+    """A player that decides every turn of a GameEngine game.
+
+    ``choose_action(engine, last_event)`` returns an action dict matching
+    ``action_schema`` (or ``{}`` to skip the turn) and
+    ``choose_police(engine, options)`` returns one of ``POLICE_OPTIONS``.
+    The methods match the decision callables taken by ``GameEngine.step``, so
+    ``engine.run(agent.choose_action, agent.choose_police)`` plays a game.
+    Agents are pickled to batch workers and must not hold unpicklable state.
+    """
+
+    name = "agent"
+
+    def choose_action(self, engine, last_event):
+        raise NotImplementedError
+
+    def choose_police(self, engine, options):
+        raise NotImplementedError
+
+
+def decision_rng(engine, salt=""):
+    """A random stream for one decision, never the game's own ``engine.rng``.
+
+    It is derived from the game seed, the day and ``salt``, so a seeded game
+    makes the same decisions when it is replayed or resumed from a checkpoint.
+    """
+    return random.Random(f"{engine.seed}:{engine.state.day}:{salt}")
+
+
+class RandomAgent(Agent):
+    """Baseline: pick a random, usually legal, action."""
+
+    name = "random"
+
+    def choose_action(self, engine, last_event):
+        rng = decision_rng(engine, "action")
+        state = engine.state
+        action = rng.choice(["buy", "sell", "travel"])
+        if action == "buy":
+            drug = rng.choice(list(engine.prices))
+            affordable = state['cash'] // engine.prices[drug]
+            if affordable >= 1:
+                return {"action": "buy", "drug_type": drug, "amount": rng.randint(1, affordable)}
+        elif action == "sell":
+            held = [drug for drug, qty in state['inventory'].items() if qty > 0]
+            if held:
+                drug = rng.choice(held)
+                return {"action": "sell", "drug_type": drug, "amount": state['inventory'][drug]}
+        locations = engine.world.locations
+        return {"action": "travel", "location": rng.choice([loc for loc in locations if loc != state['location']])}
+
+    def choose_police(self, engine, options):
+        return decision_rng(engine, "police").choice(POLICE_OPTIONS)
+
+
+def police_costs(state, prices, fine, jail_day_cost):
+    """Expected dollar cost of each law enforcement option in the current state."""
+    held = [qty * prices[drug] for drug, qty in state['inventory'].items() if qty > 0]
+    return {
+        "pay_fine": min(fine, state['cash']),
+        # A random held drug is lost outright; with nothing held the fine applies instead
+        "lose_inventory": sum(held) / len(held) if held else min(fine, state['cash']),
+        "go_to_jail": 1.5 * jail_day_cost,
+        "bribe": BRIBE_AMOUNT if state['cash'] >= BRIBE_AMOUNT else jail_day_cost,
+    }
+
+
+def idle_action(state):
+    """Cheapest action that still lets the day (and prices) move on.
+
+    A skipped turn leaves prices frozen, so waiting is done by shuffling a
+    single dollar between cash and the bank. With no money at all a single
+    unit of stock is sold; otherwise a player holding only stock would wait
+    forever for prices that never move.
+    """
+    if state['cash'] >= 1:
+        return {"action": "bank", "sub_action": "deposit", "amount": 1}
+    if state['bank'] >= 1:
+        return {"action": "bank", "sub_action": "withdraw", "amount": 1}
+    for drug, qty in state['inventory'].items():
+        if qty > 0:
+            return {"action": "sell", "drug_type": drug, "amount": 1}
+    return {}
+
+
+def next_location(engine):
+    """Index of the borough after the current one, and the fare there."""
+    world, here = engine.world, engine.state.location_index
+    there = (here + 1) % len(world.locations)
+    return there, world.travel_costs[here][there]
+
+
+def parse_fine(options):
+    """Recover the fine amount from the engine's option text."""
+    return int(options["pay_fine"].rsplit("$", 1)[1])
+
+
+class GreedyAgent(Agent):
+    """Greedy arbitrage against each drug's base price.
+
+    Repays debt as soon as it can, sells a held drug once it trades ``margin``
+    above its base price, moves on when the expected police cost of staying
+    outweighs the fare, and buys as much as it can of the drug furthest below
+    its base price.
+    """
+
+    name = "greedy"
+
+    def __init__(self, margin=0.1, jail_day_cost=50):
+        self.margin = margin
+        self.jail_day_cost = jail_day_cost
+
+    def choose_action(self, engine, last_event):
+        state = engine.state
+        prices = engine.prices
+        world = engine.world
+        cash = state['cash']
+
+        total_due = state['debt'] + int(state['debt'] * LOAN_INTEREST_RATE)
+        if state['debt'] > 0 and cash >= total_due:
+            return {"action": "repay", "amount": total_due}
+
+        ratio = {drug: price / base for drug, price, base in zip(world.drugs, prices.values_, world.base_prices)}
+        held = [drug for drug, qty in state['inventory'].items() if qty > 0]
+        if held:
+            drug = max(held, key=ratio.get)
+            if ratio[drug] >= 1 + self.margin:
+                return {"action": "sell", "drug_type": drug, "amount": state['inventory'][drug]}
+
+        # Only move when the police risk of staying costs more than the fare
+        police_rate = world.police_rates[state.location_index] / 100
+        expected_police_cost = police_rate * min(police_costs(state, prices, 300, self.jail_day_cost).values())
+        there, fare = next_location(engine)
+        if (state['turns_in_location'] >= world.max_safe_turns and cash >= fare
+                and expected_police_cost * world.max_safe_turns > fare):
+            return {"action": "travel", "location": world.locations[there]}
+
+        drug = min(ratio, key=ratio.get)
+        if ratio[drug] <= 1 - self.margin and cash >= prices[drug]:
+            return {"action": "buy", "drug_type": drug, "amount": cash // prices[drug]}
+        return idle_action(state)
+
+    def choose_police(self, engine, options):
+        costs = police_costs(engine.state, engine.prices, parse_fine(options), self.jail_day_cost)
+        return min(costs, key=costs.get)
+
+
+class LookaheadAgent(Agent):
+    """Short-horizon Monte Carlo planner.
+
+    Each candidate action is applied to a fork of the game, which is then
+    played ``horizon`` more days by ``rollout_agent`` under freshly sampled
+    prices and police rolls. The candidate with the best mean total assets
+    wins. Forks never see the real game's random stream; their seeds come
+    from the game seed and day (and ``seed``, to vary the samples), so the
+    same game always plays out the same way.
+    """
+
+    name = "lookahead"
+
+    def __init__(self, horizon=3, rollouts=8, seed=None, rollout_agent=None):
+        self.horizon = horizon
+        self.rollouts = rollouts
+        self.seed = seed
+        self.rollout_agent = rollout_agent or GreedyAgent()
+
+    def candidates(self, engine):
+        state = engine.state
+        prices = engine.prices
+        actions = [idle_action(state)]
+        for drug, qty in state['inventory'].items():
+            if qty > 0:
+                actions.append({"action": "sell", "drug_type": drug, "amount": qty})
+            if state['cash'] >= prices[drug]:
+                actions.append({"action": "buy", "drug_type": drug, "amount": state['cash'] // prices[drug]})
+        there, fare = next_location(engine)
+        if state['cash'] >= fare:
+            actions.append({"action": "travel", "location": engine.world.locations[there]})
+        if state['debt'] > 0 and state['cash'] > 0:
+            actions.append({"action": "repay", "amount": state['cash']})
+        return actions
+
+    def evaluate(self, engine, action_data):
+        """Mean total assets ``horizon`` days after taking ``action_data`` now.
+
+        Every candidate of a day is rolled out under the same sampled futures.
+        """
+        agent = self.rollout_agent
+        rng = decision_rng(engine, f"lookahead:{self.seed}")
+        total = 0
+        for _ in range(self.rollouts):
+            future = engine.fork(rng.getrandbits(32))
+            # Today's event and police roll are already settled; only the action remains
+            future.end_turn({"day": future.state['day'], "event": None}, action_data)
+            for _ in range(self.horizon):
+                if future.is_over():
+                    break
+                future.step(agent.choose_action, agent.choose_police)
+            total += future.total_assets()
+        return total / self.rollouts
+
+    def choose_action(self, engine, last_event):
+        return max(self.candidates(engine), key=lambda action: self.evaluate(engine, action))
+
+    def choose_police(self, engine, options):
+        return self.rollout_agent.choose_police(engine, options)
+
+
+class RiskAgent(GreedyAgent):
+    """GreedyAgent whose police and loan choices come from a RiskEvaluator.
+
+    Police options are scored by simulation instead of fixed cost guesses. A
+    loan is taken when its simulated profit up to the due date (late
+    penalties included) is positive, it loses money less than
+    ``max_loss_chance`` of the time and its worst 5% loss is covered by
+    current assets; debt is repaid (selling stock to raise the cash) as soon
+    as waiting is expected to cost more.
+    """
+
+    name = "risk"
+
+    def __init__(self, margin=0.1, jail_day_cost=50, max_loss_chance=0.4, evaluator=None):
+        super().__init__(margin, jail_day_cost)
+        from risk import RiskEvaluator
+        self.evaluator = evaluator or RiskEvaluator(day_value=jail_day_cost)
+        self.max_loss_chance = max_loss_chance
+
+    def choose_action(self, engine, last_event):
+        state = engine.state
+        prices = engine.prices
+        repay = self.evaluator.repay(state, prices)
+        if repay is not None and repay['defer']['mean'] > repay['repay_now']:
+            held = [drug for drug, qty in state['inventory'].items() if qty > 0]
+            if state['cash'] < repay['repay_now'] and held:
+                # Raise the cash first; a partial repayment still leaves the penalty on the rest
+                drug = max(held, key=lambda d: state['inventory'][d] * prices[d])
+                return {"action": "sell", "drug_type": drug, "amount": state['inventory'][drug]}
+            if state['cash'] > 0:
+                return {"action": "repay", "amount": min(state['cash'], repay['repay_now'])}
+        if repay is None:
+            loan = self.evaluator.loan(state, prices, days_left=engine.max_days - state['day'])
+            # Never risk a tail loss the current assets could not cover
+            if (loan['mean'] > 0 and loan['p_loss'] < self.max_loss_chance
+                    and -loan['p5'] < engine.total_assets()):
+                return {"action": "loan", "amount": MAX_LOAN_AMOUNT}
+        return super().choose_action(engine, last_event)
+
+    def choose_police(self, engine, options):
+        return self.evaluator.choose_police(engine.state, engine.prices, parse_fine(options))
+
+
+class LLMAgent(Agent):
+    """The Ollama-backed player from drugwairs.py behind the Agent interface."""
+
+    name = "llm"
+
+    def choose_action(self, engine, last_event):
+        from drugwairs import get_user_action
+        return get_user_action(last_event=last_event, engine=engine)
+
+    def choose_police(self, engine, options):
+        from drugwairs import get_law_enforcement_decision
+        return get_law_enforcement_decision(options, engine)
+
+
+class PlanAgent(LLMAgent):
+    """LLM player that asks for a multi-day plan and follows it without calling the model.
+
+    A new plan is requested when the current one runs out, the previous step
+    failed or a remaining step no longer fits the state, the police show up,
+    a loan penalty is applied, or any price has moved more than
+    ``price_threshold`` (relative) since the plan was made. A day without a
+    usable plan is spent on ``idle_action`` and counted in
+    ``plan_fallbacks_total``. One agent may play many games in turn (a batch
+    chunk or a cluster shard); a plan never carries over into the next game.
+    """
+
+    name = "plan"
+
+    def __init__(self, price_threshold=0.3):
+        self.price_threshold = price_threshold
+        self.engine = None
+        self.forget()
+
+    def forget(self):
+        self.plan = []
+        self.plan_prices = {}
+        self.plan_due = None
+        self.step_day = None
+        self.interrupted = None
+
+    def follow(self, engine):
+        """Drop the plan made for another game before deciding in ``engine``."""
+        if engine is not self.engine:
+            self.engine = engine
+            self.forget()
+
+    def replan_reason(self, engine):
+        state = engine.state
+        if self.interrupted:
+            return self.interrupted
+        if not self.plan:
+            return "the previous plan is finished"
+        history = state['turn_history']
+        if history and history[-1]['day'] == self.step_day and not action_succeeded(history[-1]['result']):
+            return f"the last action failed ({history[-1]['result']})"
+        if self.plan_due is not None and state['loan_due_date'] not in (None, self.plan_due):
+            return "the loan deadline passed and a penalty was added"
+        for drug, price in engine.prices.items():
+            if abs(price - self.plan_prices[drug]) > self.price_threshold * self.plan_prices[drug]:
+                return f"{drug} moved from ${self.plan_prices[drug]} to ${price}"
+        return None
+
+    def choose_action(self, engine, last_event):
+        self.follow(engine)
+        state = engine.state
+        reason = self.replan_reason(engine)
+        if reason is None:
+            try:
+                action_data, _ = repair_action(self.plan.pop(0), state, engine.prices)
+                self.step_day = state['day']
+                metrics.inc("plan_steps_followed_total")
+                return action_data
+            except RepairError as e:
+                reason = f"the next planned step is not possible ({e})"
+
+        from drugwairs import get_plan
+        metrics.inc("replans_total")
+        self.plan = get_plan(last_event=last_event, engine=engine, reason=reason)
+        self.plan_prices = dict(engine.prices)
+        self.plan_due = state['loan_due_date']
+        self.interrupted = None
+        if not self.plan:
+            # No usable plan after every retry: wait out the day rather than skip it silently
+            metrics.inc("plan_fallbacks_total")
+            return idle_action(state)
+        self.step_day = state['day']
+        return self.plan.pop(0)
+
+    def choose_police(self, engine, options):
+        self.follow(engine)
+        self.interrupted = "there was a police encounter"
+        return super().choose_police(engine, options)
+
+
+AGENTS = {agent.name: agent for agent in (RandomAgent, GreedyAgent, LookaheadAgent, RiskAgent, LLMAgent, PlanAgent)}
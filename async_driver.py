@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import traceback
+
+from checkpoint import close_game, open_game
+from dashboard import Dashboard
+from engine import GameEngine, MAX_DAYS, load_world
+from decision_cache import DecisionCache
+from llm import JSONObjectScanner, KeywordScanner
+from metrics import metrics
+from pool import DEFAULT_ENDPOINT, ClientPool
+from prompts import MODEL, PromptBuilder, parse_action, parse_police_decision
+from recorder import TraceRecorder
+from results import ResultsSink
+
+
+class AsyncGameRunner:
+    """Plays many LLM-controlled games concurrently against one or more model servers.
+
+    Every game is its own task; ``concurrency`` caps how many completions are
+    in flight at once so the servers stay saturated without being flooded.
+    Requests are spread over ``base_urls`` by a ClientPool.
+    """
+
+    def __init__(self, base_urls=(DEFAULT_ENDPOINT,), api_key='ollama', model=MODEL,
+                 concurrency=8, max_retries=3, backoff=0.5, max_days=MAX_DAYS, token_budget=1536,
+                 cache=None, record_dir=None, checkpoint_dir=None, checkpoint_every=1, resume=False, results=None,
+                 world=None):
+        self.pool = ClientPool(base_urls, api_key, max_connections=concurrency)
+        self.model = model
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_days = max_days
+        self.world = world
+        self.prompt_builder = PromptBuilder(token_budget=token_budget, world=world)
+        self.cache = cache
+        self.record_dir = record_dir
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self.resume = resume
+        self.results = results
+        self.engines = {}
+        self.stats = {}
+        self.tasks = {}
+
+    async def complete(self, engine, kind, messages, **kwargs):
+        """Run one completion under the concurrency limit and record its stats for the game."""
+        estimate = self.prompt_builder.last_estimate
+        async with self.semaphore:
+            content, stats = await self.pool.acomplete(messages, estimate, model=self.model, **kwargs)
+        self.stats.setdefault(engine.seed, []).append(stats)
+        if engine.trace:
+            engine.trace.exchange(kind, messages, content, stats)
+        if engine.sink:
+            engine.sink.exchange(engine, stats)
+        return content
+
+    async def get_action(self, engine, last_event=None):
+        """Async counterpart of drugwairs.get_user_action."""
+        def parse(content):
+            return parse_action(content, engine.state, engine.prices)
+
+        cache_key = self.cache.action_key(engine.state, engine.prices) if self.cache else None
+        action_data = self.cached_decision(engine, "action", cache_key, parse)
+        if action_data:
+            return action_data
+
+        for attempt in range(self.max_retries):
+            if attempt:
+                metrics.inc("retries_total")
+            try:
+                with metrics.timer("prompt_build_seconds"):
+                    messages = self.prompt_builder.action_messages(engine.state, engine.prices, last_event, attempt)
+                content = await self.complete(engine, "action", messages, until=JSONObjectScanner(),
+                                              response_format={"type": "json_object"})
+            except Exception:
+                metrics.inc("llm_errors_total")
+                # Back off without blocking the other games
+                with metrics.timer("retry_sleep_seconds"):
+                    await asyncio.sleep(self.pool.backoff(attempt, self.backoff))
+                continue
+            try:
+                action_data = parse(content)
+            except ValueError:
+                metrics.inc("validation_failures_total")
+                continue
+            if cache_key:
+                self.cache.put(cache_key, json.dumps(action_data))
+            return action_data
+        metrics.inc("action_failures_total")
+        return {}
+
+    async def get_police_decision(self, engine, options):
+        """Async counterpart of drugwairs.get_law_enforcement_decision."""
+        def parse(content):
+            return parse_police_decision(content, options)
+
+        cache_key = self.cache.police_key(engine.state, engine.prices, options) if self.cache else None
+        decision = self.cached_decision(engine, "police", cache_key, parse)
+        if decision:
+            return decision
+        try:
+            with metrics.timer("prompt_build_seconds"):
+                messages = self.prompt_builder.police_messages(engine.state, options)
+            decision = parse(await self.complete(engine, "police", messages, until=KeywordScanner(options)))
+        except Exception:
+            metrics.inc("police_jail_defaults_total")
+            return "go_to_jail"
+        if cache_key:
+            self.cache.put(cache_key, decision)
+        return decision
+
+    def cached_decision(self, engine, kind, key, parse):
+        """Return a parsed cached decision, or None if absent or no longer valid."""
+        if key is None:
+            return None
+        hit = self.cache.get(key, parse=lambda cached: (cached, parse(cached)))
+        if hit is None:
+            metrics.inc("decision_cache_misses_total")
+            return None
+        cached, decision = hit
+        metrics.inc("decision_cache_hits_total")
+        if engine.trace:
+            engine.trace.exchange(kind, None, cached, cached=True)
+        return decision
+
+    async def play(self, engine):
+        """Play one game to completion and return its summary."""
+        while not engine.is_over():
+            turn = engine.open_turn()
+            if engine.police_roll():
+                fine, options = engine.police_options()
+                engine.police_encounter(turn, await self.get_police_decision(engine, options), fine)
+            action_data = None
+            if engine.state['jail_time'] == 0:
+                action_data = await self.get_action(engine, turn['last_event'])
+            engine.end_turn(turn, action_data)
+        summary = self.summarize(engine)
+        if self.checkpoint_dir:
+            close_game(self.checkpoint_dir, engine, summary)
+        if self.results:
+            self.results.record_game(summary, engine)
+        return summary
+
+    def summarize(self, engine):
+        """Game summary plus the mean prompt size and latency of its model calls."""
+        summary = engine.summary()
+        stats = self.stats.get(engine.seed, [])
+        # Early-stopped streams carry no usage, so fall back to the local estimate
+        prompt_tokens = [s['prompt_tokens'] if s['prompt_tokens'] is not None else s['estimated_prompt_tokens']
+                         for s in stats]
+        prompt_tokens = [tokens for tokens in prompt_tokens if tokens is not None]
+        ttfts = [s['ttft'] for s in stats if s['ttft'] is not None]
+        summary['llm_calls'] = len(stats)
+        summary['mean_prompt_tokens'] = sum(prompt_tokens) / len(prompt_tokens) if prompt_tokens else None
+        summary['mean_ttft'] = sum(ttfts) / len(ttfts) if ttfts else None
+        return summary
+
+    def cancel(self, game_id):
+        """Stop one game; its summary is reported with ``cancelled`` set."""
+        task = self.tasks.get(game_id)
+        if task and not task.done():
+            task.cancel()
+
+    async def run(self, seeds):
+        """Play one game per seed concurrently and return summaries in seed order.
+
+        A cancelled game's summary has ``cancelled`` set; a game that crashed
+        has its traceback printed to stderr and the exception in ``error``.
+        """
+        seeds = list(seeds)
+        recorders = []
+        finished = {}
+        for directory in (self.checkpoint_dir, self.record_dir):
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        for seed in seeds:
+            if self.checkpoint_dir:
+                engine, summary = open_game(self.checkpoint_dir, seed, self.max_days,
+                                            self.checkpoint_every, self.resume, self.world)
+                if summary is not None:
+                    finished[seed] = summary
+                    continue
+                self.engines[seed] = engine
+            else:
+                self.engines[seed] = GameEngine(seed=seed, max_days=self.max_days, world=self.world)
+            self.engines[seed].sink = self.results
+            if self.record_dir:
+                path = os.path.join(self.record_dir, f"game-{seed}.jsonl.gz")
+                recorders.append(TraceRecorder(path, self.engines[seed]))
+            self.tasks[seed] = asyncio.create_task(self.play(self.engines[seed]))
+        outcomes = await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        for recorder, seed in zip(recorders, self.tasks):
+            recorder.close(self.engines[seed])
+
+        outcomes = dict(zip(self.tasks, outcomes))
+        results = []
+        for seed in seeds:
+            if seed in finished:
+                results.append(finished[seed])
+                continue
+            outcome = outcomes[seed]
+            if isinstance(outcome, asyncio.CancelledError):
+                outcome = dict(self.summarize(self.engines[seed]), cancelled=True)
+            elif isinstance(outcome, BaseException):
+                print(f"Game {seed} crashed:", file=sys.stderr)
+                traceback.print_exception(outcome, file=sys.stderr)
+                outcome = dict(self.summarize(self.engines[seed]), error=f"{type(outcome).__name__}: {outcome}")
+            results.append(outcome)
+        await self.pool.aclose()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many LLM-controlled Drug Wars games at once.")
+    parser.add_argument("--games", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=MAX_DAYS)
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum in-flight model requests")
+    parser.add_argument("--base-url", action="append", help="Model server endpoint; repeat to spread load over several")
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--cache", metavar="PATH", help="Reuse model decisions for similar states, stored in this SQLite file")
+    parser.add_argument("--record-dir", help="Write a replayable trace per game into this directory")
+    parser.add_argument("--metrics", metavar="PATH", help="Export timings and counters at exit (.json, else Prometheus text)")
+    parser.add_argument("--checkpoint-dir", help="Checkpoint every game into this directory")
+    parser.add_argument("--checkpoint-every", type=int, default=1, help="Turns between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="Continue the games saved in --checkpoint-dir")
+    parser.add_argument("--results", metavar="PATH", help="Append per-turn and per-game records to this SQLite results file")
+    parser.add_argument("--world", metavar="PATH", help="Play in the drugs and map of this JSON world config")
+    parser.add_argument("--dashboard", action="store_true",
+                        help="Watch throughput, a leaderboard and model latency live while the games run")
+    parser.add_argument("--fps", type=float, default=4, help="Dashboard redraws per second")
+    args = parser.parse_args()
+    if args.resume and not args.checkpoint_dir:
+        parser.error("--resume needs --checkpoint-dir")
+    if args.resume and args.record_dir:
+        parser.error("traces replay from the first day, so --record-dir cannot be combined with --resume")
+
+    cache = DecisionCache(args.cache) if args.cache else None
+    sink = ResultsSink(args.results, agent="llm") if args.results else None
+    runner = AsyncGameRunner(base_urls=args.base_url or [DEFAULT_ENDPOINT], model=args.model,
+                             concurrency=args.concurrency, max_days=args.days, cache=cache,
+                             record_dir=args.record_dir, checkpoint_dir=args.checkpoint_dir,
+                             checkpoint_every=args.checkpoint_every, resume=args.resume, results=sink,
+                             world=load_world(args.world) if args.world else None)
+    try:
+        with Dashboard(runner.engines, args.fps, quiet=not args.dashboard):
+            results = asyncio.run(runner.run(range(args.seed, args.seed + args.games)))
+    finally:
+        if sink:
+            sink.close()
+        if cache:
+            cache.close()
+    for result in results:
+        print(json.dumps(result))
+    if cache:
+        print(json.dumps(cache.stats()))
+    if args.metrics:
+        metrics.write(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
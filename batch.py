@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from agents import AGENTS, RandomAgent
+from checkpoint import close_game, game_paths, open_game
+from engine import GameEngine, MAX_DAYS, load_world
+from results import ResultsSink, TurnCollector
+
+
+def run_game(seed, agent=None, max_days=MAX_DAYS, checkpoint_dir=None, checkpoint_every=1, resume=False,
+             collector=None, world=None):
+    """Play one headless game to completion and return its summary.
+
+    With ``checkpoint_dir`` the game is checkpointed every ``checkpoint_every``
+    turns and its summary kept there once finished; ``resume`` picks up from
+    those files instead of starting over. A ``collector`` (results.TurnCollector)
+    gets a row for every turn played. ``world`` defaults to the classic one.
+    """
+    agent = agent or RandomAgent()
+    if checkpoint_dir:
+        engine, summary = open_game(checkpoint_dir, seed, max_days, checkpoint_every, resume, world)
+        if summary is not None:
+            return summary
+    else:
+        engine = GameEngine(seed=seed, max_days=max_days, world=world)
+    engine.sink = collector
+    summary = engine.run(agent.choose_action, agent.choose_police)
+    summary['agent'] = agent.name
+    if collector:
+        collector.finish_game(engine)
+    if checkpoint_dir:
+        close_game(checkpoint_dir, engine, summary)
+    return summary
+
+
+def _run_chunk(args):
+    seeds, agent, max_days, checkpoint, run_id, world = args
+    # Turn rows travel back with the summaries; only the parent writes the results file
+    collector = TurnCollector(agent.name, run_id) if run_id else None
+    summaries = [run_game(seed, agent, max_days, collector=collector, world=world, **checkpoint) for seed in seeds]
+    return summaries, collector.rows if collector else []
+
+
+def run_batch(seeds, agent=None, max_days=MAX_DAYS, workers=None, chunk_size=64,
+              checkpoint_dir=None, checkpoint_every=1, resume=False, results=None, world=None):
+    """Run one game per seed across a process pool and return summaries in seed order.
+
+    The agent and world are pickled to the workers, so the agent must be a
+    picklable Agent; a world travels as its config and is compiled once per chunk.
+    See ``run_game`` for the checkpoint options. Per-turn and per-game
+    records are streamed to ``results`` (a results.ResultsSink) as each
+    chunk finishes. Games a resumed batch had already finished are not
+    played or recorded again.
+    """
+    agent = agent or RandomAgent()
+    seeds = list(seeds)
+    checkpoint = {"checkpoint_dir": checkpoint_dir, "checkpoint_every": checkpoint_every, "resume": resume}
+    summaries = {}
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        for seed in seeds if resume else ():
+            done = game_paths(checkpoint_dir, seed)[1]
+            if os.path.exists(done):
+                with open(done) as f:
+                    summaries[seed] = json.load(f)
+    pending = [seed for seed in seeds if seed not in summaries]
+    run_id = results.run_id if results else None
+    chunks = [(pending[i:i + chunk_size], agent, max_days, checkpoint, run_id, world)
+              for i in range(0, len(pending), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk, rows in pool.map(_run_chunk, chunks):
+            if results:
+                results.add_turns(rows)
+            for summary in chunk:
+                summaries[summary['seed']] = summary
+                if results:
+                    results.record_game(summary)
+    return [summaries[seed] for seed in seeds]
+
+
+def summarize(results):
+    """Aggregate per-game summaries into a few headline numbers."""
+    assets = sorted(r['total_assets'] for r in results)
+    n = len(assets)
+    if not n:
+        return {"games": 0}
+    return {
+        "games": n,
+        "mean_assets": sum(assets) / n,
+        "median_assets": assets[n // 2],
+        "min_assets": assets[0],
+        "max_assets": assets[-1],
+        "mean_days": sum(r['days_survived'] for r in results) / n,
+        "in_debt": sum(1 for r in results if r['debt'] > 0)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many headless Drug Wars games in parallel.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="First seed; games use seed..seed+games-1")
+    parser.add_argument("--days", type=int, default=MAX_DAYS)
+    parser.add_argument("--agent", choices=sorted(AGENTS), default="greedy")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", help="Write per-game summaries as JSON lines to this file")
+    parser.add_argument("--checkpoint-dir", help="Checkpoint every game into this directory")
+    parser.add_argument("--checkpoint-every", type=int, default=1, help="Turns between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="Continue the batch saved in --checkpoint-dir")
+    parser.add_argument("--results", metavar="PATH", help="Append per-turn and per-game records to this SQLite results file")
+    parser.add_argument("--world", metavar="PATH", help="Play in the drugs and map of this JSON world config")
+    args = parser.parse_args()
+    if args.resume and not args.checkpoint_dir:
+        parser.error("--resume needs --checkpoint-dir")
+    if args.world and args.agent == "risk":
+        parser.error("the risk simulator only models the classic world, so --agent risk cannot use --world")
+
+    world = load_world(args.world) if args.world else None
+    sink = ResultsSink(args.results, agent=args.agent) if args.results else None
+    try:
+        results = run_batch(range(args.seed, args.seed + args.games), agent=AGENTS[args.agent](),
+                            max_days=args.days, workers=args.workers, checkpoint_dir=args.checkpoint_dir,
+                            checkpoint_every=args.checkpoint_every, resume=args.resume, results=sink,
+                            world=world)
+    finally:
+        if sink:
+            sink.close()
+    if args.out:
+        with open(args.out, "w") as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+    print(json.dumps(summarize(results), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from agents import GreedyAgent
+from engine import DEFAULT_WORLD, GameEngine
+from metrics import metrics
+from prompts import PromptBuilder, parse_action
+from repair import validators
+from stub_server import ACTIONS, MALFORMED, StubModelServer
+
+BENCH_VERSION = 1
+
+# Sizes for a quick check before a commit and for a steadier full run
+PROFILES = {
+    "quick": {"engine_games": 20, "prompt_states": 200, "prompt_repeats": 5, "validation_rounds": 500,
+              "e2e_concurrency": [1, 4, 16], "e2e_days": 30, "import_repeats": 3},
+    "full": {"engine_games": 200, "prompt_states": 1000, "prompt_repeats": 20, "validation_rounds": 5000,
+             "e2e_concurrency": [1, 4, 16, 64], "e2e_days": 100, "import_repeats": 10},
+}
+
+# Modules a batch worker or library user imports, and what they must not pull in
+# at import time; each must import within IMPORT_BUDGET seconds
+IMPORT_MODULES = ("engine", "agents", "batch", "drugwairs")
+HEAVY_MODULES = ("httpx", "jsonschema", "numpy", "openai", "rich")
+IMPORT_BUDGET = 0.15
+
+# Whether a bigger value is better, for each metric compared against the baseline
+HIGHER_IS_BETTER = {
+    "turns_per_second": True,
+    "builds_per_second": True,
+    "validations_per_second": True,
+    "parses_per_second": True,
+    "mean_seconds": False,
+    "p50_seconds": False,
+    "p99_seconds": False,
+    "turn_p50_seconds": False,
+    "turn_p99_seconds": False,
+    "import_seconds": False,
+}
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def bench_import(modules, repeats):
+    """Import time of each module in a fresh interpreter, and the heavy dependencies it loads."""
+    code = ("import json, sys, time; start = time.perf_counter(); import {module}; seconds = time.perf_counter() - start; "
+            "print(json.dumps([seconds, [name for name in {heavy!r} if name in sys.modules]]))")
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module in modules:
+        timings = []
+        for _ in range(repeats):
+            out = subprocess.run([sys.executable, "-c", code.format(module=module, heavy=HEAVY_MODULES)],
+                                 cwd=here, capture_output=True, text=True, check=True).stdout
+            seconds, heavy = json.loads(out)
+            timings.append(seconds)
+        results[module] = {"import_seconds": min(timings), "heavy_imports": heavy}
+    return results
+
+
+def check_imports(imports, budget):
+    """Problems with the import benchmark: modules over ``budget`` seconds or loading heavy dependencies."""
+    problems = []
+    for module, result in imports.items():
+        if result["import_seconds"] > budget:
+            problems.append(f"import {module} took {result['import_seconds']:.3f}s, over the {budget}s budget")
+        if result["heavy_imports"]:
+            problems.append(f"import {module} loads {', '.join(result['heavy_imports'])}")
+    return problems
+
+
+def bench_engine(games):
+    """Headless turns per second with the scripted greedy agent."""
+    agent = GreedyAgent()
+    turns = 0
+    start = time.perf_counter()
+    for seed in range(games):
+        engine = GameEngine(seed=seed)
+        while not engine.is_over():
+            engine.step(agent.choose_action, agent.choose_police)
+            turns += 1
+    seconds = time.perf_counter() - start
+    return {"games": games, "turns": turns, "seconds": seconds, "turns_per_second": turns / seconds}
+
+
+def sample_states(count):
+    """Forks of greedy games at ``count`` different points, for realistic prompts and parses."""
+    agent = GreedyAgent()
+    engine = GameEngine(seed=0)
+    states = []
+    while len(states) < count:
+        if engine.is_over():
+            engine = GameEngine(seed=len(states))
+        turn = engine.step(agent.choose_action, agent.choose_police)
+        states.append((engine.fork(0), turn['event']))
+    return states
+
+
+def bench_prompts(states, repeats):
+    """Time and size of the action prompt built for every model call in get_user_action."""
+    builder = PromptBuilder()
+    timings, chars, tokens = [], [], []
+    for _ in range(repeats):
+        for engine, event in states:
+            start = time.perf_counter()
+            messages = builder.action_messages(engine.state, engine.prices, event)
+            timings.append(time.perf_counter() - start)
+            chars.append(sum(len(message['content']) for message in messages))
+            tokens.append(builder.last_estimate)
+    return {"builds": len(timings), "mean_seconds": sum(timings) / len(timings),
+            "p50_seconds": percentile(timings, 0.5), "p99_seconds": percentile(timings, 0.99),
+            "builds_per_second": len(timings) / sum(timings),
+            "mean_chars": sum(chars) / len(chars), "max_chars": max(chars),
+            "mean_estimated_tokens": sum(tokens) / len(tokens), "max_estimated_tokens": max(tokens)}
+
+
+def bench_validation(states, rounds):
+    """Throughput of bare schema checks and of the full decode-repair-validate parse."""
+    documents = ACTIONS + [{"action": "fly"}, {"action": "buy", "drug_type": "weed", "amount": 0}]
+    validator = validators(DEFAULT_WORLD)[0]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for document in documents:
+            validator.is_valid(document)
+    validate_seconds = time.perf_counter() - start
+    validations = rounds * len(documents)
+
+    answers = [json.dumps(action) for action in ACTIONS] + MALFORMED
+    parses = 0
+    start = time.perf_counter()
+    for i in range(rounds):
+        engine, _ = states[i % len(states)]
+        for answer in answers:
+            try:
+                parse_action(answer, engine.state, engine.prices)
+            except ValueError:
+                pass
+            parses += 1
+    parse_seconds = time.perf_counter() - start
+    return {"validations": validations, "validations_per_second": validations / validate_seconds,
+            "parses": parses, "parses_per_second": parses / parse_seconds}
+
+
+class TurnTimer:
+    """Engine sink recording the wall time of every turn, per game."""
+
+    def __init__(self):
+        self.last = {}
+        self.durations = []
+
+    def start(self, engine):
+        self.last[engine.seed] = time.perf_counter()
+
+    def exchange(self, engine, stats):
+        pass
+
+    def record_turn(self, engine, turn):
+        now = time.perf_counter()
+        self.durations.append(now - self.last[engine.seed])
+        self.last[engine.seed] = now
+
+
+def bench_e2e(base_url, concurrency, games, days):
+    """LLM-path turns per second and turn latency through the async driver."""
+    from async_driver import AsyncGameRunner
+
+    metrics.reset()
+    runner = AsyncGameRunner(base_urls=[base_url], concurrency=concurrency, max_days=days, backoff=0.0)
+    timer = TurnTimer()
+
+    async def run():
+        seeds = range(games)
+        for seed in seeds:
+            engine = runner.engines[seed] = GameEngine(seed=seed, max_days=days)
+            engine.sink = timer
+            timer.start(engine)
+            runner.tasks[seed] = asyncio.create_task(runner.play(engine))
+        await asyncio.gather(*runner.tasks.values())
+        await runner.pool.aclose()
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    seconds = time.perf_counter() - start
+    turns = len(timer.durations)
+    counters = metrics.counters
+    requests = metrics.histograms.get("llm_request_seconds")
+    return {"concurrency": concurrency, "games": games, "turns": turns, "seconds": seconds,
+            "turns_per_second": turns / seconds,
+            "turn_p50_seconds": percentile(timer.durations, 0.5),
+            "turn_p99_seconds": percentile(timer.durations, 0.99),
+            "llm_calls": requests.count if requests else 0,
+            "validation_failures": counters.get("validation_failures_total", 0),
+            "action_failures": counters.get("action_failures_total", 0)}
+
+
+def run_suite(profile, latency=0.02, malformed_rate=0.05, skip_e2e=False):
+    """Run every benchmark at the given size and return the results document."""
+    sizes = PROFILES[profile]
+    states = sample_states(sizes["prompt_states"])
+    results = {
+        "version": BENCH_VERSION,
+        "profile": profile,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "import": bench_import(IMPORT_MODULES, sizes["import_repeats"]),
+        "engine": bench_engine(sizes["engine_games"]),
+        "prompt": bench_prompts(states, sizes["prompt_repeats"]),
+        "validation": bench_validation(states, sizes["validation_rounds"]),
+    }
+    if not skip_e2e:
+        # One game per request slot, so turn latency is service time rather than queueing
+        with StubModelServer(latency=latency, malformed_rate=malformed_rate) as server:
+            results["e2e"] = {"stub": {"latency": latency, "malformed_rate": malformed_rate}}
+            for concurrency in sizes["e2e_concurrency"]:
+                results["e2e"][f"c{concurrency}"] = bench_e2e(server.base_url, concurrency, concurrency,
+                                                              sizes["e2e_days"])
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Metrics that got worse than the baseline by more than ``tolerance`` (a fraction).
+
+    Returns ``(regressions, report)``: each report line is
+    ``(name, baseline, current, relative change)``.
+    """
+    regressions, report = [], []
+
+    def walk(current, base, path):
+        for key, value in current.items():
+            if key not in base:
+                continue
+            name = f"{path}.{key}" if path else key
+            if isinstance(value, dict):
+                walk(value, base[key], name)
+            elif key in HIGHER_IS_BETTER and value is not None and base[key]:
+                change = (value - base[key]) / base[key]
+                report.append((name, base[key], value, change))
+                worse = -change if HIGHER_IS_BETTER[key] else change
+                if worse > tolerance:
+                    regressions.append(name)
+
+    walk(results, baseline, "")
+    return regressions, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the engine, prompts, validation and the LLM path offline.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--out", metavar="PATH", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against this earlier results file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline before failing, as a fraction")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to --baseline instead")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub model seconds per request")
+    parser.add_argument("--malformed-rate", type=float, default=0.05, help="Share of unusable stub answers")
+    parser.add_argument("--skip-e2e", action="store_true", help="Only run the in-process benchmarks")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET,
+                        help="Seconds each library module may take to import before failing")
+    args = parser.parse_args()
+    if args.update_baseline and not args.baseline:
+        parser.error("--update-baseline needs --baseline")
+
+    results = run_suite(args.profile, args.latency, args.malformed_rate, args.skip_e2e)
+    problems = check_imports(results["import"], args.import_budget)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline or not args.baseline:
+        print(json.dumps(results, indent=2))
+        report_imports(problems)
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("profile") != results["profile"]:
+        parser.error(f"baseline is a {baseline.get('profile')!r} run, not {results['profile']!r}")
+    regressions, report = compare(results, baseline, args.tolerance)
+    for name, base, current, change in report:
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:40} {base:>14.6g} -> {current:>14.6g}  {change:+7.1%}{flag}")
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+    report_imports(problems)
+    if regressions:
+        sys.exit(1)
+
+
+def report_imports(problems):
+    """Print import budget problems and fail the run if there are any."""
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import json
+import os
+import struct
+import zlib
+
+from engine import DEFAULT_WORLD, GameEngine, GameState, TurnRecord
+
+MAGIC = b"DWCK"
+CHECKPOINT_VERSION = 3  # 2 added the world digest (version 1 files are classic-world games), 3 the memory
+
+# Fixed-size header and game fields; loan_due_date is -1 when there is no loan
+_HEADER = struct.Struct("<4sHI")  # magic, version, payload length
+_GAME = struct.Struct("<QIB I qqi B q H I")  # seed, max_days, quit, day, cash, debt, loan_due, location, bank, jail, turns here
+_RNG = struct.Struct("<625I?d")  # Mersenne Twister state, gauss_next present, gauss_next
+_RECORD = struct.Struct("<I qq B")  # day, cash, debt, location
+_BOROUGH = struct.Struct("<III")  # memory per location: price samples, days, raids; price rows follow if sampled
+_CRC = struct.Struct("<I")
+
+
+class CheckpointError(Exception):
+    """Raised for a checkpoint that is truncated, corrupt, from another version or another world."""
+
+
+_drug_rows = {}
+
+
+def _drug_row(world):
+    """Struct of one per-drug row (inventory or prices) in this world."""
+    size = len(world.drugs)
+    if size not in _drug_rows:
+        _drug_rows[size] = struct.Struct(f"<{size}q")
+    return _drug_rows[size]
+
+
+def _pack_str(value):
+    if value is None:
+        return struct.pack("<i", -1)
+    data = value.encode()
+    return struct.pack("<i", len(data)) + data
+
+
+def _unpack_str(data, offset):
+    (size,), offset = struct.unpack_from("<i", data, offset), offset + 4
+    if size < 0:
+        return None, offset
+    return data[offset:offset + size].decode(), offset + size
+
+
+def encode(engine, meta=None):
+    """Serialize a game (state, prices, RNG, turn history) to checkpoint bytes."""
+    state = engine.state
+    drug_row = _drug_row(engine.world)
+    parts = [
+        _GAME.pack(engine.seed, engine.max_days, engine.quit, state.day, state.cash, state.debt,
+                   -1 if state.loan_due_date is None else state.loan_due_date, state.location_index,
+                   state.bank, state.jail_time, state.turns_in_location),
+        _pack_str(engine.world.digest),
+        drug_row.pack(*state.inventory.values_),
+        drug_row.pack(*engine.prices.values_),
+    ]
+    _, mt, gauss = engine.rng.getstate()
+    parts.append(_RNG.pack(*mt, gauss is not None, gauss or 0.0))
+    parts.append(struct.pack("<B", len(state.turn_history)))
+    for record in state.turn_history:
+        parts.append(_RECORD.pack(record.day, record.cash, record.debt, record.location_index))
+        parts.append(drug_row.pack(*record.inventory))
+        parts.append(drug_row.pack(*record.prices))
+        parts.extend((_pack_str(record.action), _pack_str(record.result), _pack_str(record.event)))
+    memory = state.memory
+    memory.fold()
+    for location, samples in enumerate(memory.samples):
+        parts.append(_BOROUGH.pack(samples, memory.days[location], memory.raids[location]))
+        if samples:
+            parts.extend(drug_row.pack(*row) for row in (memory.lows[location], memory.highs[location],
+                                                         memory.totals[location]))
+    parts.append(drug_row.pack(*memory.basis))
+    parts.append(struct.pack("<q", memory.realized))
+    parts.append(_pack_str(json.dumps(meta or {}, separators=(",", ":"))))
+    payload = b"".join(parts)
+    return _HEADER.pack(MAGIC, CHECKPOINT_VERSION, len(payload)) + payload + _CRC.pack(zlib.crc32(payload))
+
+
+def decode(data, engine=None, world=None):
+    """Restore checkpoint bytes into ``engine`` (a new one by default); return ``(engine, meta)``.
+
+    Restoring into an existing engine keeps its state and prices objects, so
+    anything holding references to them stays valid. The game must have been
+    saved in ``world`` (by default the engine's, else the classic one).
+    Files older than version 3 restore with an empty memory.
+    """
+    if len(data) < _HEADER.size + _CRC.size:
+        raise CheckpointError("checkpoint is truncated")
+    magic, version, size = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise CheckpointError("not a checkpoint file")
+    if version not in (1, 2, CHECKPOINT_VERSION):
+        raise CheckpointError(f"unsupported checkpoint version {version}")
+    payload = data[_HEADER.size:_HEADER.size + size]
+    if len(payload) != size or len(data) < _HEADER.size + size + _CRC.size:
+        raise CheckpointError("checkpoint is truncated")
+    (crc,) = _CRC.unpack_from(data, _HEADER.size + size)
+    if zlib.crc32(payload) != crc:
+        raise CheckpointError("checkpoint checksum mismatch")
+
+    (seed, max_days, quit, day, cash, debt, loan_due, location, bank, jail,
+     turns_here) = _GAME.unpack_from(payload)
+    offset = _GAME.size
+    world = world or (engine.world if engine is not None else DEFAULT_WORLD)
+    digest = DEFAULT_WORLD.digest
+    if version > 1:
+        digest, offset = _unpack_str(payload, offset)
+    if digest != world.digest:
+        raise CheckpointError(f"checkpoint is from another world than {world.name!r}")
+    drug_row = _drug_row(world)
+    inventory = drug_row.unpack_from(payload, offset)
+    prices = drug_row.unpack_from(payload, offset + drug_row.size)
+    offset += 2 * drug_row.size
+    rng_state = _RNG.unpack_from(payload, offset)
+    offset += _RNG.size
+
+    state = GameState(world.locations[location], world)
+    state.day, state.cash, state.debt, state.bank = day, cash, debt, bank
+    state.loan_due_date = None if loan_due < 0 else loan_due
+    state.jail_time, state.turns_in_location = jail, turns_here
+    state.inventory.values_[:] = inventory
+    (count,), offset = struct.unpack_from("<B", payload, offset), offset + 1
+    for _ in range(count):
+        r_day, r_cash, r_debt, r_location = _RECORD.unpack_from(payload, offset)
+        offset += _RECORD.size
+        r_inventory = drug_row.unpack_from(payload, offset)
+        r_prices = drug_row.unpack_from(payload, offset + drug_row.size)
+        offset += 2 * drug_row.size
+        action, offset = _unpack_str(payload, offset)
+        result, offset = _unpack_str(payload, offset)
+        event, offset = _unpack_str(payload, offset)
+        state.turn_history.append(TurnRecord(r_day, action, result, event, r_cash, r_debt, r_location,
+                                             r_inventory, r_prices, world))
+    if version > 2:
+        offset = _decode_memory(payload, offset, state.memory, drug_row)
+    meta, offset = _unpack_str(payload, offset)
+
+    engine = engine or GameEngine(seed=seed, max_days=max_days, world=world)
+    engine.world = engine.prices.world = world
+    engine.seed, engine.max_days, engine.quit = seed, max_days, bool(quit)
+    engine.state.copy_from(state)
+    engine.prices.values_[:] = prices
+    gauss = rng_state[-1] if rng_state[-2] else None
+    engine.rng.setstate((3, tuple(rng_state[:625]), gauss))
+    return engine, json.loads(meta)
+
+
+def _decode_memory(payload, offset, memory, drug_row):
+    for location in range(len(memory.samples)):
+        samples, days, raids = _BOROUGH.unpack_from(payload, offset)
+        offset += _BOROUGH.size
+        memory.samples[location], memory.days[location], memory.raids[location] = samples, days, raids
+        if samples:
+            memory.lows[location] = drug_row.unpack_from(payload, offset)
+            memory.highs[location] = drug_row.unpack_from(payload, offset + drug_row.size)
+            memory.totals[location] = drug_row.unpack_from(payload, offset + 2 * drug_row.size)
+            offset += 3 * drug_row.size
+    memory.basis[:] = drug_row.unpack_from(payload, offset)
+    offset += drug_row.size
+    (memory.realized,) = struct.unpack_from("<q", payload, offset)
+    return offset + 8
+
+
+def save(path, engine, meta=None, fsync=False):
+    """Write a checkpoint atomically: a crash leaves either the old or the new file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(encode(engine, meta))
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load(path, engine=None, world=None):
+    with open(path, "rb") as f:
+        return decode(f.read(), engine, world)
+
+
+class Checkpointer:
+    """Saves a game every ``every`` turns; attach as ``engine.checkpointer``."""
+
+    def __init__(self, path, every=1, meta=None, fsync=False):
+        self.path = path
+        self.every = every
+        self.meta = meta
+        self.fsync = fsync
+        self.turns = 0
+
+    def after_turn(self, engine):
+        self.turns += 1
+        if self.turns % self.every == 0 or engine.is_over():
+            save(self.path, engine, self.meta, self.fsync)
+
+
+def game_paths(directory, seed):
+    """Checkpoint and finished-summary paths of one game in a batch directory."""
+    return os.path.join(directory, f"game-{seed}.ckpt"), os.path.join(directory, f"game-{seed}.json")
+
+
+def open_game(directory, seed, max_days, every=1, resume=False, world=None):
+    """Start or resume one batch game with checkpointing under ``directory``.
+
+    Returns ``(engine, summary)``: ``summary`` is set (and the engine None)
+    when a resumed game had already finished.
+    """
+    ckpt, done = game_paths(directory, seed)
+    if resume and os.path.exists(done):
+        with open(done) as f:
+            return None, json.load(f)
+    engine = GameEngine(seed=seed, max_days=max_days, world=world)
+    if resume and os.path.exists(ckpt):
+        load(ckpt, engine)
+    engine.checkpointer = Checkpointer(ckpt, every)
+    return engine, None
+
+
+def close_game(directory, engine, summary):
+    """Record a finished batch game's summary and drop its checkpoint."""
+    ckpt, done = game_paths(directory, engine.seed)
+    tmp = f"{done}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(summary, f)
+    os.replace(tmp, done)
+    engine.checkpointer = None
+    if os.path.exists(ckpt):
+        os.remove(ckpt)
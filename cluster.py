@@ -0,0 +1,443 @@
+import argparse
+import itertools
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+
+from agents import AGENTS
+from batch import run_game, summarize
+from engine import DEFAULT_WORLD_CONFIG, MAX_DAYS, World, load_world
+from metrics import metrics
+
+# World config keys a sweep may vary, and how to read them from the command line
+SWEEP_PARAMS = {"travel_cost": int, "police_rate": int, "volatility": int, "max_safe_turns": int,
+                "price_floor": int}
+
+
+def game_key(agent, params, seed):
+    """Identity of one game in a sweep; a result is merged once per key however often it arrives."""
+    return f"{agent}|{json.dumps(params, sort_keys=True)}|{seed}"
+
+
+def plan_shards(agents, grid, seeds, shard_size):
+    """Split a sweep (every agent x parameter combination x seed) into shards of ``shard_size`` games."""
+    seeds = list(seeds)
+    names = sorted(grid)
+    shards = []
+    for agent in agents:
+        for values in itertools.product(*(grid[name] for name in names)):
+            params = dict(zip(names, values))
+            for i in range(0, len(seeds), shard_size):
+                chunk = seeds[i:i + shard_size]
+                shards.append({"id": f"{agent}-{len(shards)}", "agent": agent, "params": params, "seeds": chunk})
+    return shards
+
+
+def shard_keys(shard):
+    return [game_key(shard['agent'], shard['params'], seed) for seed in shard['seeds']]
+
+
+class Coordinator:
+    """Hands out game shards to workers and merges the results they stream back.
+
+    A shard is leased to one worker at a time. Every result the worker sends
+    renews its lease; a lease that runs ``lease_timeout`` seconds without one
+    (the worker died or lost its node) puts the shard back in the queue, up
+    to ``max_attempts`` leases. Workers also renew while a long game is in
+    progress. Results are merged by game key, so the same game reported
+    twice, by a retried shard or a worker thought lost, is counted once.
+    Merged games are appended to ``out`` as they arrive; a coordinator
+    restarted on the same file skips the games already in it.
+    """
+
+    def __init__(self, shards, base_config, max_days=MAX_DAYS, out=None, lease_timeout=30.0, max_attempts=3):
+        self.shards = {shard['id']: shard for shard in shards}
+        self.base_config = base_config
+        self.max_days = max_days
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.merged = {}  # game key -> summary
+        self.fresh = []  # summaries merged by this run, in arrival order
+        self.leases = {}  # shard id -> (worker, deadline)
+        self.attempts = dict.fromkeys(self.shards, 0)
+        self.failed = {}  # shard id -> last error
+        self.workers = set()
+        if out and os.path.exists(out):
+            self._load(out)
+        self.out = open(out, "a") if out else None
+        self.remaining = {shard_id: {key for key in shard_keys(shard) if key not in self.merged}
+                          for shard_id, shard in self.shards.items()}
+        self.pending = [shard_id for shard_id, keys in self.remaining.items() if keys]  # oldest first
+        self._check_finished()
+
+    def _load(self, out):
+        """Merge the games already in ``out``, cutting off a last line left half written by a killed coordinator."""
+        with open(out, "rb+") as f:
+            end = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Only the line being written when the process died can lack its newline
+                summary = json.loads(line)
+                self.merged[summary['key']] = summary
+                end += len(line)
+            f.truncate(end)  # Appending after the fragment would spoil the next record too
+
+    def handle(self, request):
+        """Answer one worker request (a decoded JSON object) with a JSON-able reply."""
+        op = request.get("op")
+        with self.lock:
+            self.workers.add(request.get("worker"))
+            if op == "lease":
+                return self._lease(request['worker'])
+            if op == "result":
+                return self._result(request['worker'], request['shard'], request['summary'])
+            if op == "renew":
+                self._renew(request['worker'], request['shard'])
+                return {"ok": True}
+            if op == "fail":
+                return self._fail(request['worker'], request['shard'], request.get("error"))
+        return {"error": f"unknown op {op!r}"}
+
+    def _lease(self, worker):
+        self._expire()
+        if self.finished.is_set():
+            return {"done": True}
+        if not self.pending:
+            return {"wait": min(1.0, self.lease_timeout / 4)}
+        shard_id = self.pending.pop(0)
+        self.attempts[shard_id] += 1
+        self.leases[shard_id] = (worker, time.monotonic() + self.lease_timeout)
+        metrics.inc("shards_leased_total")
+        shard = self.shards[shard_id]
+        # Only the games still missing are sent; a retried shard does not replay finished ones
+        seeds = [seed for seed in shard['seeds'] if game_key(shard['agent'], shard['params'], seed)
+                 in self.remaining[shard_id]]
+        config = dict(self.base_config, **shard['params'])
+        return {"shard": dict(shard, seeds=seeds), "world": config, "max_days": self.max_days,
+                "lease_timeout": self.lease_timeout}
+
+    def _renew(self, worker, shard_id):
+        lease = self.leases.get(shard_id)
+        if lease and lease[0] == worker:
+            self.leases[shard_id] = (worker, time.monotonic() + self.lease_timeout)
+
+    def _result(self, worker, shard_id, summary):
+        key = summary['key']
+        self._renew(worker, shard_id)
+        if key in self.merged:
+            metrics.inc("duplicate_results_total")
+            return {"ok": True, "duplicate": True}
+        self.merged[key] = summary
+        self.fresh.append(summary)
+        metrics.inc("games_merged_total")
+        if self.out:
+            self.out.write(json.dumps(summary) + "\n")
+            self.out.flush()
+        keys = self.remaining.get(shard_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                self.leases.pop(shard_id, None)
+                self.failed.pop(shard_id, None)
+                if shard_id in self.pending:
+                    self.pending.remove(shard_id)
+                metrics.inc("shards_done_total")
+                self._check_finished()
+        return {"ok": True}
+
+    def _fail(self, worker, shard_id, error):
+        lease = self.leases.get(shard_id)
+        if lease and lease[0] == worker:
+            del self.leases[shard_id]
+            self._requeue(shard_id, error)
+        return {"ok": True}
+
+    def _expire(self):
+        now = time.monotonic()
+        for shard_id, (worker, deadline) in list(self.leases.items()):
+            if deadline < now:
+                del self.leases[shard_id]
+                self._requeue(shard_id, f"lease held by {worker} expired")
+
+    def _requeue(self, shard_id, error):
+        if not self.remaining[shard_id]:
+            return
+        if self.attempts[shard_id] >= self.max_attempts:
+            self.failed[shard_id] = error
+            metrics.inc("shards_failed_total")
+            self._check_finished()
+        else:
+            self.pending.append(shard_id)
+            metrics.inc("shards_retried_total")
+
+    def _check_finished(self):
+        busy = any(keys and shard_id not in self.failed for shard_id, keys in self.remaining.items())
+        if not busy:
+            self.finished.set()
+
+    def expire(self):
+        """Re-queue shards whose lease ran out, even when no worker is asking for work."""
+        with self.lock:
+            self._expire()
+
+    def progress(self):
+        with self.lock:
+            done = sum(1 for keys in self.remaining.values() if not keys)
+            return {"shards": len(self.shards), "done": done, "leased": len(self.leases),
+                    "pending": len(self.pending), "failed": len(self.failed), "games": len(self.merged),
+                    "workers": len(self.workers - {None})}
+
+    def close(self):
+        if self.out:
+            self.out.close()
+            self.out = None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One worker connection: a JSON request per line, answered by a JSON reply per line."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                reply = self.server.coordinator.handle(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                reply = {"error": f"bad request: {e}"}
+            self.wfile.write((json.dumps(reply) + "\n").encode())
+
+
+class Broker(socketserver.ThreadingTCPServer):
+    """The coordinator's TCP endpoint, serving each worker connection on its own thread."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, coordinator, host="127.0.0.1", port=0):
+        super().__init__((host, port), _Handler)
+        self.coordinator = coordinator
+
+    @property
+    def address(self):
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+
+class BrokerClient:
+    """A worker's connection to the broker, reconnecting when it drops."""
+
+    def __init__(self, address, connect_timeout=30.0):
+        host, port = address.rsplit(":", 1)
+        self.address = (host, int(port))
+        self.connect_timeout = connect_timeout
+        self.sock = None
+        self.file = None
+        self.lock = threading.Lock()  # The heartbeat thread shares the connection
+
+    def connect(self):
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                self.sock = socket.create_connection(self.address, timeout=self.connect_timeout)
+                self.file = self.sock.makefile("rwb")
+                return
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+
+    def call(self, request):
+        """Send one request and return the reply; reconnects once if the connection was lost."""
+        with self.lock:
+            return self._call(request)
+
+    def _call(self, request):
+        for attempt in range(2):
+            if self.file is None:
+                self.connect()
+            try:
+                self.file.write((json.dumps(request) + "\n").encode())
+                self.file.flush()
+                line = self.file.readline()
+                if line:
+                    return json.loads(line)
+            except OSError:
+                if attempt:
+                    raise
+            self.close()
+        raise ConnectionError("broker closed the connection")
+
+    def close(self):
+        if self.sock:
+            self.file.close()
+            self.sock.close()
+        self.sock = self.file = None
+
+
+def work(address, worker=None, connect_timeout=30.0):
+    """Pull shards from the broker at ``address`` and play them until it says the sweep is done.
+
+    Returns the number of games played. Each game's summary is sent back as
+    soon as it finishes, so a worker lost mid-shard only costs the games it
+    had not reported.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    client = BrokerClient(address, connect_timeout)
+    worlds = {}
+    played = 0
+    playing = {}  # "shard" -> id of the shard in progress, for the heartbeat
+    stop = threading.Event()
+
+    def heartbeat(interval):
+        while not stop.wait(interval):
+            if playing.get("shard"):
+                try:
+                    client.call({"op": "renew", "worker": worker, "shard": playing["shard"]})
+                except (OSError, ConnectionError):
+                    return
+
+    try:
+        while True:
+            try:
+                reply = client.call({"op": "lease", "worker": worker})
+            except (OSError, ConnectionError):
+                # The coordinator finished and went away between our requests
+                return played
+            if reply.get("done"):
+                return played
+            if "wait" in reply:
+                time.sleep(reply['wait'])
+                continue
+            shard = reply['shard']
+            if not played and not playing:
+                threading.Thread(target=heartbeat, args=(reply['lease_timeout'] / 3,), daemon=True).start()
+            playing["shard"] = shard['id']
+            key = json.dumps(reply['world'], sort_keys=True)
+            if key not in worlds:
+                worlds[key] = World(reply['world'])
+            try:
+                agent = AGENTS[shard['agent']]()
+                for seed in shard['seeds']:
+                    summary = run_game(seed, agent, reply['max_days'], world=worlds[key])
+                    summary.update(key=game_key(shard['agent'], shard['params'], seed), params=shard['params'],
+                                   worker=worker)
+                    client.call({"op": "result", "worker": worker, "shard": shard['id'], "summary": summary})
+                    played += 1
+            except (OSError, ConnectionError):
+                return played
+            except Exception as e:
+                client.call({"op": "fail", "worker": worker, "shard": shard['id'], "error": repr(e)})
+            playing["shard"] = None
+    finally:
+        stop.set()
+        client.close()
+
+
+def parse_param(text):
+    """``name=v1,v2,...`` from the command line into ``(name, [values])``."""
+    name, _, values = text.partition("=")
+    if name not in SWEEP_PARAMS or not values:
+        raise argparse.ArgumentTypeError(f"expected one of {', '.join(SWEEP_PARAMS)} as name=value,value,...")
+    return name, [SWEEP_PARAMS[name](value) for value in values.split(",")]
+
+
+def coordinate(args):
+    grid = dict(args.param or [])
+    base_config = load_world(args.world).config if args.world else DEFAULT_WORLD_CONFIG
+    shards = plan_shards(args.agents, grid, range(args.seed, args.seed + args.games), args.shard_size)
+    coordinator = Coordinator(shards, base_config, args.days, args.out, args.lease_timeout, args.max_attempts)
+    broker = Broker(coordinator, args.host, args.port)
+    print(f"Broker listening on {broker.address}: {len(shards)} shards", file=sys.stderr, flush=True)
+    threading.Thread(target=broker.serve_forever, daemon=True).start()
+    here = os.path.dirname(os.path.abspath(__file__))
+    spawned = [subprocess.Popen([sys.executable, os.path.join(here, "cluster.py"), "worker", broker.address,
+                                 "--name", f"local-{i}"]) for i in range(args.spawn)]
+    start = time.perf_counter()
+    last_report = start
+    try:
+        while not coordinator.finished.wait(0.5):
+            coordinator.expire()
+            if time.perf_counter() - last_report >= args.report_every:
+                last_report = time.perf_counter()
+                print(json.dumps(coordinator.progress()), file=sys.stderr, flush=True)
+        # Give idle workers a poll or two to hear that the sweep is done
+        time.sleep(args.linger)
+    finally:
+        broker.shutdown()
+        broker.server_close()
+        for process in spawned:
+            try:
+                process.wait(timeout=args.linger + 5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        coordinator.close()
+    if args.results:
+        from results import ResultsSink
+        sink = ResultsSink(args.results)
+        for summary in coordinator.fresh:
+            sink.record_game(summary)
+        sink.close()
+
+    seconds = time.perf_counter() - start
+    groups = {}
+    for summary in coordinator.merged.values():
+        groups.setdefault((summary['agent'], json.dumps(summary['params'], sort_keys=True)), []).append(summary)
+    report = {"progress": coordinator.progress(), "seconds": seconds, "failed": coordinator.failed,
+              "counters": metrics.counters,
+              "groups": [dict(summarize(games), agent=agent, params=json.loads(params))
+                         for (agent, params), games in sorted(groups.items())]}
+    print(json.dumps(report, indent=2))
+    if coordinator.failed:
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Drug Wars strategy sweep across worker processes and nodes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    coord = commands.add_parser("coordinator", help="Split a sweep into shards and serve them to workers")
+    coord.add_argument("--agents", type=lambda text: text.split(","), default=["greedy"],
+                       help="Comma-separated agents to sweep")
+    coord.add_argument("--games", type=int, default=1000, help="Seeds per agent and parameter combination")
+    coord.add_argument("--seed", type=int, default=0, help="First seed; games use seed..seed+games-1")
+    coord.add_argument("--days", type=int, default=MAX_DAYS)
+    coord.add_argument("--param", type=parse_param, action="append", metavar="NAME=V1,V2",
+                       help="World parameter values to sweep; repeat for a grid over several")
+    coord.add_argument("--world", metavar="PATH", help="World config the parameters are applied to")
+    coord.add_argument("--shard-size", type=int, default=50, help="Games per shard")
+    coord.add_argument("--host", default="127.0.0.1", help="Interface to listen on; 0.0.0.0 for remote workers")
+    coord.add_argument("--port", type=int, default=7890)
+    coord.add_argument("--lease-timeout", type=float, default=30.0,
+                       help="Seconds without a result before a worker's shard is handed to another")
+    coord.add_argument("--max-attempts", type=int, default=3, help="Leases per shard before it is given up")
+    coord.add_argument("--out", metavar="PATH", help="Append merged games as JSON lines; rerun to resume the sweep")
+    coord.add_argument("--results", metavar="PATH", help="Also record games in this SQLite results file")
+    coord.add_argument("--spawn", type=int, default=0, help="Start this many local worker processes")
+    coord.add_argument("--report-every", type=float, default=5.0, help="Seconds between progress lines")
+    coord.add_argument("--linger", type=float, default=2.0, help="Seconds to keep serving after the sweep is done")
+
+    worker = commands.add_parser("worker", help="Play shards handed out by a coordinator")
+    worker.add_argument("address", help="Coordinator host:port")
+    worker.add_argument("--name", help="Worker name in the coordinator's records (default host-pid)")
+    worker.add_argument("--connect-timeout", type=float, default=30.0)
+
+    args = parser.parse_args()
+    if args.command == "worker":
+        played = work(args.address, args.name, args.connect_timeout)
+        print(f"{args.name or 'worker'}: played {played} games", file=sys.stderr)
+        return
+    unknown = set(args.agents) - set(AGENTS)
+    if unknown:
+        coord.error(f"unknown agents: {', '.join(sorted(unknown))}")
+    if (args.param or args.world) and "risk" in args.agents:
+        coord.error("the risk simulator only models the classic world, so the risk agent cannot be swept")
+    coordinate(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import threading
+import time
+from collections import deque
+
+from metrics import metrics
+
+
+def status_table(status):
+    """Status table from ``(day, cash, debt, bank, location, inventory, loan_due)``."""
+    from rich.table import Table
+
+    day, cash, debt, bank, location, inventory, loan_due = status
+    table = Table(title=f"Drug Wars - Day {day}", style="cyan")
+    table.add_column("Attribute", style="magenta")
+    table.add_column("Value", style="green")
+    table.add_row("Cash", f"${cash}")
+    table.add_row("Debt", f"${debt}")
+    table.add_row("Bank", f"${bank}")
+    table.add_row("Location", location)
+    table.add_row("Inventory", ", ".join(f"{drug}: {qty}" for drug, qty in inventory) or "Empty")
+    if debt > 0:
+        table.add_row("Loan Due", f"Day {loan_due}")
+    return table
+
+
+def price_table(prices):
+    """Local price table from ``(drug, price)`` pairs."""
+    from rich.table import Table
+
+    table = Table(title="Local Drug Prices", style="yellow")
+    table.add_column("Drug", style="magenta")
+    table.add_column("Price", style="green")
+    for drug, price in prices:
+        table.add_row(drug.capitalize(), f"${price}")
+    return table
+
+
+def game_status(engine):
+    state = engine.state
+    inventory = tuple((drug, qty) for drug, qty in state['inventory'].items() if qty > 0)
+    return (state['day'], state['cash'], state['debt'], state['bank'], state['location'], inventory,
+            state['loan_due_date'])
+
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f} ms"
+
+
+class Dashboard:
+    """Live terminal view of running games, redrawn at a fixed frame rate.
+
+    A background thread samples ``games`` (label -> engine; it may grow while
+    the games run) ``fps`` times a second, independently of how fast the games
+    tick. Each panel is rebuilt only when its sampled data changed, and the
+    terminal is left alone when no panel did. A single game is shown in
+    detail; several as throughput, a leaderboard of the ``top`` richest and
+    model latency. A quiet dashboard never imports rich or starts a thread.
+    """
+
+    def __init__(self, games, fps=4, top=10, quiet=False, console=None):
+        self.games = games
+        self.fps = fps
+        self.top = top
+        self.quiet = quiet
+        self.console = console
+        self.live = None
+        self.panels = {}
+        self.keys = {}
+        self.samples = deque(maxlen=max(2, int(fps * 2)))  # About two seconds of (time, turns)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        if self.quiet:
+            return self
+        from rich.live import Live
+
+        self.live = Live(console=self.console, auto_refresh=False)
+        self.live.start()
+        self._thread = threading.Thread(target=self._run, name="dashboard", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Draw the final state and leave it on screen."""
+        if self.live is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self.frame()
+        self.live.stop()
+        if not self.live.console.is_terminal:
+            self.live.console.line()  # Rich leaves the last frame unterminated when not on a terminal
+        self.live = None
+
+    def _run(self):
+        while not self._stop.wait(1 / self.fps):
+            self.frame()
+
+    def frame(self):
+        """Sample the games and redraw the panels that changed; return whether the screen was updated."""
+        with metrics.timer("dashboard_frame_seconds"):
+            sections = self.sections(list(self.games.items()))
+            changed = False
+            for name, data, build in sections:
+                if self.keys.get(name) != data:
+                    self.keys[name] = data
+                    self.panels[name] = build(data)
+                    changed = True
+            metrics.inc("dashboard_frames_total")
+            if changed:
+                from rich.console import Group
+
+                self.live.update(Group(*(self.panels[name] for name, _, _ in sections)), refresh=True)
+                metrics.inc("dashboard_redraws_total")
+            return changed
+
+    def sections(self, games):
+        """``(name, data, build)`` per panel; ``data`` is a hashable snapshot and ``build(data)`` its renderable."""
+        latency = ("latency", self.latency(), self.latency_table)
+        if len(games) == 1:
+            engine = games[0][1]
+            return [("status", game_status(engine), status_table),
+                    ("prices", tuple(engine.prices.items()), price_table), latency]
+        return [("throughput", self.throughput(games), self.throughput_table),
+                ("leaderboard", self.leaderboard(games), self.leaderboard_table), latency]
+
+    def throughput(self, games):
+        """``(running, finished, turns, turns per second)`` across all games."""
+        finished = sum(engine.is_over() for _, engine in games)
+        turns = sum(engine.state.day - 1 for _, engine in games)
+        now = time.perf_counter()
+        self.samples.append((now, turns))
+        start, start_turns = self.samples[0]
+        rate = round((turns - start_turns) / (now - start), 1) if now > start else 0.0
+        return len(games) - finished, finished, turns, rate
+
+    def leaderboard(self, games):
+        """The ``top`` games by total assets as ``(label, day, location, assets, over)``."""
+        rows = [(label, engine.state.day, engine.state.location, engine.total_assets(), engine.is_over())
+                for label, engine in games]
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return tuple(rows[:self.top])
+
+    def latency(self):
+        """Model call count, latency percentiles and failures, rounded to the millisecond."""
+        def rounded(value):
+            return None if value is None else round(value, 3)
+
+        with metrics.lock:  # The games' threads update these while the frame is sampled
+            request = metrics.histograms.get("llm_request_seconds")
+            ttft = metrics.histograms.get("llm_ttft_seconds")
+            counters = metrics.counters
+            return (request.count if request else 0,
+                    rounded(request.sum / request.count) if request and request.count else None,
+                    rounded(request.quantile(0.5)) if request else None,
+                    rounded(request.quantile(0.99)) if request else None,
+                    rounded(ttft.quantile(0.5)) if ttft else None,
+                    counters.get("llm_errors_total", 0), counters.get("retries_total", 0),
+                    counters.get("validation_failures_total", 0))
+
+    @staticmethod
+    def throughput_table(data):
+        from rich.table import Table
+
+        running, finished, turns, rate = data
+        table = Table(title="Throughput", style="cyan")
+        for column in ("Running", "Finished", "Turns", "Turns/s"):
+            table.add_column(column, justify="right")
+        table.add_row(str(running), str(finished), str(turns), f"{rate:.1f}")
+        return table
+
+    @staticmethod
+    def leaderboard_table(rows):
+        from rich.table import Table
+
+        table = Table(title="Leaderboard", style="yellow")
+        table.add_column("Game", style="magenta")
+        table.add_column("Day", justify="right")
+        table.add_column("Location")
+        table.add_column("Total Assets", justify="right", style="green")
+        for label, day, location, assets, over in rows:
+            table.add_row(str(label), "done" if over else str(day), location, f"${assets}")
+        return table
+
+    @staticmethod
+    def latency_table(data):
+        from rich.table import Table
+
+        calls, mean, p50, p99, ttft, errors, retries, invalid = data
+        table = Table(title="Model Latency", style="blue")
+        for column in ("Calls", "Mean", "p50", "p99", "TTFT p50", "Errors", "Retries", "Invalid"):
+            table.add_column(column, justify="right")
+        table.add_row(str(calls), _ms(mean), _ms(p50), _ms(p99), _ms(ttft), str(errors), str(retries), str(invalid))
+        return table
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import math
+import sqlite3
+import time
+from collections import OrderedDict
+
+from engine import DEFAULT_WORLD
+
+
+def log_bucket(value, steps_per_doubling=2):
+    """Bucket a non-negative amount on a log scale so nearby amounts share a bucket."""
+    if value <= 0:
+        return 0
+    return 1 + int(math.log2(value) * steps_per_doubling)
+
+
+class DecisionCache:
+    """Two-level cache of model decisions keyed on a bucketed game-state fingerprint.
+
+    Recent entries live in an in-memory LRU; everything is also written to an
+    optional SQLite file so later runs and replays can reuse it. Entries expire
+    after ``ttl`` seconds and both levels are capped in size, evicting the least
+    recently used entries first.
+    """
+
+    def __init__(self, path=None, max_memory_entries=4096, max_disk_entries=200000,
+                 ttl=7 * 24 * 3600, price_bucket=20):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.price_bucket = price_bucket
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.db = None
+        if path:
+            # Created by the CLI but used from its decision thread; calls never overlap
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS decisions "
+                            "(key TEXT PRIMARY KEY, value TEXT, expires REAL, last_used REAL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS decisions_last_used ON decisions (last_used)")
+
+    def fingerprint(self, kind, state, prices, extra=None):
+        """Normalize the parts of the state a decision depends on into a cache key."""
+        normalized = [
+            kind,
+            state['location'],
+            log_bucket(state['cash']),
+            log_bucket(state['debt']),
+            log_bucket(state['bank']),
+            [log_bucket(qty, 1) for qty in state['inventory'].values()],
+            [price // self.price_bucket for price in prices.values()],
+            extra
+        ]
+        world = getattr(state, "world", DEFAULT_WORLD)
+        if world.digest != DEFAULT_WORLD.digest:
+            normalized.append(world.digest)  # Classic-world keys stay as they were
+        return hashlib.sha1(json.dumps(normalized).encode()).hexdigest()
+
+    def action_key(self, state, prices):
+        return self.fingerprint("action", state, prices)
+
+    def police_key(self, state, prices, options):
+        return self.fingerprint("police", state, prices, sorted(options))
+
+    def get(self, key, parse=None):
+        """Return the cached value for ``key`` or None, counting the hit or miss.
+
+        With ``parse`` the value is returned as ``parse(value)``; an entry it
+        rejects with ValueError is discarded and counted as a miss.
+        """
+        value = self._lookup(key)
+        if value is not None and parse is not None:
+            try:
+                value = parse(value)
+            except ValueError:
+                self.discard(key)
+                value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def _lookup(self, key):
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry and entry[1] > now:
+            self.memory.move_to_end(key)
+            return entry[0]
+        if entry:
+            del self.memory[key]
+        if self.db:
+            row = self.db.execute("SELECT value, expires FROM decisions WHERE key = ? AND expires > ?",
+                                  (key, now)).fetchone()
+            if row:
+                self.db.execute("UPDATE decisions SET last_used = ? WHERE key = ?", (now, key))
+                self._remember(key, row[0], row[1])
+                return row[0]
+        return None
+
+    def put(self, key, value):
+        """Store a decision (raw model text) under ``key``."""
+        now = time.time()
+        expires = now + self.ttl
+        self._remember(key, value, expires)
+        if self.db:
+            self.db.execute("INSERT OR REPLACE INTO decisions VALUES (?, ?, ?, ?)", (key, value, expires, now))
+            self.puts += 1
+            # Trim the disk store in batches rather than on every write
+            if self.puts % 256 == 0:
+                self._evict_disk(now)
+            else:
+                # Commits cost far less than the model call behind each put; a crash loses no decisions
+                self.db.commit()
+
+    def discard(self, key):
+        """Drop an entry, e.g. when a cached decision no longer validates."""
+        self.memory.pop(key, None)
+        if self.db:
+            self.db.execute("DELETE FROM decisions WHERE key = ?", (key,))
+            self.db.commit()
+
+    def _remember(self, key, value, expires):
+        self.memory[key] = (value, expires)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def _evict_disk(self, now):
+        self.db.execute("DELETE FROM decisions WHERE expires <= ?", (now,))
+        excess = self.db.execute("SELECT COUNT(*) FROM decisions").fetchone()[0] - self.max_disk_entries
+        if excess > 0:
+            self.db.execute("DELETE FROM decisions WHERE key IN "
+                            "(SELECT key FROM decisions ORDER BY last_used LIMIT ?)", (excess,))
+        self.db.commit()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate,
+                "memory_entries": len(self.memory)}
+
+    def close(self):
+        if self.db:
+            self._evict_disk(time.time())
+            self.db.close()
+            self.db = None
@@ -0,0 +1,950 @@
+import hashlib
+import json
+import random
+
+# Game Constants
+MAX_DAYS = 356
+LOCATIONS = ["Bronx", "Brooklyn", "Manhattan", "Queens", "Staten Island"]
+DRUG_TYPES = {
+    "cocaine": {"base_price": 100},
+    "heroin": {"base_price": 120},
+    "meth": {"base_price": 90},
+    "weed": {"base_price": 50},
+    "ecstasy": {"base_price": 80}
+}
+
+STARTING_CASH = 1000
+MAX_LOAN_AMOUNT = 5000
+LOAN_DURATION = 30  # days
+LOAN_INTEREST_RATE = 0.1  # 10% interest
+MAX_SAFE_TURNS = 3  # Maximum number of turns in one location before risking police encounter
+RECALL_TURNS = 5  # Number of recent turns to recall
+TRAVEL_COST = 100
+BRIBE_AMOUNT = 500
+MAX_PLAN_STEPS = 5  # Longest action plan accepted from one model call
+
+RANDOM_EVENTS = [
+    "You found a hidden stash in your inventory!",
+    "A rival gang is encroaching on your territory.",
+    "Market prices have shifted unexpectedly.",
+    "You received a loan offer from a shady character.",
+    "Nothing happened today."
+]
+
+POLICE_OPTIONS = ["pay_fine", "lose_inventory", "go_to_jail", "bribe"]
+
+POLICE_RATE = 5  # Percent chance of an encounter per day after MAX_SAFE_TURNS
+PRICE_FLOOR = 10
+PRICE_VOLATILITY = 10  # Largest daily price move per drug, either way
+
+ACTIONS = ["buy", "sell", "travel", "loan", "repay", "bank", "quit"]
+BANK_ACTIONS = ["deposit", "withdraw"]
+
+# The classic catalog and map; load_world reads other worlds from JSON files of the same shape
+DEFAULT_WORLD_CONFIG = {
+    "name": "classic",
+    "travel_cost": TRAVEL_COST,
+    "police_rate": POLICE_RATE,
+    "max_safe_turns": MAX_SAFE_TURNS,
+    "price_floor": PRICE_FLOOR,
+    "volatility": PRICE_VOLATILITY,
+    "drugs": [{"name": drug, "base_price": info["base_price"]} for drug, info in DRUG_TYPES.items()],
+    "locations": [{"name": location} for location in LOCATIONS],
+}
+
+
+class World:
+    """A drug catalog, a map and their rules, compiled into integer-indexed tables.
+
+    Config keys (all but ``drugs`` and ``locations`` optional, defaults as in
+    DEFAULT_WORLD_CONFIG):
+
+    - ``drugs``: ``[{"name", "base_price", "volatility"}]``
+    - ``locations``: ``[{"name", "police_rate", "price_modifier", "drug_modifiers": {drug: factor},
+      "travel_costs": {destination: fare}}]``
+    - ``travel_cost``, ``police_rate`` (percent), ``volatility``: world-wide defaults
+    - ``max_safe_turns``, ``price_floor``
+
+    Names are resolved to indices once, here; the engine then works on
+    lists indexed by drug and location number. A price modifier scales a
+    borough's prices relative to the others, applied as the player arrives.
+    The action schemas are generated from the catalog on first use and kept.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.name = config.get("name", "custom")
+        drugs, locations = config.get("drugs"), config.get("locations")
+        if not drugs or not locations:
+            raise ValueError("A world needs at least one drug and one location")
+        self.drugs = tuple(drug["name"] for drug in drugs)
+        self.locations = tuple(location["name"] for location in locations)
+        self.drug_index = _index(self.drugs, "drug")
+        self.location_index = _index(self.locations, "location")
+
+        self.base_prices = tuple(int(drug["base_price"]) for drug in drugs)
+        volatility = config.get("volatility", PRICE_VOLATILITY)
+        self.volatility = tuple(int(drug.get("volatility", volatility)) for drug in drugs)
+        self.price_floor = int(config.get("price_floor", PRICE_FLOOR))
+        self.max_safe_turns = int(config.get("max_safe_turns", MAX_SAFE_TURNS))
+        police_rate = config.get("police_rate", POLICE_RATE)
+        self.police_rates = tuple(int(location.get("police_rate", police_rate)) for location in locations)
+
+        # travel_costs[origin][destination]
+        fare = int(config.get("travel_cost", TRAVEL_COST))
+        self.travel_costs = []
+        for location in locations:
+            row = [fare] * len(self.locations)
+            for destination, cost in location.get("travel_costs", {}).items():
+                row[self._location(destination)] = int(cost)
+            self.travel_costs.append(tuple(row))
+        self.travel_costs = tuple(self.travel_costs)
+
+        # price_modifiers[location][drug], or None when every factor is 1 and travel never reprices
+        modifiers = []
+        for location in locations:
+            row = [float(location.get("price_modifier", 1.0))] * len(self.drugs)
+            for drug, factor in location.get("drug_modifiers", {}).items():
+                row[self._drug(drug)] *= float(factor)
+            modifiers.append(tuple(row))
+        if any(factor <= 0 for row in modifiers for factor in row):
+            raise ValueError(f"Price modifiers in world {self.name!r} must be positive")
+        self.price_modifiers = tuple(modifiers) if any(f != 1.0 for row in modifiers for f in row) else None
+
+        self._action_schema = None
+        self._plan_schema = None
+        self._digest = None
+
+    def opening_prices(self, location_index):
+        """Prices on day one for a player starting in the given borough."""
+        if self.price_modifiers is None:
+            return list(self.base_prices)
+        return [max(self.price_floor, round(price * factor))
+                for price, factor in zip(self.base_prices, self.price_modifiers[location_index])]
+
+    def _drug(self, name):
+        if name not in self.drug_index:
+            raise ValueError(f"Unknown drug {name!r} in world {self.name!r}")
+        return self.drug_index[name]
+
+    def _location(self, name):
+        if name not in self.location_index:
+            raise ValueError(f"Unknown location {name!r} in world {self.name!r}")
+        return self.location_index[name]
+
+    @property
+    def action_schema(self):
+        """JSON Schema of one action, with this world's drugs and locations as enums."""
+        if self._action_schema is None:
+            self._action_schema = {
+                "type": "object",
+                "properties": {
+                    "action": {"type": "string", "enum": list(ACTIONS)},
+                    "drug_type": {"type": "string", "enum": list(self.drugs)},
+                    "amount": {"type": "integer", "minimum": 1},
+                    "location": {"type": "string", "enum": list(self.locations)},
+                    "sub_action": {"type": "string", "enum": list(BANK_ACTIONS)}
+                },
+                "required": ["action"],
+                "additionalProperties": False
+            }
+        return self._action_schema
+
+    @property
+    def plan_schema(self):
+        """A plan is an ordered list of actions taken on consecutive days."""
+        if self._plan_schema is None:
+            self._plan_schema = {
+                "type": "object",
+                "properties": {
+                    "plan": {"type": "array", "items": self.action_schema, "minItems": 1,
+                             "maxItems": MAX_PLAN_STEPS}
+                },
+                "required": ["plan"],
+                "additionalProperties": False
+            }
+        return self._plan_schema
+
+    @property
+    def digest(self):
+        """Short stable hash of the config, to tell worlds apart in checkpoints and caches."""
+        if self._digest is None:
+            payload = json.dumps(self.config, sort_keys=True, separators=(",", ":"))
+            self._digest = hashlib.sha1(payload.encode()).hexdigest()[:16]
+        return self._digest
+
+    def __getstate__(self):
+        return self.config
+
+    def __setstate__(self, config):
+        self.__init__(config)
+
+    def __repr__(self):
+        return f"World({self.name!r}, {len(self.drugs)} drugs, {len(self.locations)} locations)"
+
+
+def _index(names, kind):
+    index = {name: i for i, name in enumerate(names)}
+    if len(index) != len(names):
+        raise ValueError(f"Duplicate {kind} names")
+    return index
+
+
+def load_world(path):
+    """Read a world config from a JSON file."""
+    with open(path) as f:
+        return World(json.load(f))
+
+
+DEFAULT_WORLD = World(DEFAULT_WORLD_CONFIG)
+
+# The classic world's schemas, for code written before worlds were configurable
+action_schema = DEFAULT_WORLD.action_schema
+plan_schema = DEFAULT_WORLD.plan_schema
+
+# Result messages of process_action for actions that actually took effect
+ACTION_SUCCESS_PREFIXES = (
+    "Bought", "Sold", "Traveled", "Borrowed", "Loan fully repaid", "Repaid", "Deposited", "Withdrew",
+    "You have chosen to quit"
+)
+
+
+def action_succeeded(message):
+    """True if a process_action result message reports an applied action."""
+    return bool(message) and message.startswith(ACTION_SUCCESS_PREFIXES)
+
+
+DRUGS = DEFAULT_WORLD.drugs
+DRUG_INDEX = DEFAULT_WORLD.drug_index
+LOCATION_INDEX = DEFAULT_WORLD.location_index
+
+
+class DrugTable:
+    """Per-drug integers (inventory counts or prices) in a list indexed like ``world.drugs``.
+
+    Reads and writes by drug name like the dict it replaces; hot code can use
+    ``values_`` by index directly.
+    """
+
+    __slots__ = ("values_", "world")
+
+    def __init__(self, values=None, world=None):
+        self.world = world or DEFAULT_WORLD
+        self.values_ = list(values) if values is not None else [0] * len(self.world.drugs)
+
+    def __getitem__(self, drug):
+        return self.values_[self.world.drug_index[drug]]
+
+    def __setitem__(self, drug, value):
+        self.values_[self.world.drug_index[drug]] = value
+
+    def get(self, drug, default=None):
+        index = self.world.drug_index.get(drug)
+        return default if index is None else self.values_[index]
+
+    def __contains__(self, drug):
+        return drug in self.world.drug_index
+
+    def __iter__(self):
+        return iter(self.world.drugs)
+
+    def __len__(self):
+        return len(self.values_)
+
+    def keys(self):
+        return self.world.drugs
+
+    def values(self):
+        return list(self.values_)
+
+    def items(self):
+        return zip(self.world.drugs, self.values_)
+
+    def update(self, other):
+        for drug, value in other.items():
+            self[drug] = value
+
+    def copy(self):
+        return DrugTable(self.values_, self.world)
+
+    def to_dict(self):
+        return dict(zip(self.world.drugs, self.values_))
+
+    def __eq__(self, other):
+        if isinstance(other, DrugTable):
+            return self.values_ == other.values_
+        return self.to_dict() == other
+
+    def __repr__(self):
+        return f"DrugTable({self.to_dict()!r})"
+
+
+class TurnRecord:
+    """One turn_history entry: the action, its result and the state right after it.
+
+    Stored as plain fields and tuples; the dict views used by prompts and
+    checksums are only built when asked for.
+    """
+
+    __slots__ = ("day", "action", "result", "event", "cash", "debt", "location_index", "inventory", "prices",
+                 "world")
+
+    def __init__(self, day, action, result, event, cash, debt, location_index, inventory, prices, world=None):
+        self.day = day
+        self.action = action
+        self.result = result
+        self.event = event
+        self.cash = cash
+        self.debt = debt
+        self.location_index = location_index
+        self.inventory = inventory  # Tuple of counts indexed like world.drugs
+        self.prices = prices  # Tuple of prices indexed like world.drugs
+        self.world = world or DEFAULT_WORLD
+
+    @property
+    def location(self):
+        return self.world.locations[self.location_index]
+
+    def state(self):
+        return {"cash": self.cash, "debt": self.debt, "location": self.location,
+                "inventory": {drug: qty for drug, qty in zip(self.world.drugs, self.inventory) if qty > 0}}
+
+    def __getitem__(self, key):
+        if key == "state":
+            return self.state()
+        if key == "prices":
+            return dict(zip(self.world.drugs, self.prices))
+        if key in ("day", "action", "result", "event"):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def to_dict(self):
+        return {"day": self.day, "action": self.action, "result": self.result, "state": self.state(),
+                "prices": self["prices"], "event": self.event}
+
+
+class TurnHistory:
+    """Ring buffer of the last ``capacity`` TurnRecords, oldest first.
+
+    Appending is O(1). ``fork`` shares the buffer with the copy; whichever
+    side appends next copies it first (copy-on-write).
+    """
+
+    __slots__ = ("buffer", "start", "size", "shared")
+
+    def __init__(self, capacity=RECALL_TURNS):
+        self.buffer = [None] * capacity
+        self.start = 0
+        self.size = 0
+        self.shared = False
+
+    def append(self, record):
+        if self.shared:
+            self.buffer = list(self.buffer)
+            self.shared = False
+        capacity = len(self.buffer)
+        if self.size < capacity:
+            self.buffer[(self.start + self.size) % capacity] = record
+            self.size += 1
+        else:
+            self.buffer[self.start] = record
+            self.start = (self.start + 1) % capacity
+
+    def fork(self):
+        child = TurnHistory.__new__(TurnHistory)
+        child.buffer = self.buffer
+        child.start = self.start
+        child.size = self.size
+        child.shared = self.shared = True
+        return child
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        buffer, capacity = self.buffer, len(self.buffer)
+        for i in range(self.size):
+            yield buffer[(self.start + i) % capacity]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("turn history index out of range")
+        return self.buffer[(self.start + i) % len(self.buffer)]
+
+    def to_list(self):
+        return [record.to_dict() for record in self]
+
+
+class GameMemory:
+    """Running aggregates over the whole game, for prompts that cannot replay every turn.
+
+    Per borough: the days spent there, the police encounters, and the lowest,
+    highest and summed price of each drug over the days it was observed
+    there. Per drug: what the units held cost (average cost basis). Plus the
+    realized trading profit. Every update costs the same on day 300 as on
+    day 3: trades and patrols touch one drug or borough, and observed prices
+    are queued and folded into the ranges ``FOLD_BATCH`` days at a time (call
+    ``fold`` before reading them). ``fork`` shares everything with the copy;
+    whichever side writes next copies the lists first. Price rows are tuples
+    that are replaced, never modified, so they stay shared.
+    """
+
+    FOLD_BATCH = 64
+
+    __slots__ = ("samples", "lows", "highs", "totals", "pending", "days", "raids", "basis", "realized", "shared")
+
+    def __init__(self, world=None):
+        world = world or DEFAULT_WORLD
+        size = len(world.locations)
+        self.samples = [0] * size  # Days each borough's prices were observed
+        self.lows = [None] * size  # Tuple of the lowest price of each drug, once observed
+        self.highs = [None] * size
+        self.totals = [None] * size
+        self.pending = []  # (location, prices) not folded in yet
+        self.days = [0] * size  # Days the police could have shown up there
+        self.raids = [0] * size
+        self.basis = [0] * len(world.drugs)
+        self.realized = 0
+        self.shared = False
+
+    def fork(self):
+        self.fold()  # Otherwise every fork would inherit, and fold on its own, the same queue
+        child = GameMemory.__new__(GameMemory)
+        child.samples, child.lows, child.highs, child.totals = self.samples, self.lows, self.highs, self.totals
+        child.pending, child.days, child.raids, child.basis = self.pending, self.days, self.raids, self.basis
+        child.realized = self.realized
+        child.shared = self.shared = True
+        return child
+
+    def _own(self):
+        self.samples, self.lows, self.highs = list(self.samples), list(self.lows), list(self.highs)
+        self.totals, self.pending = list(self.totals), list(self.pending)
+        self.days, self.raids, self.basis = list(self.days), list(self.raids), list(self.basis)
+        self.shared = False
+
+    def observe(self, location, prices):
+        """Queue one day's ``prices`` tuple at ``location`` for the ranges."""
+        if self.shared:
+            self._own()
+        self.pending.append((location, prices))
+        if len(self.pending) >= self.FOLD_BATCH:
+            self.fold()
+
+    def fold(self):
+        """Fold the queued prices into the per-borough ranges, one pass per borough."""
+        if not self.pending:
+            return
+        if self.shared:
+            self._own()
+        queued = {}
+        for location, prices in self.pending:
+            queued.setdefault(location, []).append(prices)
+        self.pending.clear()
+        for location, rows in queued.items():
+            if not self.samples[location]:
+                self.lows[location] = self.highs[location] = rows[0]
+                self.totals[location] = (0,) * len(rows[0])
+            self.lows[location] = tuple(map(min, self.lows[location], *rows))
+            self.highs[location] = tuple(map(max, self.highs[location], *rows))
+            self.totals[location] = tuple(map(sum, zip(self.totals[location], *rows)))
+            self.samples[location] += len(rows)
+
+    def patrol(self, location, raided):
+        """Count a day at ``location`` that could have brought the police, and whether it did."""
+        if self.shared:
+            self._own()
+        self.days[location] += 1
+        if raided:
+            self.raids[location] += 1
+
+    def bought(self, drug, cost):
+        if self.shared:
+            self._own()
+        self.basis[drug] += cost
+
+    def sold(self, drug, amount, held, revenue):
+        """Realize the profit on ``amount`` of the ``held`` units of ``drug``, at their average cost."""
+        if self.shared:
+            self._own()
+        cost = self.basis[drug] * amount // held
+        self.basis[drug] -= cost
+        self.realized += revenue - cost
+
+    def lost(self, drug):
+        """Write off the cost of a drug the police took."""
+        if self.shared:
+            self._own()
+        self.realized -= self.basis[drug]
+        self.basis[drug] = 0
+
+    def mean_prices(self, location):
+        samples = self.samples[location]
+        return tuple(total // samples for total in self.totals[location])
+
+
+class GameState:
+    """The player's state as slotted fields with integer-indexed drugs and locations.
+
+    Supports ``state['cash']``-style access for existing callers; ``fork``
+    copies it in constant time, sharing turn history and memory copy-on-write.
+    """
+
+    __slots__ = ("day", "cash", "debt", "loan_due_date", "inventory", "location_index", "bank",
+                 "jail_time", "turns_in_location", "turn_history", "memory", "world")
+
+    KEYS = ("day", "cash", "debt", "loan_due_date", "inventory", "location", "bank",
+            "jail_time", "turns_in_location", "turn_history")
+
+    def __init__(self, location=None, world=None):
+        self.world = world or DEFAULT_WORLD
+        self.day = 1
+        self.cash = STARTING_CASH
+        self.debt = 0
+        self.loan_due_date = None
+        self.inventory = DrugTable(world=self.world)
+        self.location_index = self.world.location_index[location] if location else 0
+        self.bank = 0
+        self.jail_time = 0
+        self.turns_in_location = 0
+        self.turn_history = TurnHistory()
+        self.memory = GameMemory(self.world)
+
+    @property
+    def location(self):
+        return self.world.locations[self.location_index]
+
+    @location.setter
+    def location(self, location):
+        self.location_index = self.world.location_index[location]
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.KEYS else default
+
+    def keys(self):
+        return self.KEYS
+
+    def copy_from(self, other):
+        """Overwrite this state in place with an independent copy of ``other``."""
+        for name in self.__slots__:
+            setattr(self, name, getattr(other, name))
+        self.inventory = other.inventory.copy()
+        self.turn_history = other.turn_history.fork()
+        self.memory = other.memory.fork()
+
+    def fork(self):
+        child = GameState.__new__(GameState)
+        child.copy_from(self)
+        return child
+
+    def record_turn(self, action, result, prices, event):
+        """Append the post-action state to the turn history and the prices to the memory."""
+        prices = tuple(prices.values_)
+        self.turn_history.append(TurnRecord(self.day, action, result, event, self.cash, self.debt,
+                                            self.location_index, tuple(self.inventory.values_),
+                                            prices, self.world))
+        self.memory.observe(self.location_index, prices)
+
+    def to_dict(self):
+        """The state as the plain dict it used to be (for checksums and debugging)."""
+        return {"day": self.day, "cash": self.cash, "debt": self.debt, "loan_due_date": self.loan_due_date,
+                "inventory": self.inventory.to_dict(), "location": self.location, "bank": self.bank,
+                "jail_time": self.jail_time, "turns_in_location": self.turns_in_location,
+                "turn_history": self.turn_history.to_list()}
+
+
+def new_game_state(rng, world=None):
+    """Create a fresh game state with a random starting location."""
+    world = world or DEFAULT_WORLD
+    return GameState(location=rng.choice(world.locations), world=world)
+
+
+class GameEngine:
+    """A single Drug Wars game with its own state, prices and RNG.
+
+    The engine never renders or sleeps. Decisions are supplied by callables:
+    ``choose_action(engine, last_event)`` returns an action dict matching
+    ``world.action_schema`` and ``choose_police(engine, options)`` returns one
+    of ``POLICE_OPTIONS``. The world defaults to the classic one.
+    """
+
+    def __init__(self, seed=None, max_days=MAX_DAYS, world=None):
+        self.max_days = max_days
+        self.world = world or DEFAULT_WORLD
+        self.state = GameState(world=self.world)
+        self.prices = DrugTable(world=self.world)
+        self.trace = None  # Optional recorder notified at the end of every turn
+        self.checkpointer = None  # Optional checkpoint.Checkpointer, likewise
+        self.sink = None  # Optional results.TurnCollector, likewise
+        self.reset(seed)
+
+    def reset(self, seed=None, world=None):
+        """Start a new game in place, keeping the state and prices dicts shared.
+
+        Without a seed one is drawn at random, so every game can be replayed.
+        A ``world`` replaces the one the engine was created with.
+        """
+        if world is not None:
+            self.world = world
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.state.copy_from(new_game_state(self.rng, self.world))
+        self.prices.world = self.world
+        self.prices.values_[:] = self.world.opening_prices(self.state.location_index)
+        self.quit = False
+
+    def fork(self, seed=None):
+        """Copy this game into a new engine for what-if simulation.
+
+        The copy gets its own RNG seeded with ``seed`` so planners sample
+        futures instead of reading this game's actual random stream. The copy
+        takes constant time; turn history is shared copy-on-write.
+        """
+        child = GameEngine.__new__(GameEngine)
+        child.max_days = self.max_days
+        child.world = self.world
+        child.seed = seed
+        child.rng = random.Random(seed)
+        child.state = self.state.fork()
+        child.prices = self.prices.copy()
+        child.quit = self.quit
+        child.trace = None
+        child.checkpointer = None
+        child.sink = None
+        return child
+
+    def update_prices(self):
+        """Update drug prices based on random fluctuations."""
+        prices = self.prices.values_
+        floor = self.world.price_floor
+        for i, step in enumerate(self.world.volatility):
+            fluctuation = self.rng.randint(-step, step)
+            prices[i] = max(floor, prices[i] + fluctuation)
+
+    def generate_random_event(self):
+        """Generate a random event to introduce unpredictability."""
+        return self.rng.choice(RANDOM_EVENTS)
+
+    def police_roll(self):
+        """Advance the location counter and roll for a police encounter."""
+        self.state.turns_in_location += 1
+        # Only risk encounter if player has been in the same location for too long
+        raided = False
+        if self.state.turns_in_location > self.world.max_safe_turns:
+            raided = self.rng.randint(1, 100) <= self.world.police_rates[self.state.location_index]
+        self.state.memory.patrol(self.state.location_index, raided)
+        return raided
+
+    def police_options(self):
+        """Roll the fine for an encounter and describe the available options."""
+        fine = self.rng.randint(100, 500)
+        options = {
+            "pay_fine": f"Pay a fine of ${fine}",
+            "lose_inventory": "Lose all of a random drug in your inventory",
+            "go_to_jail": "Go to jail for 1-2 days, keeping inventory and cash intact",
+            "bribe": f"Bribe the official for ${BRIBE_AMOUNT}"
+        }
+        return fine, options
+
+    def resolve_police(self, decision, fine):
+        """Apply the chosen law enforcement option and return a message."""
+        state = self.state
+        if decision == "pay_fine":
+            state.cash = max(0, state.cash - fine)
+            return f"You paid a fine of ${fine}."
+        elif decision == "lose_inventory":
+            if any(state.inventory.values()):
+                drug_to_lose = self.rng.choice([drug for drug, qty in state.inventory.items() if qty > 0])
+                lost_amount = state.inventory[drug_to_lose]
+                state.inventory[drug_to_lose] = 0
+                state.memory.lost(self.world.drug_index[drug_to_lose])
+                return f"You lost {lost_amount} units of {drug_to_lose}."
+            else:
+                state.cash = max(0, state.cash - fine)
+                return f"No inventory to lose. You paid a fine of ${fine} instead."
+        elif decision == "go_to_jail":
+            jail_days = self.rng.randint(1, 2)
+            state.jail_time = jail_days
+            return f"You've been sent to jail for {jail_days} days."
+        elif decision == "bribe":
+            if state.cash >= BRIBE_AMOUNT:
+                state.cash -= BRIBE_AMOUNT
+                return f"You successfully bribed the official for ${BRIBE_AMOUNT}."
+            else:
+                state.jail_time = 1
+                return "Bribe attempt failed due to insufficient funds. You've been sent to jail for 1 day."
+        else:
+            # Default to jail if something goes wrong
+            state.jail_time = 1
+            return "Unexpected response. You've been sent to jail for 1 day."
+
+    def law_enforcement_encounter(self, choose_police):
+        """Determine if the player encounters law enforcement and handle the encounter."""
+        if not self.police_roll():
+            return None
+        fine, options = self.police_options()
+        return self.resolve_police(choose_police(self, options), fine)
+
+    def process_action(self, action_data):
+        """Apply an action dict to the game state and return a result message."""
+        state = self.state
+        world = self.world
+        action = action_data.get("action")
+        message = ""
+
+        if state.jail_time > 0:
+            message = f"You are in jail for {state.jail_time} more days. You cannot perform actions."
+            state.jail_time -= 1
+            return message
+
+        if action == "buy":
+            drug = action_data.get("drug_type")
+            amount = action_data.get("amount", 0)
+            index = world.drug_index.get(drug)
+            if index is None:
+                return "Invalid or missing drug type."
+            if not isinstance(amount, int) or amount < 1:
+                return "Invalid amount."
+            cost = self.prices.values_[index] * amount
+            if state.cash >= cost:
+                state.cash -= cost
+                state.inventory.values_[index] += amount
+                state.memory.bought(index, cost)
+                message = f"Bought {amount} units of {drug} for ${cost}."
+            else:
+                message = "Insufficient funds to complete the purchase."
+
+        elif action == "sell":
+            drug = action_data.get("drug_type")
+            amount = action_data.get("amount", 0)
+            index = world.drug_index.get(drug)
+            if index is None:
+                return "Invalid or missing drug type."
+            if not isinstance(amount, int) or amount < 1:
+                return "Invalid amount."
+            if state.inventory.values_[index] >= amount:
+                revenue = self.prices.values_[index] * amount
+                state.memory.sold(index, amount, state.inventory.values_[index], revenue)
+                state.cash += revenue
+                state.inventory.values_[index] -= amount
+                message = f"Sold {amount} units of {drug} for ${revenue}."
+            else:
+                message = f"Not enough {drug} to sell."
+
+        elif action == "travel":
+            location = action_data.get("location")
+            state.turns_in_location = 0  # Reset turns in location when traveling
+            destination = world.location_index.get(location)
+            if destination is None:
+                return "Invalid or missing location."
+            if destination == state.location_index:
+                message = "You are already in that location."
+            else:
+                fare = world.travel_costs[state.location_index][destination]
+                if state.cash >= fare:
+                    state.cash -= fare
+                    self.reprice(state.location_index, destination)
+                    state.location_index = destination
+                    message = f"Traveled to {location} for ${fare}."
+                else:
+                    message = "Insufficient funds to travel."
+
+        elif action == "loan":
+            amount = action_data.get("amount", 0)
+            if not isinstance(amount, int) or amount < 1:
+                return "Invalid loan amount."
+            if amount > MAX_LOAN_AMOUNT:
+                return f"Loan amount exceeds the maximum of ${MAX_LOAN_AMOUNT}."
+            if state.debt > 0:
+                return "You already have an outstanding loan. Repay it first."
+            state.cash += amount
+            state.debt = amount
+            state.loan_due_date = state.day + LOAN_DURATION
+            message = f"Borrowed ${amount}. Repay ${amount + int(amount * LOAN_INTEREST_RATE)} by day {state.loan_due_date}."
+
+        elif action == "repay":
+            amount = action_data.get("amount", 0)
+            if not isinstance(amount, int) or amount < 1:
+                return "Invalid repayment amount."
+            total_due = state.debt + int(state.debt * LOAN_INTEREST_RATE)
+            repayment = min(amount, total_due, state.cash)
+            state.debt -= repayment
+            state.cash -= repayment
+            if state.debt <= 0:
+                state.debt = 0
+                state.loan_due_date = None
+                message = f"Loan fully repaid. You paid ${repayment}."
+            else:
+                message = f"Repaid ${repayment}. Remaining debt: ${state.debt}."
+
+        elif action == "bank":
+            sub_action = action_data.get("sub_action")
+            amount = action_data.get("amount", 0)
+            if sub_action == "deposit":
+                if not isinstance(amount, int) or amount < 1 or amount > state.cash:
+                    return "Invalid deposit amount."
+                state.cash -= amount
+                state.bank += amount
+                message = f"Deposited ${amount} to the bank."
+            elif sub_action == "withdraw":
+                if not isinstance(amount, int) or amount < 1 or amount > state.bank:
+                    return "Invalid withdrawal amount."
+                state.bank -= amount
+                state.cash += amount
+                message = f"Withdrew ${amount} from the bank."
+            else:
+                return "Invalid or missing sub_action for bank."
+
+        elif action == "quit":
+            message = "You have chosen to quit the game."
+            self.quit = True
+
+        else:
+            message = "Unknown action."
+
+        return message
+
+    def reprice(self, origin, destination):
+        """Move prices from one borough's level to another's, in worlds with price modifiers."""
+        modifiers = self.world.price_modifiers
+        if modifiers is None:
+            return
+        prices, floor = self.prices.values_, self.world.price_floor
+        for i, (before, after) in enumerate(zip(modifiers[origin], modifiers[destination])):
+            prices[i] = max(floor, round(prices[i] * after / before))
+
+    def update_loan_status(self):
+        """Check if loan is due and apply penalties if not repaid."""
+        state = self.state
+        if state.loan_due_date and state.day >= state.loan_due_date:
+            penalty = int(state.debt * 0.5)  # 50% penalty
+            state.debt += penalty
+            state.loan_due_date += LOAN_DURATION  # Extend the due date
+            return f"Loan not repaid on time! A penalty of ${penalty} has been added to your debt. New total debt: ${state.debt}. New due date: Day {state.loan_due_date}."
+        return None
+
+    def state_snapshot(self):
+        """The post-action state as stored in the turn history, as a dict."""
+        state = self.state
+        return {"cash": state.cash, "debt": state.debt, "location": state.location,
+                "inventory": {drug: qty for drug, qty in state.inventory.items() if qty > 0}}
+
+    def prices_snapshot(self):
+        return self.prices.to_dict()
+
+    def update_turn_history(self, action, result, state_snapshot=None, prices=None, event=None):
+        """Record the current post-action state and prices in the turn history.
+
+        The snapshot arguments are accepted for the old dict-based API and
+        ignored; the record is always taken from the live state.
+        """
+        self.state.record_turn(action, result, self.prices, event)
+
+    def total_assets(self):
+        state = self.state
+        return (
+            state.cash +
+            state.bank +
+            sum(qty * price for qty, price in zip(state.inventory.values_, self.prices.values_)) -
+            state.debt
+        )
+
+    def checksum(self):
+        """Stable digest of the full game state and prices."""
+        payload = json.dumps([self.state.to_dict(), self.prices.to_dict(), self.quit],
+                             sort_keys=True, separators=(",", ":"))
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def is_over(self):
+        return self.quit or self.state.day > self.max_days
+
+    def open_turn(self):
+        """Roll the day's event and loan status and return a new turn dict.
+
+        ``turn['last_event']`` is the context the agent should see when
+        choosing its action.
+        """
+        event = self.generate_random_event()
+        return {"day": self.state.day, "event": event, "last_event": event,
+                "loan": self.update_loan_status(), "police": None, "police_decision": None,
+                "jailed": False, "action": None, "message": None}
+
+    def police_encounter(self, turn, decision, fine):
+        """Resolve an encounter rolled by ``police_roll`` and record it on the turn."""
+        police_message = self.resolve_police(decision, fine)
+        turn['police_decision'] = decision
+        turn['police'] = police_message
+        turn['last_event'] = police_message
+        return police_message
+
+    def begin_turn(self, choose_police):
+        """Open the turn and settle any police encounter."""
+        turn = self.open_turn()
+        if self.police_roll():
+            fine, options = self.police_options()
+            self.police_encounter(turn, choose_police(self, options), fine)
+        return turn
+
+    def end_turn(self, turn, action_data):
+        """Apply the chosen action (if any), record history and advance the day."""
+        state = self.state
+        # Jail skips the action entirely, as does an agent that failed to answer
+        if state.jail_time > 0:
+            turn['jailed'] = True
+            state.jail_time -= 1
+            state.day += 1
+        elif not action_data:
+            state.day += 1
+        else:
+            message = self.process_action(action_data)
+            turn['action'] = action_data
+            turn['message'] = message
+            if not self.quit:
+                state.record_turn(action_data['action'], message, self.prices, turn['event'])
+                self.update_prices()
+                state.day += 1
+
+        if self.trace:
+            self.trace.record_turn(self, turn)
+        if self.checkpointer:
+            self.checkpointer.after_turn(self)
+        if self.sink:
+            self.sink.record_turn(self, turn)
+        return turn
+
+    def step(self, choose_action, choose_police):
+        """Play one full day and return the turn dict."""
+        turn = self.begin_turn(choose_police)
+        action_data = None
+        if self.state.jail_time == 0:
+            action_data = choose_action(self, turn['last_event'])
+        return self.end_turn(turn, action_data)
+
+    def run(self, choose_action, choose_police):
+        """Play until the game ends and return the summary."""
+        while not self.is_over():
+            self.step(choose_action, choose_police)
+        return self.summary()
+
+    def summary(self):
+        state = self.state
+        return {
+            "seed": self.seed,
+            "total_assets": self.total_assets(),
+            "days_survived": state.day - 1,
+            "cash": state.cash,
+            "bank": state.bank,
+            "debt": state.debt,
+            "quit": self.quit
+        }
@@ -0,0 +1,153 @@
+import time
+
+from metrics import metrics
+from prompts import MODEL
+
+
+class JSONObjectScanner:
+    """Finds the end of the first top-level JSON object in streamed text.
+
+    Each character is examined once, tracking string and escape state so
+    braces inside strings do not count.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        self.start = None
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk):
+        """Add streamed text; return the complete object text once it closes."""
+        self.text += chunk
+        text = self.text
+        while self.pos < len(text):
+            char = text[self.pos]
+            self.pos += 1
+            if self.start is None:
+                if char == "{":
+                    self.start = self.pos - 1
+                    self.depth = 1
+                continue
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    return text[self.start:self.pos]
+        return None
+
+
+class KeywordScanner:
+    """Stops a stream as soon as one of ``keywords`` has appeared in full."""
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self.text = ""
+
+    def feed(self, chunk):
+        self.text += chunk.lower()
+        found = [(self.text.find(keyword), keyword) for keyword in self.keywords if keyword in self.text]
+        return min(found)[1] if found else None
+
+
+def _stats(start, first_token, usage, estimate, early_stop):
+    """Build the per-call stats dict and record it in the metrics registry."""
+    stats = {
+        "prompt_tokens": usage.prompt_tokens if usage else None,
+        "completion_tokens": usage.completion_tokens if usage else None,
+        "estimated_prompt_tokens": estimate,
+        "ttft": None if first_token is None else first_token - start,
+        "latency": time.perf_counter() - start,
+        "early_stop": early_stop
+    }
+    metrics.observe("llm_request_seconds", stats['latency'])
+    if stats['ttft'] is not None:
+        metrics.observe("llm_ttft_seconds", stats['ttft'])
+    prompt_tokens = stats['prompt_tokens'] if stats['prompt_tokens'] is not None else estimate
+    metrics.inc("prompt_tokens_total", prompt_tokens or 0)
+    metrics.inc("completion_tokens_total", stats['completion_tokens'] or 0)
+    if early_stop:
+        metrics.inc("llm_early_stops_total")
+    return stats
+
+
+def _stream_kwargs(model, messages, kwargs):
+    return dict(model=model, messages=messages, temperature=0.5, stream=True,
+                stream_options={"include_usage": True}, **kwargs)
+
+
+def complete(client, messages, estimate=None, model=MODEL, until=None, **kwargs):
+    """Stream a chat completion and return ``(text, stats)``.
+
+    With ``until`` (a scanner such as JSONObjectScanner) the stream is closed
+    as soon as the scanner reports a complete answer, which stops the server
+    generating, and that answer is returned as the text. ``stats`` holds the
+    server-reported tokens (absent after an early stop), the local prompt
+    estimate, time-to-first-token, total latency and whether it stopped early.
+    """
+    start = time.perf_counter()
+    first_token = None
+    usage = None
+    parts = []
+    stream = client.chat.completions.create(**_stream_kwargs(model, messages, kwargs))
+    try:
+        for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                content = chunk.choices[0].delta.content
+                if first_token is None:
+                    first_token = time.perf_counter()
+                parts.append(content)
+                if until is not None:
+                    answer = until.feed(content)
+                    if answer is not None:
+                        return answer, _stats(start, first_token, usage, estimate, True)
+    finally:
+        stream.close()
+    return "".join(parts), _stats(start, first_token, usage, estimate, False)
+
+
+async def acomplete(client, messages, estimate=None, model=MODEL, until=None, **kwargs):
+    """Async counterpart of ``complete`` for an ``AsyncOpenAI`` client."""
+    start = time.perf_counter()
+    first_token = None
+    usage = None
+    parts = []
+    stream = await client.chat.completions.create(**_stream_kwargs(model, messages, kwargs))
+    try:
+        async for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                content = chunk.choices[0].delta.content
+                if first_token is None:
+                    first_token = time.perf_counter()
+                parts.append(content)
+                if until is not None:
+                    answer = until.feed(content)
+                    if answer is not None:
+                        return answer, _stats(start, first_token, usage, estimate, True)
+    finally:
+        await stream.close()
+    return "".join(parts), _stats(start, first_token, usage, estimate, False)
+
+
+def format_stats(stats):
+    """One-line report of a call's prompt size and latency."""
+    tokens = stats['prompt_tokens'] if stats['prompt_tokens'] is not None else f"~{stats['estimated_prompt_tokens']}"
+    ttft = f"{stats['ttft']:.2f}s" if stats['ttft'] is not None else "n/a"
+    early = " (stopped early)" if stats['early_stop'] else ""
+    return f"prompt tokens: {tokens}, time to first token: {ttft}, total: {stats['latency']:.2f}s{early}"
@@ -0,0 +1,157 @@
+import argparse
+import hashlib
+import json
+import time
+
+import numpy as np
+
+from engine import LOCATIONS, MAX_DAYS
+from vecsim import BASE_PRICES, DRUGS, SELL, TRAVEL, VectorSim, cheapest_police_option, heuristic_policy
+
+
+class SharedMarket(VectorSim):
+    """Many traders in one world, trading in per-location markets that react to them.
+
+    Each borough has its own price for each drug, starting from the base price
+    scaled by a fixed per-borough modifier (within ``location_spread``).
+    Orders are aggregated once per tick per (borough, drug) and the net flow
+    moves the price by ``exp(impact * net / depth)`` before they all fill,
+    so buying pushes prices up and selling pushes them down. Prices also
+    take a random step and revert by
+    ``reversion`` of the gap to their anchor each day. ``depth`` is the
+    market size in units per trader present on an average borough, so impact
+    stays comparable as the population grows.
+
+    Crowding is a borough's headcount relative to an even spread. Travel
+    into a borough costs ``travel_cost * (1 + travel_crowding * (crowding - 1))``
+    (never below half the fare) and police encounter chances scale by
+    ``crowding ** heat_crowding``. Everything is drawn from one seeded
+    generator and aggregated order-independently, so a seed fixes the run.
+    """
+
+    def __init__(self, n_traders, seed=None, economy=None, max_days=MAX_DAYS, impact=0.5, depth=100,
+                 reversion=0.05, location_spread=0.2, travel_crowding=1.0, heat_crowding=1.0):
+        super().__init__(n_traders, seed, economy, max_days)
+        self.impact = impact
+        self.depth = depth * max(1.0, n_traders / len(LOCATIONS))
+        self.reversion = reversion
+        self.travel_crowding = travel_crowding
+        self.heat_crowding = heat_crowding
+        modifiers = 1 + self.rng.uniform(-location_spread, location_spread, (len(LOCATIONS), len(DRUGS)))
+        self.anchor = BASE_PRICES * modifiers
+        self.market = np.rint(self.anchor).astype(np.int64)  # (locations x drugs)
+        self.volume = np.zeros(self.market.shape)  # units traded in each market on the last tick
+        self.prices = self.market[self.location]
+
+    def crowding(self):
+        """Traders in each borough relative to an even spread, shape (locations,)."""
+        present = np.bincount(self.location[~self.done], minlength=len(LOCATIONS))
+        return present * len(LOCATIONS) / max(1, present.sum())
+
+    def police_chance(self):
+        chance = self.economy.police_chance * self.crowding()[self.location] ** self.heat_crowding
+        return np.minimum(1.0, chance)
+
+    def travel_cost(self, destination):
+        surcharge = self.travel_crowding * (self.crowding()[destination] - 1)
+        return np.rint(self.economy.travel_cost * np.maximum(0.5, 1 + surcharge)).astype(np.int64)
+
+    def clearing_prices(self, drug, trade, posted):
+        """Clear each (borough, drug) market as one batch at the price its net flow moves it to.
+
+        Orders are summed with one bincount per tick rather than per trader,
+        so the order traders are processed in cannot change the result, and
+        every trade in a market fills at the same price. That price becomes
+        the market's new level, so a trader cannot profit from the move their
+        own order caused.
+        """
+        cell = self.location * len(DRUGS) + drug
+        flow = np.bincount(cell, weights=trade, minlength=self.market.size)
+        pressure = np.clip(self.impact * flow / self.depth, -1.0, 1.0)
+        shape = self.market.shape
+        cleared = np.maximum(self.economy.price_floor, np.rint(self.market.ravel() * np.exp(pressure)))
+        self.market = cleared.astype(np.int64).reshape(shape)
+        self.volume = np.bincount(cell, weights=np.abs(trade), minlength=self.market.size).reshape(shape)
+        return self.market.ravel()[cell]
+
+    def update_prices(self, mask):
+        """Move every borough's prices by a random step and reversion, then reprice traders."""
+        eco = self.economy
+        step = self.rng.integers(-eco.price_step, eco.price_step + 1, self.market.shape)
+        market = self.market + step + self.reversion * (self.anchor - self.market)
+        self.market = np.maximum(eco.price_floor, np.rint(market)).astype(np.int64)
+        self.prices = self.market[self.location]
+
+    def checksum(self):
+        """Digest of every trader and market array, for checking that a seed reproduces a run."""
+        digest = hashlib.sha1()
+        for array in (self.market, self.cash, self.bank, self.debt, self.inventory, self.location, self.jail):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+
+def arbitrage_policy(sim):
+    """Scripted trader for a shared market: carry holdings to the borough that pays most for them.
+
+    When selling a holding in the best-paying borough would beat selling it
+    here by more than two fares, travel there and sell on arrival; otherwise
+    trade like ``heuristic_policy``.
+    """
+    action = heuristic_policy(sim)
+    best_price = sim.market.max(axis=0)  # best price per drug anywhere
+    best_place = sim.market.argmax(axis=0)
+    gain = (best_price[None, :] - sim.prices) * sim.inventory  # extra revenue from selling in the best borough
+    drug = gain.argmax(axis=1)
+    worth_moving = gain[sim.rows, drug] > 2 * sim.economy.travel_cost
+    elsewhere = best_place[drug] != sim.location
+    travel = worth_moving & elsewhere & (action["action"] != SELL) & (sim.cash >= sim.economy.travel_cost)
+    # Sell on arrival, once this borough is the best market for the holding
+    sell = worth_moving & ~elsewhere
+    kind = np.where(travel, TRAVEL, np.where(sell, SELL, action["action"]))
+    return {"action": kind,
+            "drug": np.where(sell, drug, action["drug"]),
+            "amount": np.where(sell, sim.inventory[sim.rows, drug], action["amount"]),
+            "location": np.where(travel, best_place[drug], action["location"])}
+
+
+def run(n_traders, days, seed, policy=arbitrage_policy, **market):
+    """Play a shared market to the end and report traders, prices and crowding."""
+    sim = SharedMarket(n_traders, seed=seed, max_days=days, **market)
+    start = time.perf_counter()
+    assets = sim.run(policy, cheapest_police_option)
+    seconds = time.perf_counter() - start
+    people = np.bincount(sim.location, minlength=len(LOCATIONS))
+    return {
+        "traders": n_traders,
+        "days": days,
+        "seconds": seconds,
+        "trader_days_per_second": n_traders * (sim.day - 1) / seconds,
+        "mean_assets": float(assets.mean()),
+        "median_assets": float(np.median(assets)),
+        "in_debt": int((sim.debt > 0).sum()),
+        "prices": {location: dict(zip(DRUGS, map(int, row))) for location, row in zip(LOCATIONS, sim.market)},
+        "traders_per_location": dict(zip(LOCATIONS, map(int, people))),
+        "checksum": sim.checksum(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many traders in one shared Drug Wars market.")
+    parser.add_argument("--traders", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=MAX_DAYS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--impact", type=float, default=0.5, help="Price move per unit of net flow over depth")
+    parser.add_argument("--depth", type=float, default=100, help="Market depth in units per trader present")
+    parser.add_argument("--reversion", type=float, default=0.05, help="Daily pull back towards the anchor price")
+    parser.add_argument("--travel-crowding", type=float, default=1.0)
+    parser.add_argument("--heat-crowding", type=float, default=1.0)
+    parser.add_argument("--policy", choices=["arbitrage", "heuristic"], default="arbitrage")
+    args = parser.parse_args()
+    policy = arbitrage_policy if args.policy == "arbitrage" else heuristic_policy
+    print(json.dumps(run(args.traders, args.days, args.seed, policy, impact=args.impact, depth=args.depth,
+                         reversion=args.reversion, travel_crowding=args.travel_crowding,
+                         heat_crowding=args.heat_crowding), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+
+import checkpoint
+import drugwairs
+from agents import AGENTS
+from engine import GameEngine, load_world
+from metrics import metrics, profiled
+from recorder import TraceRecorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="An autonomous game of Drug Wars played by a local LLM.")
+    parser.add_argument("--base-url", action="append", help="Model server endpoint; repeat to spread load over several")
+    parser.add_argument("--cache", metavar="PATH", help="Reuse model decisions for similar states, stored in this SQLite file")
+    parser.add_argument("--agent", choices=sorted(AGENTS), default="llm", help="Who plays the game")
+    parser.add_argument("--seed", type=int, help="Seed the game so it can be reproduced")
+    parser.add_argument("--record", metavar="PATH", help="Write a replayable .jsonl.gz trace of the game")
+    parser.add_argument("--metrics", metavar="PATH", help="Export timings and counters at exit (.json, else Prometheus text)")
+    parser.add_argument("--profile", metavar="PATH", help="Run under cProfile and dump the stats to this file")
+    parser.add_argument("--risk", choices=["decide", "hint"],
+                        help="Simulate police and loan outcomes: decide encounters without the model, or hint the model")
+    parser.add_argument("--checkpoint", metavar="PATH", help="Save the game to this file every turn so it can be resumed")
+    parser.add_argument("--checkpoint-every", type=int, default=1, help="Turns between checkpoints")
+    parser.add_argument("--resume", metavar="PATH", help="Continue the game saved in this checkpoint file")
+    parser.add_argument("--results", metavar="PATH", help="Append per-turn and per-game records to this SQLite results file")
+    parser.add_argument("--tick-rate", type=float, default=1.0, help="Maximum turns per second to watch at (0 = as fast as possible)")
+    parser.add_argument("--fps", type=float, default=4, help="Dashboard redraws per second, whatever the tick rate")
+    parser.add_argument("--quiet", action="store_true", help="Show and print nothing; use --results or --metrics for output")
+    parser.add_argument("--world", metavar="PATH", help="Play in the drugs and map of this JSON world config")
+    args = parser.parse_args()
+    if args.resume and args.record:
+        parser.error("traces replay from the first day, so --record cannot be combined with --resume")
+    if args.world and args.risk:
+        parser.error("the risk simulator only models the classic world, so --risk cannot be combined with --world")
+
+    world = load_world(args.world) if args.world else None
+    drugwairs.configure(args.base_url, args.cache, args.risk, world)
+    engine = GameEngine(seed=args.seed, world=world)
+    if args.resume:
+        checkpoint.load(args.resume, engine)
+    if args.checkpoint or args.resume:
+        engine.checkpointer = checkpoint.Checkpointer(args.checkpoint or args.resume, args.checkpoint_every,
+                                                      meta={"agent": args.agent})
+    recorder = TraceRecorder(args.record, engine) if args.record else None
+    if args.results:
+        from results import ResultsSink
+        engine.sink = ResultsSink(args.results, agent=args.agent)
+    agent = AGENTS[args.agent]()
+    try:
+        if args.profile:
+            with profiled(args.profile):
+                drugwairs.main(engine, agent, args.tick_rate, args.fps, args.quiet)
+        else:
+            drugwairs.main(engine, agent, args.tick_rate, args.fps, args.quiet)
+    finally:
+        drugwairs.pool.close()
+        if recorder:
+            recorder.close(engine)
+        if engine.sink:
+            if engine.is_over():
+                engine.sink.record_game(dict(engine.summary(), agent=args.agent), engine)
+            engine.sink.close()
+        if args.metrics:
+            metrics.write(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
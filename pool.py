@@ -0,0 +1,246 @@
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from llm import acomplete, complete
+from metrics import metrics
+
+DEFAULT_ENDPOINT = 'http://localhost:11434/v1'  # Ollama's default API endpoint
+
+
+class NoHealthyEndpoint(Exception):
+    """Raised when every endpoint's circuit is open."""
+
+
+class CircuitBreaker:
+    """Per-endpoint breaker: closed, open after repeated failures, then half-open.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and the
+    endpoint gets no traffic for ``reset_timeout`` seconds. It then goes
+    half-open: one trial request is let through, which closes the circuit on
+    success or reopens it on failure.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allows(self):
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.trial)
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def record_failure(self):
+        """Count a failure; return True if this opened (or reopened) the circuit."""
+        self.failures += 1
+        trial, self.trial = self.trial, False
+        # A failed half-open trial reopens; late failures of requests already in flight do not
+        if trial or (self.opened_at is None and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+
+class Endpoint:
+    """One model server with lazily created keep-alive sync and async clients."""
+
+    def __init__(self, base_url, api_key, max_connections, timeout, breaker):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.breaker = breaker
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self._client = None
+        self._aclient = None
+
+    @property
+    def limits(self):
+        import httpx
+        return httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+
+    # Retries are the pool's job, so the SDK's own are disabled: a dead server
+    # must surface as a failure to the breaker, not as a long silent stall.
+    # openai and httpx are imported here, on first use, to keep importing the
+    # game cheap for processes that never talk to a model.
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+            from openai import OpenAI
+            self._client = OpenAI(base_url=self.base_url, api_key=self.api_key, max_retries=0,
+                                  http_client=httpx.Client(limits=self.limits, timeout=self.timeout))
+        return self._client
+
+    @property
+    def aclient(self):
+        if self._aclient is None:
+            import httpx
+            from openai import AsyncOpenAI
+            self._aclient = AsyncOpenAI(base_url=self.base_url, api_key=self.api_key, max_retries=0,
+                                        http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout))
+        return self._aclient
+
+    def status(self):
+        return {"base_url": self.base_url, "circuit": self.breaker.state, "in_flight": self.in_flight,
+                "requests": self.requests, "errors": self.errors}
+
+
+def is_endpoint_failure(error):
+    """Whether an error says something about the server's health.
+
+    Client errors (bad request, unknown model) would fail anywhere and do not
+    count against the endpoint; overload (429) and server errors do.
+    """
+    try:
+        from openai import APIStatusError  # Already loaded by the client that raised
+    except ImportError:
+        return False  # No client could be made, which says nothing about the server
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return True
+
+
+class ClientPool:
+    """Routes chat completions across several OpenAI-compatible model servers.
+
+    Each request goes to the endpoint with the fewest requests in flight
+    (ties go to the one used least), skipping endpoints whose circuit is
+    open. Connections are pooled and kept alive per endpoint. The pool is
+    safe to share between threads and between tasks on one event loop.
+    """
+
+    def __init__(self, endpoints=(DEFAULT_ENDPOINT,), api_key='ollama', max_connections=16, timeout=120.0,
+                 failure_threshold=3, reset_timeout=30.0, seed=None):
+        if not endpoints:
+            raise ValueError("ClientPool needs at least one endpoint")
+        self.endpoints = [Endpoint(url, api_key, max_connections, timeout,
+                                   CircuitBreaker(failure_threshold, reset_timeout))
+                          for url in endpoints]
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+
+    def acquire(self):
+        """Reserve the least-loaded healthy endpoint; pair with ``release``."""
+        with self.lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.breaker.allows()]
+            if not candidates:
+                metrics.inc("pool_rejections_total")
+                raise NoHealthyEndpoint(f"All {len(self.endpoints)} model endpoints are unavailable")
+            endpoint = min(candidates, key=lambda e: (e.in_flight, e.requests))
+            if endpoint.breaker.state == "half_open":
+                endpoint.breaker.trial = True
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint, error=None):
+        """Return an endpoint reserved by ``acquire``, with the request's error if it failed."""
+        with self.lock:
+            endpoint.in_flight -= 1
+            if error is not None and not isinstance(error, Exception):
+                # Cancelled or interrupted: nothing learned about the server, but a half-open trial may go again
+                endpoint.breaker.trial = False
+                return
+            if error is None or not is_endpoint_failure(error):
+                endpoint.breaker.record_success()
+                return
+            endpoint.errors += 1
+            metrics.inc("endpoint_errors_total")
+            if endpoint.breaker.record_failure():
+                metrics.inc("circuit_opens_total")
+
+    def complete(self, messages, estimate=None, **kwargs):
+        """``llm.complete`` on the least-loaded healthy endpoint."""
+        endpoint = self.acquire()
+        error = None
+        try:
+            return complete(endpoint.client, messages, estimate, **kwargs)
+        except BaseException as e:  # Including cancellation, which must still free the slot
+            error = e
+            raise
+        finally:
+            self.release(endpoint, error)
+
+    async def acomplete(self, messages, estimate=None, **kwargs):
+        """``llm.acomplete`` on the least-loaded healthy endpoint."""
+        endpoint = self.acquire()
+        error = None
+        try:
+            return await acomplete(endpoint.aclient, messages, estimate, **kwargs)
+        except BaseException as e:  # Including cancellation, which must still free the slot
+            error = e
+            raise
+        finally:
+            self.release(endpoint, error)
+
+    def backoff(self, attempt, base=0.5, cap=30.0):
+        """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)].
+
+        Jitter keeps many games that failed together from retrying in lockstep.
+        """
+        return self.rng.uniform(0, min(cap, base * 2 ** attempt))
+
+    def status(self):
+        return [endpoint.status() for endpoint in self.endpoints]
+
+    def close(self):
+        for endpoint in self.endpoints:
+            if endpoint._client is not None:
+                endpoint._client.close()
+
+    async def aclose(self):
+        for endpoint in self.endpoints:
+            if endpoint._aclient is not None:
+                await endpoint._aclient.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send test completions through a ClientPool and report endpoint health.")
+    parser.add_argument("--base-url", action="append", help="Model server endpoint; repeat for several (default: local Ollama)")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--model", default=None, help="Model name (default: prompts.MODEL)")
+    args = parser.parse_args()
+
+    pool = ClientPool(args.base_url or [DEFAULT_ENDPOINT], max_connections=args.concurrency)
+    messages = [{"role": "user", "content": "Reply with the word ok."}]
+    kwargs = {"model": args.model} if args.model else {}
+
+    def probe(_):
+        try:
+            pool.complete(messages, max_tokens=4, **kwargs)
+            return True
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        ok = sum(executor.map(probe, range(args.requests)))
+    print(json.dumps({"ok": ok, "failed": args.requests - ok, "seconds": time.perf_counter() - start,
+                      "endpoints": pool.status()}, indent=2))
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
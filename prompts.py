@@ -0,0 +1,332 @@
+import json
+
+from metrics import metrics
+from engine import ACTIONS, BANK_ACTIONS, DEFAULT_WORLD, MAX_PLAN_STEPS
+from repair import repair_action, repair_plan
+
+MODEL = "hermes3"  # Replace with your specific model name if different
+RECENT_TURNS = 2  # History lines replayed in full; older turns are only in the memory digest
+
+ACTION_SYSTEM_PROMPT_TEMPLATE = (
+    "You are an AI player in a Drug Wars game. Your goal is to maximize profits and avoid legal trouble. "
+    "Make strategic decisions about buying and selling drugs, managing finances, and traveling between locations. "
+    "Analyze the current game state, drug prices, and recent events to determine the best action. "
+    "Respond only with a single JSON object that strictly adheres to the following schema:\n\n"
+    "{{\n"
+    '    "action": {actions},\n'
+    '    "drug_type": {drugs},  // Required for buy/sell actions\n'
+    '    "amount": integer >= 1,  // Required for buy/sell/loan/repay actions\n'
+    '    "location": {locations},  // Required for travel action\n'
+    '    "sub_action": {bank_actions}  // Required for bank action\n'
+    "}}\n\n"
+    "Include only the necessary fields based on your chosen action. Make intelligent decisions to succeed in the game."
+)
+
+POLICE_SYSTEM_PROMPT = (
+    "You are an AI player in a Drug Wars game facing a law enforcement encounter. "
+    "Make a strategic decision based on your current game state and the options presented. "
+    "Respond only with one of the following options: pay_fine, lose_inventory, go_to_jail, or bribe.\n\n"
+    "Your current game state (NOW line) and the encounter options follow. "
+    "Choose one option based on your current situation and strategy."
+)
+
+# Static guidance shared by every action prompt; the per-turn data is appended
+# separately so this text stays byte-identical between calls
+ACTION_INSTRUCTIONS_TEMPLATE = """The game allows for the following actions:
+
+1. Buy drugs
+2. Sell drugs
+3. Travel to a new location
+4. Take out a loan
+5. Repay a loan
+6. Perform bank transactions (deposit or withdraw)
+
+Example choices to market conditions:
+
+1. If the price of a drug is low and the demand is high, buy as much as you can afford.
+2. If you are in a high-risk area, consider traveling to a safer location.
+3. If you have a large amount of cash, consider taking out a loan to expand your operations.
+4. If you are in debt, prioritize repaying the loan before making other purchases.
+5. If the price of a drug is high, sell some of your inventory to lock in profits.
+6. If you are in jail, you cannot perform any actions until you are released.
+7. If a recent event suggests market changes, adjust your buying or selling strategy accordingly.
+
+<thinking>
+Reflect on your current state: cash, debt, bank, inventory, location, drug prices and the recent event.
+
+Consider your options:
+Do you have enough cash to take your next desired action?
+Could you take out a loan to cover your expenses? Or sell some of your inventory to cover your expenses?
+If your cash is 0 or less than $100, you will need to make a frugal choice. Ensure you have enough cash to cover your expenses.
+How does the recent event affect your decision?
+Do you have a diverse inventory of drugs prior to travelling? Anything cheap you can buy and sell for a quick profit?
+Can you afford to travel or should you stay and make the most of your current locations low prices?
+</thinking>
+
+Each user message carries the game data in this format:
+MEMORY: the whole game so far: realized profit or loss from trading, and the average cost per unit of each drug you hold
+SEEN: one line per borough you have been in: days spent there, police encounters there, and the "<low>-<average>-<high>" price seen there of each drug in the order {drug_order}
+HISTORY: the last few days, oldest first, as "d<day> <action> -> <result> | <cash> debt <debt> <location> inv <inventory> | px <prices in the order {drug_order}> | <event>"
+NOW: current day, cash, debt (and loan due day), bank, location and inventory
+PRICES: current price per unit of each drug
+EVENT: the most recent event
+NOTE: feedback on your previous response, if any
+RISK: simulated costs of the loan choice in front of you, if provided
+
+Provide your response as a single JSON object, following the schema provided earlier. Do not include any explanation or additional text outside of the JSON object."""
+
+# Appended to the action prefix in plan mode; overrides the one-action reply format
+PLAN_INSTRUCTIONS = (
+    "PLAN MODE: instead of a single action, plan the next few days. Respond only with a single JSON object "
+    '{"plan": [<action>, <action>, ...]} holding 1 to ' + str(MAX_PLAN_STEPS) + " actions in the schema above, "
+    "one per day, in the order they should be taken (for example sell, travel, buy). The plan runs until it is "
+    "finished, an action fails, the police or a loan deadline intervene, or prices move sharply; you will then be "
+    "asked for a new plan."
+)
+
+
+
+def _alternatives(names):
+    return " | ".join(f'"{name}"' for name in names)
+
+
+def action_system_prompt(world):
+    """The action system prompt, with the world's drugs and locations in its schema."""
+    return ACTION_SYSTEM_PROMPT_TEMPLATE.format(actions=_alternatives(ACTIONS), drugs=_alternatives(world.drugs),
+                                                locations=_alternatives(world.locations),
+                                                bank_actions=_alternatives(BANK_ACTIONS))
+
+
+def action_instructions(world):
+    """The action guidance, with the world's drug order in the history legend."""
+    return ACTION_INSTRUCTIONS_TEMPLATE.format(drug_order="/".join(world.drugs))
+
+
+ACTION_SYSTEM_PROMPT = action_system_prompt(DEFAULT_WORLD)
+ACTION_INSTRUCTIONS = action_instructions(DEFAULT_WORLD)
+
+# world digest -> (action prefix, plan prefix); built once per world however many builders use it
+_prefixes = {}
+
+
+def prompt_prefixes(world):
+    """The static system messages for action and plan prompts in a world."""
+    cached = _prefixes.get(world.digest)
+    if cached is None:
+        action_prefix = action_system_prompt(world) + "\n\n" + action_instructions(world)
+        cached = _prefixes[world.digest] = (action_prefix, action_prefix + "\n\n" + PLAN_INSTRUCTIONS)
+    return cached
+
+
+RECONSIDER_NOTE = (
+    "Your previous action could not be completed due to insufficient funds. "
+    "Please reconsider your action based on your current financial situation. "
+    "You may want to sell some inventory, take a loan, or choose a less expensive action."
+)
+
+
+def estimate_tokens(text, chars_per_token=4):
+    """Cheap token estimate used for budgeting; the server reports the real count."""
+    return -(-len(text) // chars_per_token)
+
+
+def encode_inventory(inventory):
+    return " ".join(f"{drug}:{qty}" for drug, qty in inventory.items() if qty > 0) or "-"
+
+
+def encode_state(state):
+    """Compact one-line encoding of the current game state."""
+    loan = f" (due day {state['loan_due_date']})" if state['debt'] > 0 else ""
+    return (f"NOW day {state['day']} | cash ${state['cash']} | debt ${state['debt']}{loan} | "
+            f"bank ${state['bank']} | {state['location']} | inv {encode_inventory(state['inventory'])}")
+
+
+def encode_prices(prices):
+    return "PRICES " + " ".join(f"{drug}=${price}" for drug, price in prices.items())
+
+
+def encode_turn(turn):
+    """Compact one-line encoding of a turn_history TurnRecord."""
+    inventory = " ".join(f"{drug}:{qty}" for drug, qty in zip(turn.world.drugs, turn.inventory) if qty > 0) or "-"
+    return (f"d{turn.day} {turn.action} -> {turn.result} | "
+            f"${turn.cash} debt ${turn.debt} {turn.location} inv {inventory} | "
+            f"px {'/'.join(str(price) for price in turn.prices)} | {turn.event or '-'}")
+
+
+def encode_memory(state):
+    """MEMORY line: realized trading P&L and the average cost of the drugs held."""
+    memory = state.memory
+    held = " ".join(f"{drug}:${basis // qty}" for drug, qty, basis in
+                    zip(state.world.drugs, state.inventory.values_, memory.basis) if qty > 0) or "-"
+    return f"MEMORY realized ${memory.realized} | avg cost {held}"
+
+
+def encode_seen(memory, location, world):
+    """SEEN line of one borough: days there, police encounters and price ranges."""
+    prices = "-"
+    if memory.samples[location]:
+        prices = "/".join(f"{low}-{mean}-{high}" for low, mean, high in
+                          zip(memory.lows[location], memory.mean_prices(location), memory.highs[location]))
+    return (f"SEEN {world.locations[location]} {memory.days[location]}d police {memory.raids[location]} | "
+            f"px {prices}")
+
+
+class PromptBuilder:
+    """Builds chat messages with a byte-identical static prefix and a compact, budgeted tail.
+
+    Everything that never changes (role, rules, examples, schema, data legend)
+    lives in the system message so the server can reuse its prompt cache across
+    turns and retries. The user message carries only the changing game data:
+    a digest of the whole game from the state's GameMemory, whose size does not
+    grow with the number of days played, and the last ``recent_turns`` turns
+    in full. When the estimate exceeds ``token_budget`` the history is dropped
+    first, oldest first, then borough lines, the current one last. The schema
+    and legend in the prefix are the ``world``'s.
+    """
+
+    def __init__(self, token_budget=1536, world=None, recent_turns=RECENT_TURNS):
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.world = world or DEFAULT_WORLD
+        self.action_prefix, self.plan_prefix = prompt_prefixes(self.world)
+        self.action_prefix_tokens = estimate_tokens(self.action_prefix)
+        self.plan_prefix_tokens = estimate_tokens(self.plan_prefix)
+        self.last_estimate = 0
+        self.turn_lines = {}  # id(history entry) -> (entry, encoded line); entries never change once written
+        self.seen_lines = {}  # (location, id(price totals)) -> (totals, samples, days, raids, encoded line)
+
+    def action_messages(self, state, prices, last_event=None, attempt=0, hints=()):
+        """Build the chat messages asking the model for its next action.
+
+        ``hints`` are extra data lines (such as RISK lines) placed after the notes.
+        """
+        notes = [RECONSIDER_NOTE] if attempt > 0 else []
+        return self._game_messages(self.action_prefix, self.action_prefix_tokens, state, prices, last_event,
+                                   notes, hints)
+
+    def plan_messages(self, state, prices, last_event=None, attempt=0, reason=None, hints=()):
+        """Build the chat messages asking the model for a multi-day plan."""
+        notes = [f"New plan needed: {reason}."] if reason else []
+        if attempt > 0:
+            notes.append(RECONSIDER_NOTE)
+        return self._game_messages(self.plan_prefix, self.plan_prefix_tokens, state, prices, last_event,
+                                   notes, hints)
+
+    def _game_messages(self, prefix, prefix_tokens, state, prices, last_event, notes, hints):
+        head = []
+        tail = [encode_state(state), encode_prices(prices)]
+        if last_event:
+            tail.append(f"EVENT {last_event}")
+        tail.extend(f"NOTE {note}" for note in notes)
+        tail.extend(hints)
+        memory = encode_memory(state)
+        turns = state["turn_history"]
+        history = [self.encode_history_turn(turns[i]) for i in range(max(0, len(turns) - self.recent_turns), len(turns))]
+
+        body = "\n".join(tail)
+        used = prefix_tokens + estimate_tokens(body) + estimate_tokens(memory) + 1
+        seen = []
+        for line in self.encode_seen(state):
+            cost = estimate_tokens(line) + 1
+            if used + cost > self.token_budget:
+                break
+            seen.append(line)
+            used += cost
+        # Keep the newest history lines that fit, oldest are dropped first
+        for line in reversed(history):
+            cost = estimate_tokens(line) + 1
+            if used + cost > self.token_budget:
+                break
+            head.insert(0, line)
+            used += cost
+        if head:
+            body = "HISTORY\n" + "\n".join(head) + "\n" + body
+        body = "\n".join([memory, *seen, body])
+        self.last_estimate = prefix_tokens + estimate_tokens(body)
+        return [
+            {"role": "system", "content": prefix},
+            {"role": "user", "content": body}
+        ]
+
+    def encode_history_turn(self, turn):
+        """encode_turn, memoized so each history entry is formatted only once."""
+        cached = self.turn_lines.get(id(turn))
+        if cached is None or cached[0] is not turn:
+            if len(self.turn_lines) >= 4096:
+                self.turn_lines.clear()
+            cached = self.turn_lines[id(turn)] = (turn, encode_turn(turn))
+        return cached[1]
+
+    def encode_seen(self, state):
+        """SEEN lines of the boroughs visited, the current one first.
+
+        Only a borough whose aggregates changed since its line was last built
+        is re-encoded, which in a normal turn is just the current one.
+        """
+        memory = state.memory
+        memory.fold()
+        here = state.location_index
+        for location in [here, *range(here), *range(here + 1, len(memory.days))]:
+            days = memory.days[location]
+            if not days and not memory.samples[location]:
+                continue
+            totals, samples, raids = memory.totals[location], memory.samples[location], memory.raids[location]
+            key = (location, id(totals))
+            cached = self.seen_lines.get(key)
+            if cached is None or cached[0] is not totals or cached[1:4] != (samples, days, raids):
+                if len(self.seen_lines) >= 4096:
+                    self.seen_lines.clear()
+                cached = self.seen_lines[key] = (totals, samples, days, raids,
+                                                 encode_seen(memory, location, state.world))
+            yield cached[4]
+
+    def police_messages(self, state, options, hints=()):
+        """Build the chat messages asking the model to resolve a law enforcement encounter."""
+        options_str = "\n".join([f"{key}: {value}" for key, value in options.items()])
+        body = "\n".join([encode_state(state), "OPTIONS", options_str, *hints])
+        self.last_estimate = estimate_tokens(POLICE_SYSTEM_PROMPT) + estimate_tokens(body)
+        return [
+            {"role": "system", "content": POLICE_SYSTEM_PROMPT},
+            {"role": "user", "content": body}
+        ]
+
+
+def parse_action(content, state, prices, fixes=None):
+    """Decode, repair and validate a model action.
+
+    Raises ValueError (RepairError or a JSON decode error) if the response is
+    unusable. Any local fix-ups are appended to ``fixes`` when given.
+    """
+    with metrics.timer("json_decode_seconds"):
+        data = json.loads(content)
+    with metrics.timer("schema_validate_seconds"):
+        action_data, applied = repair_action(data, state, prices)
+    if applied:
+        metrics.inc("action_repairs_total", len(applied))
+        if fixes is not None:
+            fixes.extend(applied)
+    return action_data
+
+
+def parse_plan(content, state, prices, fixes=None):
+    """Decode, repair and validate a model plan; see parse_action.
+
+    Returns the list of actions. Only the first is fitted to the current state.
+    """
+    with metrics.timer("json_decode_seconds"):
+        data = json.loads(content)
+    with metrics.timer("schema_validate_seconds"):
+        plan, applied = repair_plan(data, state, prices)
+    if applied:
+        metrics.inc("action_repairs_total", len(applied))
+        if fixes is not None:
+            fixes.extend(applied)
+    return plan
+
+
+def parse_police_decision(content, options):
+    """Return the chosen option key, raising ValueError for anything else."""
+    decision = content.strip().lower()
+    if decision not in options:
+        raise ValueError(f"Invalid decision: {decision}")
+    return decision
@@ -0,0 +1,173 @@
+import argparse
+import gzip
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import DEFAULT_WORLD, GameEngine, World
+from prompts import parse_action, parse_police_decision
+
+TRACE_VERSION = 1
+
+
+class RecordingRandom(random.Random):
+    """random.Random that remembers every value it hands out.
+
+    All of the engine's draws (randint, choice) go through getrandbits, so
+    recording it captures the full random stream of a turn.
+    """
+
+    def __init__(self, seed=None):
+        self.draws = []
+        super().__init__(seed)
+
+    def getrandbits(self, k):
+        value = super().getrandbits(k)
+        self.draws.append(value)
+        return value
+
+    def take_draws(self):
+        draws, self.draws = self.draws, []
+        return draws
+
+
+def _recording_rng(rng):
+    recording = RecordingRandom()
+    recording.setstate(rng.getstate())
+    return recording
+
+
+class TraceMismatch(Exception):
+    """Raised when a replayed game diverges from its trace."""
+
+
+class TraceRecorder:
+    """Streams one game to an append-only, gzip-compressed JSONL trace.
+
+    The first line is a header with the seed, initial checksum and (for
+    anything but the classic world) the world config; each turn
+    then records the RNG draws, every model exchange (prompt messages and raw
+    response), the decisions taken, the turn outcome and a state checksum.
+    Attach with ``TraceRecorder(path, engine)``; call ``close()`` when done.
+    A trace holds exactly one game, so an existing file at ``path`` is replaced.
+    """
+
+    def __init__(self, path, engine, meta=None):
+        self.file = gzip.open(path, "wt")
+        self.exchanges = []
+        engine.rng = _recording_rng(engine.rng)
+        engine.trace = self
+        header = {"type": "header", "version": TRACE_VERSION, "seed": engine.seed,
+                  "max_days": engine.max_days, "checksum": engine.checksum(), "meta": meta or {}}
+        if engine.world.digest != DEFAULT_WORLD.digest:
+            header["world"] = engine.world.config
+        self._write(header)
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def exchange(self, kind, messages, raw, stats=None, cached=False):
+        """Record one model round trip (``kind`` is "action" or "police")."""
+        self.exchanges.append({"kind": kind, "messages": messages, "raw": raw,
+                               "stats": stats, "cached": cached})
+
+    def record_turn(self, engine, turn):
+        self._write({"type": "turn", "turn": turn, "draws": engine.rng.take_draws(),
+                     "exchanges": self.exchanges, "checksum": engine.checksum()})
+        self.exchanges = []
+
+    def close(self, engine=None):
+        if engine is not None:
+            self._write({"type": "summary", "summary": engine.summary()})
+            engine.trace = None
+        self.file.close()
+
+
+def read_trace(path):
+    with gzip.open(path, "rt") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _replayed_decision(kind, record, recorded, parse):
+    """Feed the last raw model response of ``kind`` back through the parser.
+
+    Turns without a usable response (agents, fallbacks) replay the recorded
+    decision directly.
+    """
+    raws = [ex['raw'] for ex in record['exchanges'] if ex['kind'] == kind]
+    if raws:
+        try:
+            decision = parse(raws[-1])
+        except ValueError:
+            return recorded
+        if decision != recorded:
+            raise TraceMismatch(f"day {record['turn']['day']}: {kind} response parses to {decision!r}, "
+                                f"trace has {recorded!r}")
+        return decision
+    return recorded
+
+
+def replay(path, verify=True):
+    """Replay a trace through the engine with no model calls and return the summary.
+
+    With ``verify`` every turn's RNG draws and state checksum are compared to
+    the trace and the first divergence raises TraceMismatch.
+    """
+    records = read_trace(path)
+    header = next(records)
+    if header.get("version") != TRACE_VERSION:
+        raise TraceMismatch(f"unsupported trace version {header.get('version')}")
+    world = World(header['world']) if 'world' in header else None
+    engine = GameEngine(seed=header['seed'], max_days=header['max_days'], world=world)
+    if verify and engine.checksum() != header['checksum']:
+        raise TraceMismatch("initial state differs")
+    engine.rng = _recording_rng(engine.rng)
+
+    for record in records:
+        if record['type'] != "turn":
+            continue
+        recorded = record['turn']
+
+        def choose_police(engine, options):
+            return _replayed_decision("police", record, recorded['police_decision'],
+                                      lambda raw: parse_police_decision(raw, options))
+
+        def choose_action(engine, last_event):
+            return _replayed_decision("action", record, recorded['action'] or {},
+                                      lambda raw: parse_action(raw, engine.state, engine.prices))
+
+        engine.step(choose_action, choose_police)
+        draws = engine.rng.take_draws()
+        if verify:
+            if draws != record['draws']:
+                raise TraceMismatch(f"day {recorded['day']}: RNG draws differ")
+            if engine.checksum() != record['checksum']:
+                raise TraceMismatch(f"day {recorded['day']}: state checksum differs")
+    return engine.summary()
+
+
+def _replay_one(path):
+    try:
+        return {"path": path, "ok": True, "summary": replay(path)}
+    except TraceMismatch as e:
+        return {"path": path, "ok": False, "error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Drug Wars traces without a model server.")
+    parser.add_argument("traces", nargs="+")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(_replay_one, args.traces))
+    for result in results:
+        print(json.dumps(result))
+    failed = sum(1 for r in results if not r['ok'])
+    print(f"{len(results) - failed}/{len(results)} traces replayed cleanly")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
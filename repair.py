@@ -0,0 +1,251 @@
+import difflib
+
+from engine import DEFAULT_WORLD, MAX_LOAN_AMOUNT, MAX_PLAN_STEPS, LOAN_INTEREST_RATE
+
+# Compiled once per world; iter_errors on a prepared validator skips per-call schema setup
+_validators = {}
+
+
+def validators(world):
+    """``(action_validator, plan_validator)`` for a world's schemas."""
+    compiled = _validators.get(world.digest)
+    if compiled is None:
+        from jsonschema.validators import validator_for  # Deferred: importing jsonschema is slow
+        compiled = _validators[world.digest] = (validator_for(world.action_schema)(world.action_schema),
+                                               validator_for(world.plan_schema)(world.plan_schema))
+    return compiled
+
+
+# Which optional fields each action uses; anything else is dropped
+ACTION_FIELDS = {
+    "buy": ("drug_type", "amount"),
+    "sell": ("drug_type", "amount"),
+    "travel": ("location",),
+    "loan": ("amount",),
+    "repay": ("amount",),
+    "bank": ("sub_action", "amount"),
+    "quit": (),
+}
+
+# Common ways models name an action that is not in the enum
+ACTION_ALIASES = {
+    "purchase": ("buy", None),
+    "move": ("travel", None),
+    "go": ("travel", None),
+    "borrow": ("loan", None),
+    "pay": ("repay", None),
+    "deposit": ("bank", "deposit"),
+    "withdraw": ("bank", "withdraw"),
+}
+
+
+class RepairError(ValueError):
+    """The response cannot be turned into a usable action and must be re-prompted."""
+
+
+def match_enum(value, choices, cutoff=0.75):
+    """Map a loosely written enum value (case, spacing, typos) onto one of ``choices``."""
+    if not isinstance(value, str):
+        return None
+    if value in choices:
+        return value
+    folded = {choice.lower().replace(" ", "").replace("_", ""): choice for choice in choices}
+    key = value.strip().lower().replace(" ", "").replace("_", "").replace("-", "")
+    if key in folded:
+        return folded[key]
+    close = difflib.get_close_matches(key, list(folded), n=1, cutoff=cutoff)
+    return folded[close[0]] if close else None
+
+
+def coerce_amount(value):
+    """Turn 10, 10.0, "10", "$1,000" into an int; None if it is not a number."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        text = value.strip().replace("$", "").replace(",", "")
+        try:
+            number = float(text)
+        except ValueError:
+            return None
+        return int(number) if number.is_integer() else None
+    return None
+
+
+def repair_action(data, state, prices, world=None):
+    """Validate a decoded model action, fixing what can be fixed locally.
+
+    Returns ``(action_data, fixes)`` where ``fixes`` lists each change made.
+    Raises RepairError when the response is unusable or infeasible even after
+    repair, which is the only case that should cost another model call.
+    With ``state=None`` only the structure is repaired; amounts are neither
+    filled in nor clamped. The world is the state's unless given.
+    """
+    world = world or getattr(state, "world", DEFAULT_WORLD)
+    properties = world.action_schema["properties"]
+    fixes = []
+    if isinstance(data, list) and len(data) == 1:
+        data = data[0]
+        fixes.append("unwrapped single-item list")
+    if not isinstance(data, dict):
+        raise RepairError("Response is not a JSON object.")
+
+    # Normalize keys, then the action itself
+    fields = {}
+    for key, value in data.items():
+        name = match_enum(key, list(properties))
+        if name is None:
+            fixes.append(f"dropped unknown field {key!r}")
+            continue
+        if name != key:
+            fixes.append(f"renamed field {key!r} to {name!r}")
+        fields[name] = value
+
+    raw_action = fields.get("action")
+    action = match_enum(raw_action, properties["action"]["enum"])
+    if action is None and isinstance(raw_action, str) and raw_action.strip().lower() in ACTION_ALIASES:
+        action, sub_action = ACTION_ALIASES[raw_action.strip().lower()]
+        if sub_action and "sub_action" not in fields:
+            fields["sub_action"] = sub_action
+    if action is None:
+        raise RepairError(f"Unknown action {raw_action!r}.")
+    if action != raw_action:
+        fixes.append(f"action {raw_action!r} -> {action!r}")
+
+    repaired = {"action": action}
+    for name in ACTION_FIELDS[action]:
+        if name in fields:
+            repaired[name] = fields[name]
+    for name in fields:
+        if name != "action" and name not in ACTION_FIELDS[action]:
+            fixes.append(f"dropped {name!r} not used by {action}")
+
+    for name in ("drug_type", "location", "sub_action"):
+        if name in repaired:
+            value = match_enum(repaired[name], properties[name]["enum"])
+            if value is None:
+                raise RepairError(f"Unknown {name} {repaired[name]!r}.")
+            if value != repaired[name]:
+                fixes.append(f"{name} {repaired[name]!r} -> {value!r}")
+            repaired[name] = value
+
+    if "amount" in repaired:
+        amount = coerce_amount(repaired["amount"])
+        if amount is None and str(repaired["amount"]).strip().lower() in ("all", "max"):
+            del repaired["amount"]  # Filled in below as the largest feasible amount
+        elif amount is None:
+            raise RepairError(f"Amount {repaired['amount']!r} is not a whole number.")
+        else:
+            if amount != repaired["amount"]:
+                fixes.append(f"amount {repaired['amount']!r} -> {amount}")
+            repaired["amount"] = amount
+
+    if state is not None:
+        _fit_to_state(repaired, state, prices, fixes, world)
+
+    errors = sorted(validators(world)[0].iter_errors(repaired), key=lambda e: list(e.path))
+    if errors:
+        raise RepairError(errors[0].message)
+    return repaired, fixes
+
+
+def _fit_to_state(action_data, state, prices, fixes, world):
+    """Fill in missing fields and clamp amounts to what the current state allows."""
+    action = action_data["action"]
+    cash = state['cash']
+
+    if action in ("buy", "sell") and "drug_type" not in action_data:
+        raise RepairError(f"Missing drug_type for {action}.")
+    if action == "travel":
+        if "location" not in action_data:
+            raise RepairError("Missing location for travel.")
+        origin = world.location_index[state['location']]
+        if cash < world.travel_costs[origin][world.location_index[action_data["location"]]]:
+            raise RepairError("Insufficient funds for the proposed action.")
+    if action == "bank" and "sub_action" not in action_data:
+        amount = action_data.get("amount", 0)
+        # Withdraw only when the cash clearly can't cover it and the bank can
+        inferred = "withdraw" if amount > cash and state['bank'] >= amount else "deposit"
+        action_data["sub_action"] = inferred
+        fixes.append(f"missing sub_action -> {inferred!r}")
+
+    # Largest amount each action could use right now
+    if action == "buy":
+        limit = cash // prices[action_data["drug_type"]]
+    elif action == "sell":
+        limit = state['inventory'].get(action_data["drug_type"], 0)
+    elif action == "repay":
+        limit = min(cash, state['debt'] + int(state['debt'] * LOAN_INTEREST_RATE))
+    elif action == "loan":
+        limit = MAX_LOAN_AMOUNT
+    elif action == "bank":
+        limit = cash if action_data["sub_action"] == "deposit" else state['bank']
+    else:
+        return
+
+    if limit < 1:
+        if action == "buy":
+            raise RepairError("Insufficient funds for the proposed action.")
+        # The engine rejects it with a message; that costs the day but not a re-prompt
+        return
+    if "amount" not in action_data:
+        if action == "loan":
+            raise RepairError("Missing amount for loan.")
+        action_data["amount"] = limit
+        fixes.append(f"missing amount -> {limit}")
+    elif action_data["amount"] > limit:
+        fixes.append(f"amount {action_data['amount']} clamped to {limit}")
+        action_data["amount"] = limit
+
+
+def repair_plan(data, state, prices, world=None):
+    """Validate a decoded model plan, fixing what can be fixed locally.
+
+    The first step that is possible now is fitted to the current state;
+    earlier steps that are not (an unaffordable buy or fare, nothing to sell)
+    are dropped, and later steps are repaired structurally here and fitted
+    again when their turn comes. A plan is cut short at its first unusable
+    step rather than rejected, and a bare action object is accepted as a
+    one-step plan. Only a plan with no step possible now is rejected.
+    Returns ``(plan, fixes)``.
+    """
+    world = world or getattr(state, "world", DEFAULT_WORLD)
+    fixes = []
+    if isinstance(data, dict) and "plan" not in data and "action" in data:
+        data = {"plan": [data]}
+        fixes.append("single action taken as a one-step plan")
+    steps = data.get("plan") if isinstance(data, dict) else data
+    if not isinstance(steps, list) or not steps:
+        raise RepairError("Response has no plan of actions.")
+    if len(steps) > MAX_PLAN_STEPS:
+        fixes.append(f"plan cut to {MAX_PLAN_STEPS} steps")
+        steps = steps[:MAX_PLAN_STEPS]
+
+    plan = []
+    for i, step in enumerate(steps, 1):
+        if plan:
+            try:
+                step, applied = repair_action(step, None, None, world)
+            except RepairError as e:
+                fixes.append(f"plan cut before step {i}: {e}")
+                break
+            fixes.extend(f"step {i}: {fix}" for fix in applied)
+            plan.append(step)
+            continue
+        try:
+            step, applied = repair_action(step, state, prices, world)
+        except RepairError as e:
+            if i == len(steps):
+                raise RepairError(f"No step of the plan is possible now ({e})") from None
+            fixes.append(f"step {i} dropped: {e}")
+            continue
+        fixes.extend(applied)
+        plan.append(step)
+
+    errors = sorted(validators(world)[1].iter_errors({"plan": plan}), key=lambda e: list(e.path))
+    if errors:
+        raise RepairError(errors[0].message)
+    return plan, fixes
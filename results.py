@@ -0,0 +1,193 @@
+import argparse
+import json
+import sqlite3
+import uuid
+
+from engine import STARTING_CASH, action_succeeded
+
+TURN_COLUMNS = (
+    "run_id", "agent", "seed", "day", "location", "action", "drug", "amount", "price", "ok",
+    "cash", "bank", "debt", "assets", "profit", "event", "police_decision", "jailed",
+    "llm_calls", "latency", "prompt_tokens", "completion_tokens"
+)
+
+GAME_COLUMNS = ("run_id", "agent", "seed", "total_assets", "days_survived", "cash", "bank", "debt", "quit", "summary")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    run_id TEXT, agent TEXT, seed INTEGER, day INTEGER, location TEXT, action TEXT, drug TEXT,
+    amount INTEGER, price INTEGER, ok INTEGER, cash INTEGER, bank INTEGER, debt INTEGER,
+    assets INTEGER, profit INTEGER, event TEXT, police_decision TEXT, jailed INTEGER,
+    llm_calls INTEGER, latency REAL, prompt_tokens INTEGER, completion_tokens INTEGER
+);
+CREATE TABLE IF NOT EXISTS games (
+    run_id TEXT, agent TEXT, seed INTEGER, total_assets INTEGER, days_survived INTEGER,
+    cash INTEGER, bank INTEGER, debt INTEGER, quit INTEGER, summary TEXT
+);
+CREATE INDEX IF NOT EXISTS turns_game ON turns (run_id, seed);
+CREATE INDEX IF NOT EXISTS games_run ON games (run_id, agent);
+"""
+
+
+class TurnCollector:
+    """Builds one flat row per turn, with the model calls made during it.
+
+    Attach as ``engine.sink``. Rows accumulate in ``rows``; ResultsSink
+    streams them to SQLite instead.
+    """
+
+    def __init__(self, agent, run_id=None):
+        self.agent = agent
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.rows = []
+        self.last_assets = {}  # seed -> total assets after the previous turn
+        self.calls = {}  # seed -> [calls, latency, prompt tokens, completion tokens] this turn
+
+    def exchange(self, engine, stats):
+        """Count one model round trip (an ``llm.complete`` stats dict) against the current turn."""
+        calls = self.calls.setdefault(engine.seed, [0, 0.0, 0, 0])
+        calls[0] += 1
+        calls[1] += stats['latency']
+        prompt_tokens = stats['prompt_tokens'] if stats['prompt_tokens'] is not None else stats['estimated_prompt_tokens']
+        calls[2] += prompt_tokens or 0
+        calls[3] += stats['completion_tokens'] or 0
+
+    def turn_row(self, engine, turn):
+        state = engine.state
+        action = turn['action'] or {}
+        drug = action.get("drug_type")
+        price = None
+        history = state.turn_history
+        index = engine.world.drug_index.get(drug)
+        # History records hold the prices the action was taken at, before they moved
+        if index is not None and history and history[-1].day == turn['day']:
+            price = history[-1].prices[index]
+        assets = engine.total_assets()
+        previous = self.last_assets.get(engine.seed, STARTING_CASH if turn['day'] == 1 else None)
+        self.last_assets[engine.seed] = assets
+        calls, latency, prompt_tokens, completion_tokens = self.calls.pop(engine.seed, (0, None, None, None))
+        return (self.run_id, self.agent, engine.seed, turn['day'], state.location, action.get("action"), drug,
+                action.get("amount"), price, action_succeeded(turn['message']) if action else None,
+                state.cash, state.bank, state.debt, assets, None if previous is None else assets - previous,
+                turn['event'], turn['police_decision'], turn['jailed'], calls, latency, prompt_tokens,
+                completion_tokens)
+
+    def record_turn(self, engine, turn):
+        self.rows.append(self.turn_row(engine, turn))
+
+    def finish_game(self, engine):
+        self.last_assets.pop(engine.seed, None)
+        self.calls.pop(engine.seed, None)
+
+
+class ResultsSink(TurnCollector):
+    """Streams per-turn and per-game records into an append-only SQLite file.
+
+    Rows are buffered and written ``batch_size`` at a time in one
+    transaction, so memory stays bounded however many games are recorded.
+    Several runs can share a file; each is tagged with its ``run_id``.
+    """
+
+    def __init__(self, path, agent=None, run_id=None, batch_size=5000):
+        super().__init__(agent, run_id)
+        self.batch_size = batch_size
+        self.games = []
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def record_turn(self, engine, turn):
+        self.rows.append(self.turn_row(engine, turn))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def add_turns(self, rows):
+        """Append rows built elsewhere, e.g. by a TurnCollector in a worker process."""
+        self.rows.extend(rows)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def record_game(self, summary, engine=None):
+        """Store a finished game's summary (``engine.summary()`` plus any extras)."""
+        if engine is not None:
+            self.finish_game(engine)
+        self.games.append((summary.get('run_id', self.run_id), summary.get('agent', self.agent), summary['seed'],
+                           summary['total_assets'], summary['days_survived'], summary['cash'], summary['bank'],
+                           summary['debt'], summary['quit'], json.dumps(summary)))
+        if len(self.games) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with self.db:
+            if self.rows:
+                self.db.executemany(f"INSERT INTO turns VALUES ({', '.join('?' * len(TURN_COLUMNS))})", self.rows)
+            if self.games:
+                self.db.executemany(f"INSERT INTO games VALUES ({', '.join('?' * len(GAME_COLUMNS))})", self.games)
+        self.rows = []
+        self.games = []
+
+    def close(self):
+        if self.db:
+            self.flush()
+            self.db.close()
+            self.db = None
+
+
+# Named aggregations for the summary CLI; {where} restricts to the chosen runs
+QUERIES = {
+    "agent": """SELECT agent, COUNT(*) AS games, AVG(total_assets) AS mean_assets, MIN(total_assets) AS min_assets,
+                       MAX(total_assets) AS max_assets, AVG(days_survived) AS mean_days,
+                       SUM(debt > 0) AS in_debt
+                FROM games {where} GROUP BY agent ORDER BY mean_assets DESC""",
+    "location": """SELECT location, COUNT(*) AS turns, SUM(profit) AS profit, AVG(profit) AS mean_profit,
+                          AVG(police_decision IS NOT NULL) AS police_rate
+                   FROM turns {where} GROUP BY location ORDER BY profit DESC""",
+    "day": """SELECT (day - 1) / :bucket * :bucket + 1 AS from_day, COUNT(*) AS turns, SUM(profit) AS profit,
+                     AVG(assets) AS mean_assets
+              FROM turns {where} GROUP BY from_day ORDER BY from_day""",
+    "action": """SELECT agent, action, COUNT(*) AS turns, AVG(ok) AS success_rate, SUM(profit) AS profit,
+                        AVG(latency) AS mean_latency, AVG(prompt_tokens) AS mean_prompt_tokens
+                 FROM turns {where} GROUP BY agent, action ORDER BY agent, turns DESC""",
+    "police": """SELECT agent, police_decision, COUNT(*) AS encounters, AVG(profit) AS mean_profit
+                 FROM turns {where} {and_} police_decision IS NOT NULL
+                 GROUP BY agent, police_decision ORDER BY agent, encounters DESC""",
+    "runs": """SELECT run_id, agent, COUNT(*) AS games, AVG(total_assets) AS mean_assets
+               FROM games {where} GROUP BY run_id, agent""",
+}
+
+
+def summarize(path, by="agent", run_id=None, agent=None, bucket=30):
+    """Run one of the QUERIES against a results file and return rows as dicts."""
+    conditions, params = [], {"bucket": bucket}
+    if run_id:
+        conditions.append("run_id = :run_id")
+        params["run_id"] = run_id
+    if agent:
+        conditions.append("agent = :agent")
+        params["agent"] = agent
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    sql = QUERIES[by].format(where=where, and_="AND" if conditions else "WHERE")
+    db = sqlite3.connect(path)
+    try:
+        cursor = db.execute(sql, params)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate a Drug Wars results file.")
+    parser.add_argument("path")
+    parser.add_argument("--by", choices=sorted(QUERIES), default="agent")
+    parser.add_argument("--run", help="Only this run_id")
+    parser.add_argument("--agent", help="Only this agent")
+    parser.add_argument("--bucket", type=int, default=30, help="Days per row for --by day")
+    args = parser.parse_args()
+    for row in summarize(args.path, args.by, args.run, args.agent, args.bucket):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import argparse
+import json
+
+import numpy as np
+
+from engine import DRUG_TYPES, MAX_LOAN_AMOUNT, POLICE_OPTIONS, GameEngine
+from vecsim import DRUGS, Economy
+
+
+class RiskEvaluator:
+    """Monte Carlo outcome distributions for police options and loan choices.
+
+    Prices follow the engine's own random walk, simulated as a
+    (samples x days x drugs) array. Held inventory is valued with a simple,
+    realizable selling rule: sell on the first free day a drug reaches
+    ``take_profit`` above today's price, otherwise on the last day of the
+    horizon. Days in jail cannot be used to sell, and each one also costs
+    ``day_value`` of trading time. All options of one call are scored on the
+    same price paths, and each call reseeds from ``seed``, so results depend
+    only on the state and the decider is deterministic.
+    """
+
+    def __init__(self, horizon=10, samples=2048, take_profit=0.2, day_value=50, risk_aversion=0.0,
+                 seed=0, economy=None):
+        self.horizon = horizon
+        self.samples = samples
+        self.take_profit = take_profit
+        self.day_value = day_value
+        self.risk_aversion = risk_aversion
+        self.seed = seed
+        self.economy = economy or Economy()
+
+    def price_paths(self, prices, rng, days=None):
+        """Simulated prices for days 1..days (default the horizon), shape (samples, days, drugs)."""
+        eco = self.economy
+        days = days or self.horizon
+        current = np.array([prices[drug] for drug in DRUGS], dtype=np.int64)
+        steps = rng.integers(-eco.price_step, eco.price_step + 1, (self.samples, days, len(DRUGS)))
+        paths = np.empty_like(steps)
+        level = np.broadcast_to(current, (self.samples, len(DRUGS)))
+        for day in range(days):
+            level = np.maximum(eco.price_floor, level + steps[:, day])
+            paths[:, day] = level
+        return paths
+
+    def sale_prices(self, paths, entry, blocked):
+        """Price each drug is sold at under the take-profit rule, shape (samples, drugs).
+
+        ``entry`` is the per-drug reference price and ``blocked`` the number of
+        leading days (per sample) on which selling is impossible.
+        """
+        free = np.arange(self.horizon)[None, :] >= blocked[:, None]
+        hit = (paths >= entry * (1 + self.take_profit)) & free[:, :, None]
+        first = np.where(hit.any(axis=1), hit.argmax(axis=1), self.horizon - 1)
+        return np.take_along_axis(paths, first[:, None, :], axis=1)[:, 0, :]
+
+    def police(self, state, prices, fine):
+        """Asset change over the horizon for each police option, as summary statistics.
+
+        Scored against the same paths with no encounter, so the numbers are
+        what each option costs (negative is a loss).
+        """
+        eco = self.economy
+        rng = np.random.default_rng(self.seed)
+        paths = self.price_paths(prices, rng)
+        entry = np.array([prices[drug] for drug in DRUGS], dtype=np.int64)
+        held = np.array([state['inventory'].get(drug, 0) for drug in DRUGS], dtype=np.int64)
+        cash = state['cash']
+        n = self.samples
+        none_blocked = np.zeros(n, dtype=np.int64)
+        baseline = self.sale_prices(paths, entry, none_blocked) @ held
+
+        jail_days = rng.integers(1, 3, n)
+        outcomes = {}
+        # Fines take what cash there is, never more
+        fine_paid = min(fine, cash)
+        outcomes["pay_fine"] = np.full(n, -fine_paid, dtype=np.float64)
+
+        if held.any():
+            sold = self.sale_prices(paths, entry, none_blocked) * held
+            choices = np.flatnonzero(held)
+            lost = choices[rng.integers(0, len(choices), n)]
+            outcomes["lose_inventory"] = -sold[np.arange(n), lost].astype(np.float64)
+        else:
+            outcomes["lose_inventory"] = outcomes["pay_fine"]
+
+        # The encounter comes before today's action, so even one jail day loses a trading day
+        jailed = self.sale_prices(paths, entry, jail_days) @ held
+        outcomes["go_to_jail"] = (jailed - baseline - self.day_value * jail_days).astype(np.float64)
+
+        if cash >= eco.bribe_amount:
+            outcomes["bribe"] = np.full(n, -eco.bribe_amount, dtype=np.float64)
+        else:
+            one_day = np.ones(n, dtype=np.int64)
+            outcomes["bribe"] = (self.sale_prices(paths, entry, one_day) @ held - baseline
+                                 - self.day_value).astype(np.float64)
+        return {option: summarize(outcomes[option]) for option in POLICE_OPTIONS}
+
+    def loan_term(self, days_left=None):
+        """Days a loan taken now runs: until it falls due, or the game ends first."""
+        term = self.economy.loan_duration
+        return max(1, min(term, days_left)) if days_left is not None else term
+
+    def loan(self, state, prices, amount=MAX_LOAN_AMOUNT, days_left=None):
+        """Net profit of borrowing ``amount`` now and trading it until the loan falls due.
+
+        The cash buys the drug furthest below its base price the next day,
+        which is held until the due date (or the end of the game, given
+        ``days_left``) and sold to repay the loan with interest. Whatever the
+        sale and the player's other assets cannot cover stays in debt and
+        takes the 50% late penalty at every due date left in the game.
+        Returns summary statistics, or None if a loan is already outstanding.
+        """
+        if state['debt'] > 0:
+            return None
+        eco = self.economy
+        term = self.loan_term(days_left)
+        rng = np.random.default_rng(self.seed)
+        paths = self.price_paths(prices, rng, term)
+        ratio = {drug: prices[drug] / DRUG_TYPES[drug]['base_price'] for drug in DRUGS}
+        index = DRUGS.index(min(ratio, key=ratio.get))
+        # Borrowing takes today's turn, so the drug is bought at tomorrow's price
+        entry = paths[:, 0, index]
+        units = amount // entry
+        profit = (paths[:, -1, index] - entry) * units - int(amount * eco.loan_interest_rate)
+        if days_left is not None and days_left < eco.loan_duration:
+            return summarize(profit)  # The game ends before the loan falls due
+        held = sum(state['inventory'].get(drug, 0) * prices[drug] for drug in DRUGS)
+        shortfall = np.maximum(0, -profit - (state['cash'] + state['bank'] + held))
+        periods = days_left // eco.loan_duration if days_left is not None else 1
+        return summarize(profit - shortfall * ((1 + eco.loan_penalty) ** periods - 1))
+
+    def repay(self, state, prices):
+        """Cost of settling the outstanding loan now versus after the horizon.
+
+        Waiting keeps the cash working (under the take-profit rule) but runs into
+        the 50% late penalty if the due date falls inside the horizon; interest
+        is charged on the debt at the time it is repaid. Returns
+        ``{"repay_now": cost, "defer": stats}`` (costs positive), or None
+        without debt.
+        """
+        debt = state['debt']
+        if debt <= 0:
+            return None
+        eco = self.economy
+        due_now = debt + int(debt * eco.loan_interest_rate)
+        late = state['loan_due_date'] is not None and state['day'] + self.horizon >= state['loan_due_date']
+        later_debt = debt + int(debt * eco.loan_penalty) if late else debt
+        due_later = later_debt + int(later_debt * eco.loan_interest_rate)
+
+        rng = np.random.default_rng(self.seed)
+        paths = self.price_paths(prices, rng)
+        ratio = {drug: prices[drug] / DRUG_TYPES[drug]['base_price'] for drug in DRUGS}
+        index = DRUGS.index(min(ratio, key=ratio.get))
+        entry = np.array([prices[drug] for drug in DRUGS], dtype=np.int64)
+        units = min(state['cash'], due_now) // entry[index]
+        sold = self.sale_prices(paths, entry, np.zeros(self.samples, dtype=np.int64))[:, index]
+        return {"repay_now": due_now, "defer": summarize(due_later - (sold - entry[index]) * units)}
+
+    def choose_police(self, state, prices, fine):
+        """Police option with the best risk-adjusted expected outcome."""
+        results = self.police(state, prices, fine)
+        return max(results, key=lambda option: results[option]['mean'] - self.risk_aversion * results[option]['std'])
+
+    def police_hint(self, state, prices, fine):
+        """One-line summary of the police options for a prompt."""
+        results = self.police(state, prices, fine)
+        parts = [f"{option} ${-r['mean']:.0f} (worst 5% ${-r['p5']:.0f})" for option, r in results.items()]
+        return f"RISK expected cost over {self.horizon} days: " + ", ".join(parts)
+
+    def loan_hint(self, state, prices, days_left=None):
+        """One-line summary of the loan choice available now, or None."""
+        repay = self.repay(state, prices)
+        if repay is not None:
+            defer = repay['defer']
+            return (f"RISK repay now costs ${repay['repay_now']}; waiting {self.horizon} days costs "
+                    f"${defer['mean']:.0f} on average (worst 5% ${defer['p95']:.0f})")
+        loan = self.loan(state, prices, days_left=days_left)
+        return (f"RISK a ${MAX_LOAN_AMOUNT} loan held for {self.loan_term(days_left)} days nets "
+                f"{dollars(loan['mean'])} on average, "
+                f"loses money {loan['p_loss']:.0%} of the time")
+
+
+def dollars(value):
+    return f"-${-value:.0f}" if value < 0 else f"${value:.0f}"
+
+
+def summarize(values):
+    """Mean, spread and tail of a sample of dollar outcomes."""
+    values = np.asarray(values, dtype=np.float64)
+    return {"mean": float(values.mean()), "std": float(values.std()),
+            "p5": float(np.percentile(values, 5)), "p95": float(np.percentile(values, 95)),
+            "p_loss": float((values < 0).mean())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score police and loan choices for a game state by simulation.")
+    parser.add_argument("--seed", type=int, default=0, help="Game seed for the state to evaluate")
+    parser.add_argument("--fine", type=int, default=300)
+    parser.add_argument("--horizon", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=2048)
+    parser.add_argument("--inventory", default="", help="Held drugs, e.g. cocaine=10,weed=40")
+    parser.add_argument("--debt", type=int, default=0)
+    args = parser.parse_args()
+
+    engine = GameEngine(seed=args.seed)
+    for item in filter(None, args.inventory.split(",")):
+        drug, qty = item.split("=")
+        engine.state['inventory'][drug] = int(qty)
+    if args.debt:
+        engine.state['debt'] = args.debt
+        engine.state['loan_due_date'] = engine.state['day'] + 5
+    evaluator = RiskEvaluator(horizon=args.horizon, samples=args.samples)
+    state, prices = engine.state, engine.prices
+    print(json.dumps({
+        "police": evaluator.police(state, prices, args.fine),
+        "police_choice": evaluator.choose_police(state, prices, args.fine),
+        "loan": evaluator.loan(state, prices),
+        "repay": evaluator.repay(state, prices),
+        "hints": [evaluator.police_hint(state, prices, args.fine), evaluator.loan_hint(state, prices)],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from engine import DRUGS, LOCATIONS, POLICE_OPTIONS
+
+# Plausible model answers: well-formed actions, and the ways real models get them wrong
+ACTIONS = [
+    {"action": "buy", "drug_type": "weed", "amount": 2},
+    {"action": "buy", "drug_type": "ecstasy", "amount": 1},
+    {"action": "sell", "drug_type": "weed", "amount": 2},
+    {"action": "sell", "drug_type": "ecstasy", "amount": 1},
+    {"action": "travel", "location": "Brooklyn"},
+    {"action": "travel", "location": "Queens"},
+    {"action": "bank", "sub_action": "deposit", "amount": 50},
+]
+MALFORMED = [
+    "I think the best move right now is to buy some weed and head to Queens.",
+    '{"action": "buy", "drug_type": "weed", "amount": ',
+    '{"action": "fly", "location": "Mars"}',
+    '```json\n{"action": "buy", "drug_type": "unobtainium", "amount": 3}\n```',
+]
+
+
+class StubModelServer:
+    """An OpenAI-compatible chat completions server that answers like a game model, offline.
+
+    Each request waits ``latency`` seconds (plus up to ``jitter``) before the
+    first token, then streams the answer ``chunk_size`` characters at a time,
+    ``chunk_delay`` seconds apart. A ``malformed_rate`` share of action
+    answers is prose, truncated or off-schema JSON. Answers are drawn from a
+    seeded RNG, so a run with one client is reproducible.
+    """
+
+    def __init__(self, port=0, latency=0.05, jitter=0.0, chunk_size=8, chunk_delay=0.0, malformed_rate=0.0,
+                 seed=0, host="127.0.0.1"):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.malformed_rate = malformed_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.httpd = ThreadingHTTPServer((host, port), self.handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def answer(self, messages):
+        """Text of the reply to a chat, picked the way the game's prompts ask for it."""
+        system, user = messages[0]['content'], messages[-1]['content']
+        with self.lock:
+            self.requests += 1
+            rng = self.rng
+            if "law enforcement" in system:
+                return rng.choice([option for option in POLICE_OPTIONS if option in user] or list(POLICE_OPTIONS))
+            if rng.random() < self.malformed_rate:
+                return rng.choice(MALFORMED)
+            if "PLAN MODE" in system:
+                steps = [rng.choice(ACTIONS) for _ in range(rng.randint(1, 4))]
+                return json.dumps({"plan": steps})
+            action = dict(rng.choice(ACTIONS))
+            if "drug_type" in action:
+                action["drug_type"] = rng.choice(DRUGS)
+            if "location" in action:
+                action["location"] = rng.choice(LOCATIONS)
+            return json.dumps(action)
+
+    def delay(self):
+        with self.lock:
+            extra = self.rng.uniform(0, self.jitter) if self.jitter else 0.0
+        return self.latency + extra
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                text = server.answer(body['messages'])
+                time.sleep(server.delay())
+                usage = {"prompt_tokens": len(json.dumps(body['messages'])) // 4,
+                         "completion_tokens": len(text) // 4 + 1}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                if body.get('stream'):
+                    self.stream(text, usage)
+                else:
+                    self.send_json({"id": "stub", "object": "chat.completion", "created": 0, "model": body['model'],
+                                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                                 "finish_reason": "stop"}],
+                                    "usage": usage})
+
+            def send_json(self, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def stream(self, text, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for i in range(0, len(text), server.chunk_size):
+                        if i and server.chunk_delay:
+                            time.sleep(server.chunk_delay)
+                        self.event({"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                                    "choices": [{"index": 0, "delta": {"content": text[i:i + server.chunk_size]},
+                                                 "finish_reason": None}]})
+                    self.event({"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                                "choices": [], "usage": usage})
+                    self.event("[DONE]")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading once it had a complete answer
+                    self.close_connection = True
+
+            def event(self, payload):
+                line = payload if isinstance(payload, str) else json.dumps(payload)
+                data = f"data: {line}\n\n".encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        return Handler
+
+    def start(self):
+        """Serve from a background thread; returns the base URL to point a client at."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve canned Drug Wars model answers over the OpenAI chat API.")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--chunk-size", type=int, default=8, help="Characters per streamed chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of action answers that are unusable")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    server = StubModelServer(args.port, args.latency, args.jitter, args.chunk_size, args.chunk_delay,
+                             args.malformed_rate, args.seed)
+    print(f"Serving on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
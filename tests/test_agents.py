@@ -0,0 +1,61 @@
+import pytest
+
+from agents import GreedyAgent, LookaheadAgent, PlanAgent, RandomAgent, idle_action
+from batch import run_game
+from engine import GameEngine
+
+
+@pytest.mark.parametrize("agent", [RandomAgent(), GreedyAgent(), LookaheadAgent(rollouts=2)],
+                         ids=lambda agent: agent.name)
+def test_agents_leave_the_games_random_stream_alone(agent):
+    engine = GameEngine(seed=4, max_days=30)
+    while not engine.is_over():
+        turn = engine.open_turn()
+        rng_state = engine.rng.getstate()
+        action_data = agent.choose_action(engine, turn['last_event'])
+        agent.choose_police(engine, {"pay_fine": "Pay a fine of $300"})
+        assert engine.rng.getstate() == rng_state
+        engine.end_turn(turn, action_data)
+
+
+def test_lookahead_plays_a_seed_the_same_way_every_time():
+    assert run_game(2, LookaheadAgent(), 40) == run_game(2, LookaheadAgent(), 40)
+    assert run_game(2, LookaheadAgent(seed=1), 40) != run_game(2, LookaheadAgent(seed=2), 40)
+
+
+def test_a_player_with_only_stock_still_moves_the_game_on():
+    engine = GameEngine(seed=0, max_days=20)
+    engine.state['cash'] = 0
+    engine.state['inventory']['weed'] = 3
+    assert idle_action(engine.state) == {"action": "sell", "drug_type": "weed", "amount": 1}
+    opening = engine.prices.to_dict()
+    agent = GreedyAgent(margin=10)  # Never sells on price alone
+    engine.run(agent.choose_action, agent.choose_police)
+    assert engine.prices.to_dict() != opening
+
+
+def test_planners_beat_random_play():
+    def mean_assets(agent):
+        return sum(run_game(seed, agent, 60)['total_assets'] for seed in range(10)) / 10
+
+    random_play = mean_assets(RandomAgent())
+    assert mean_assets(GreedyAgent()) > random_play
+    assert mean_assets(LookaheadAgent()) > random_play
+
+
+def test_plan_agent_starts_each_game_without_the_last_games_plan(monkeypatch):
+    pytest.importorskip("jsonschema")
+    import drugwairs
+
+    requests = []
+
+    def get_plan(engine, last_event=None, reason=None):
+        requests.append((engine.seed, engine.state.day))
+        return [{"action": "buy", "drug_type": "weed", "amount": 1} for _ in range(5)]
+
+    monkeypatch.setattr(drugwairs, "get_plan", get_plan)
+    agent = PlanAgent()
+    run_game(1, agent, 3)
+    assert agent.plan  # Steps left over from the first game...
+    run_game(2, agent, 3)
+    assert (2, 1) in requests  # ...are not followed in the second
@@ -0,0 +1,42 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("openai")
+pytest.importorskip("jsonschema")
+
+from async_driver import AsyncGameRunner
+from stub_server import StubModelServer
+
+
+def test_games_run_concurrently_against_a_model_server(tmp_path):
+    traces = tmp_path / "traces"
+    with StubModelServer(latency=0) as server:
+        runner = AsyncGameRunner([server.base_url], concurrency=4, max_days=5, record_dir=str(traces))
+        results = asyncio.run(runner.run(range(3)))
+    assert [result['seed'] for result in results] == [0, 1, 2]
+    assert all(result['days_survived'] == 5 and result['llm_calls'] > 0 for result in results)
+    assert sorted(os.listdir(traces)) == [f"game-{seed}.jsonl.gz" for seed in range(3)]
+
+
+def test_crashed_and_cancelled_games_are_reported_apart(capsys):
+    with StubModelServer(latency=0) as server:
+        runner = AsyncGameRunner([server.base_url], max_days=20)
+        get_action = runner.get_action
+
+        async def failing(engine, last_event=None):
+            if engine.seed == 1 and engine.state.day >= 3:
+                raise RuntimeError("boom")
+            if engine.seed == 2 and engine.state.day >= 3:
+                runner.cancel(2)
+            return await get_action(engine, last_event)
+
+        runner.get_action = failing
+        played, crashed, cancelled = asyncio.run(runner.run(range(3)))
+    assert played['days_survived'] == 20 and "error" not in played and "cancelled" not in played
+    assert crashed['error'] == "RuntimeError: boom" and "cancelled" not in crashed
+    assert crashed['days_survived'] < 20
+    assert cancelled['cancelled'] and "error" not in cancelled
+    assert "Game 1 crashed" in capsys.readouterr().err
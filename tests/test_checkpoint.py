@@ -0,0 +1,72 @@
+import pytest
+
+from agents import GreedyAgent
+from batch import run_game
+from checkpoint import CheckpointError, decode, encode, game_paths, load, save
+from engine import GameEngine
+
+
+def play(engine, agent, days=None):
+    for _ in range(days or engine.max_days):
+        if engine.is_over():
+            break
+        engine.step(agent.choose_action, agent.choose_police)
+    return engine
+
+
+def memory_of(engine):
+    memory = engine.state.memory
+    memory.fold()
+    return memory.samples, memory.lows, memory.highs, memory.totals, memory.days, memory.basis, memory.realized
+
+
+def test_mid_game_resume_finishes_with_the_same_checksum(tmp_path):
+    agent = GreedyAgent()
+    engine = play(GameEngine(seed=9, max_days=200), agent, 80)
+    path = tmp_path / "game.ckpt"
+    save(str(path), engine)
+    play(engine, agent)
+
+    resumed, _ = load(str(path))
+    assert resumed.state.day == 81
+    play(resumed, agent)
+    assert resumed.checksum() == engine.checksum()
+    assert memory_of(resumed) == memory_of(engine)
+
+
+def test_checkpoint_round_trip_and_meta():
+    engine = play(GameEngine(seed=2), GreedyAgent(), 30)
+    restored, meta = decode(encode(engine, {"run": "x"}))
+    assert restored.checksum() == engine.checksum()
+    assert restored.rng.getstate() == engine.rng.getstate()
+    assert meta == {"run": "x"}
+
+
+def test_interrupted_batch_game_resumes_to_the_same_summary(tmp_path):
+    expected = run_game(4, GreedyAgent(), 120)
+
+    class Crashing(GreedyAgent):
+        def choose_action(self, engine, last_event):
+            if engine.state.day == 60:
+                raise KeyboardInterrupt
+            return super().choose_action(engine, last_event)
+
+    with pytest.raises(KeyboardInterrupt):
+        run_game(4, Crashing(), 120, checkpoint_dir=str(tmp_path))
+    ckpt, done = game_paths(str(tmp_path), 4)
+    assert load(ckpt)[0].state.day == 60
+    assert run_game(4, GreedyAgent(), 120, checkpoint_dir=str(tmp_path), resume=True) == expected
+    # Once finished, a resume returns the stored summary without playing
+    assert run_game(4, None, 120, checkpoint_dir=str(tmp_path), resume=True) == expected
+
+
+def test_damaged_checkpoints_are_rejected():
+    data = encode(play(GameEngine(seed=1), GreedyAgent(), 10))
+    with pytest.raises(CheckpointError, match="truncated"):
+        decode(data[:len(data) // 2])
+    damaged = bytearray(data)
+    damaged[40] ^= 0xFF
+    with pytest.raises(CheckpointError, match="checksum"):
+        decode(bytes(damaged))
+    with pytest.raises(CheckpointError, match="not a checkpoint"):
+        decode(b"XXXX" + data[4:])
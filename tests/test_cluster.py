@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from cluster import Broker, Coordinator, plan_shards, shard_keys
+from engine import DEFAULT_WORLD_CONFIG
+from metrics import metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_for(condition, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        found = condition()
+        if found:
+            return found
+        time.sleep(0.01)
+    raise AssertionError("timed out")
+
+
+def test_dropped_worker_shard_is_retried_and_merged_once(tmp_path):
+    metrics.reset()
+    # Lookahead games take long enough that a worker can be caught part way through a shard
+    shards = plan_shards(["lookahead"], {}, range(24), 4)
+    keys = [key for shard in shards for key in shard_keys(shard)]
+    out = tmp_path / "sweep.jsonl"
+    coordinator = Coordinator(shards, DEFAULT_WORLD_CONFIG, max_days=30, out=str(out), lease_timeout=1.0)
+    broker = Broker(coordinator)
+    threading.Thread(target=broker.serve_forever, daemon=True).start()
+    workers = [subprocess.Popen([sys.executable, os.path.join(ROOT, "cluster.py"), "worker", broker.address,
+                                 "--name", f"local-{i}"], stderr=subprocess.DEVNULL) for i in range(2)]
+
+    def mid_shard():
+        """A shard leased to local-0 with a game reported and at least two still to play."""
+        with coordinator.lock:
+            for shard_id, (worker, _) in coordinator.leases.items():
+                remaining = len(coordinator.remaining[shard_id])
+                if worker == "local-0" and 2 <= remaining < len(coordinator.shards[shard_id]['seeds']):
+                    return shard_id
+        return None
+
+    try:
+        dropped = wait_for(mid_shard)
+        workers[0].kill()
+        workers[0].wait()
+        with coordinator.lock:
+            assert coordinator.leases[dropped][0] == "local-0"
+
+        def finished():
+            coordinator.expire()
+            return coordinator.finished.is_set()
+
+        wait_for(finished)
+        assert workers[1].wait(timeout=30) == 0
+    finally:
+        broker.shutdown()
+        broker.server_close()
+        for process in workers:
+            process.kill()
+            process.wait()
+        coordinator.close()
+
+    assert not coordinator.failed
+    assert metrics.counters["shards_retried_total"] >= 1
+    assert sorted(coordinator.merged) == sorted(keys)
+    with open(out) as f:
+        written = [json.loads(line)['key'] for line in f]
+    assert sorted(written) == sorted(keys)  # Every game once, none lost and none duplicated
+    # The dropped shard was finished by the surviving worker without replaying what was already reported
+    by_worker = {coordinator.merged[key]['worker'] for key in shard_keys(coordinator.shards[dropped])}
+    assert by_worker == {"local-0", "local-1"}
+    assert coordinator.progress()['done'] == len(shards)
+
+
+def test_resume_drops_a_half_written_last_line(tmp_path):
+    shards = plan_shards(["greedy"], {}, range(4), 4)
+    keys = shard_keys(shards[0])
+    out = tmp_path / "sweep.jsonl"
+    finished = [json.dumps({"key": key, "seed": seed}) + "\n" for seed, key in enumerate(keys[:2])]
+    # The coordinator was killed while writing the third game
+    out.write_text("".join(finished) + json.dumps({"key": keys[2], "seed": 2})[:15])
+
+    coordinator = Coordinator(shards, DEFAULT_WORLD_CONFIG, out=str(out))
+    try:
+        assert sorted(coordinator.merged) == sorted(keys[:2])
+        assert out.read_text() == "".join(finished)
+        lease = coordinator.handle({"op": "lease", "worker": "w"})
+        assert lease['shard']['seeds'] == [2, 3]
+        coordinator.handle({"op": "result", "worker": "w", "shard": shards[0]['id'],
+                            "summary": {"key": keys[2], "seed": 2}})
+    finally:
+        coordinator.close()
+    with open(out) as f:
+        assert [json.loads(line)['key'] for line in f] == keys[:3]
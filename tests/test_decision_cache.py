@@ -0,0 +1,27 @@
+import json
+
+from decision_cache import DecisionCache
+
+
+def test_puts_survive_without_close(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = DecisionCache(path)
+    for i in range(10):
+        cache.put(f"key{i}", json.dumps({"action": "wait", "i": i}))
+    # As if the process crashed: a second connection sees every write
+    other = DecisionCache(path)
+    assert all(other.get(f"key{i}") is not None for i in range(10))
+    other.close()
+    cache.close()
+
+
+def test_invalid_entry_counts_as_miss_and_is_discarded(tmp_path):
+    cache = DecisionCache(str(tmp_path / "cache.db"))
+    cache.put("good", '{"action": "wait"}')
+    cache.put("bad", "not json")
+    assert cache.get("good", parse=json.loads) == {"action": "wait"}
+    assert cache.get("bad", parse=json.loads) is None
+    assert cache.get("bad") is None
+    assert cache.get("absent") is None
+    assert (cache.hits, cache.misses) == (1, 3)
+    cache.close()
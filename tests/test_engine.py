@@ -0,0 +1,68 @@
+import pytest
+
+from agents import GreedyAgent, RandomAgent
+from batch import run_batch, run_game
+from engine import GameEngine, GameState, TurnHistory
+
+
+def play(seed, agent, max_days=120):
+    engine = GameEngine(seed=seed, max_days=max_days)
+    engine.run(agent.choose_action, agent.choose_police)
+    return engine
+
+
+def test_same_seed_same_checksum():
+    for agent in (GreedyAgent(), RandomAgent()):
+        assert play(7, agent).checksum() == play(7, agent).checksum()
+        assert play(7, agent).checksum() != play(8, agent).checksum()
+
+
+def test_reset_starts_the_same_game_again():
+    engine = play(3, GreedyAgent())
+    fresh = GameEngine(seed=3).checksum()
+    engine.reset(3)
+    assert engine.checksum() == fresh
+
+
+def test_batch_matches_games_played_one_by_one():
+    seeds = range(6)
+    expected = [run_game(seed, GreedyAgent(), 60) for seed in seeds]
+    assert run_batch(seeds, GreedyAgent(), 60, workers=2, chunk_size=2) == expected
+
+
+def test_fork_and_parent_evolve_independently():
+    agent = GreedyAgent()
+    parent = play(5, agent, 40)
+    before = parent.checksum()
+    child = parent.fork(seed=1)
+    assert child.checksum() == before
+    child.max_days = 80
+    child.run(agent.choose_action, agent.choose_police)
+    assert parent.checksum() == before
+    parent.max_days = 80
+    parent.run(agent.choose_action, agent.choose_police)
+    assert child.checksum() != parent.checksum()
+
+
+def test_turn_history_keeps_the_last_turns_copy_on_write():
+    history = TurnHistory(capacity=3)
+    for day in range(1, 6):
+        history.append(day)
+    assert list(history) == [3, 4, 5] and history[-1] == 5
+    copy = history.fork()
+    copy.append(6)
+    assert list(copy) == [4, 5, 6]
+    assert list(history) == [3, 4, 5]
+    history.append(7)
+    assert list(history) == [4, 5, 7] and list(copy) == [4, 5, 6]
+
+
+def test_state_reads_like_the_old_dict():
+    state = GameEngine(seed=0).state
+    state['cash'] -= 100
+    state['inventory']['weed'] = 3
+    assert state.cash == 900 and state['inventory']['weed'] == 3
+    assert set(state.to_dict()) == set(GameState.KEYS)
+    with pytest.raises(KeyError):
+        state['memory']
+    assert not hasattr(state, "__dict__")
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+
+from llm import JSONObjectScanner, KeywordScanner, complete
+
+
+def scan(scanner, chunks):
+    """Feed ``chunks`` in turn; return the answer and how many chunks it took."""
+    for i, chunk in enumerate(chunks, 1):
+        answer = scanner.feed(chunk)
+        if answer is not None:
+            return answer, i
+    return None, len(chunks)
+
+
+@pytest.mark.parametrize("chunks, answer", [
+    (['{"action": "wait"}'], '{"action": "wait"}'),
+    (['Sure! ', '{"action": "buy", ', '"amount": 2}', ' hope that helps'], '{"action": "buy", "amount": 2}'),
+    (['{"a": {"b": ', '{}}}', '{"c": 1}'], '{"a": {"b": {}}}'),
+    (['{"location": "}{"', ', "x": 1}'], '{"location": "}{", "x": 1}'),
+    (['{"say": "a \\"}\\" b"}'], '{"say": "a \\"}\\" b"}'),
+])
+def test_json_scanner_returns_the_first_complete_object(chunks, answer):
+    assert scan(JSONObjectScanner(), chunks)[0] == answer
+
+
+def test_json_scanner_stops_at_the_closing_brace():
+    chunks = list('{"action": "travel", "location": "Queens"} and some more text')
+    answer, used = scan(JSONObjectScanner(), chunks)
+    assert answer == '{"action": "travel", "location": "Queens"}'
+    assert used == len(answer)
+
+
+@pytest.mark.parametrize("chunks", [['{"action": "buy", "amount": '], ['no json here'], ['{"s": "}"']])
+def test_json_scanner_waits_for_an_unfinished_object(chunks):
+    assert scan(JSONObjectScanner(), chunks)[0] is None
+
+
+def test_keyword_scanner_stops_on_the_first_keyword_to_appear():
+    keywords = ["pay_fine", "bribe", "go_to_jail"]
+    assert scan(KeywordScanner(keywords), ["I would ", "BRI", "BE them, not pay_fine"]) == ("bribe", 3)
+    assert scan(KeywordScanner(keywords), ["go_to_", "jail or pay_fine"]) == ("go_to_jail", 2)
+    assert scan(KeywordScanner(keywords), ["pay the fine"]) == (None, 1)
+
+
+class FakeStream:
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        for piece in self.pieces:
+            self.read += 1
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    def close(self):
+        self.closed = True
+
+
+def fake_client(stream):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: stream)))
+
+
+def test_complete_closes_the_stream_once_the_answer_is_in():
+    stream = FakeStream(['{"action": ', '"wait"}', ' because', ' prices', ' are high'])
+    text, stats = complete(fake_client(stream), [], until=JSONObjectScanner())
+    assert text == '{"action": "wait"}'
+    assert stats['early_stop']
+    assert stream.read == 2 and stream.closed
+
+
+def test_complete_reads_everything_without_a_scanner():
+    stream = FakeStream(['{"action": ', '"wait"}', ' because'])
+    text, stats = complete(fake_client(stream), [])
+    assert text == '{"action": "wait"} because'
+    assert not stats['early_stop']
+    assert stream.read == 3 and stream.closed
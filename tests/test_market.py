@@ -0,0 +1,59 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from market import SharedMarket, run
+from vecsim import BUY
+
+
+def test_a_seed_fixes_the_run():
+    assert run(300, 40, 1)['checksum'] == run(300, 40, 1)['checksum']
+    assert run(300, 40, 1)['checksum'] != run(300, 40, 2)['checksum']
+
+
+def clear(market, trade, drug=0):
+    market.location[:] = 0
+    return market.clearing_prices(np.full(market.n, drug), np.asarray(trade), market.prices[:, drug])
+
+
+def test_net_flow_moves_the_price_and_everyone_fills_at_it():
+    buying, selling, balanced = (SharedMarket(100, seed=0) for _ in range(3))
+    before = buying.market[0, 0]
+    filled = clear(buying, [5] * 100)
+    assert buying.market[0, 0] > before and (filled == buying.market[0, 0]).all()
+    clear(selling, [-5] * 100)
+    assert selling.market[0, 0] < before
+    clear(balanced, [5, -5] * 50)
+    assert balanced.market[0, 0] == before
+    assert (buying.market[1:] == balanced.market[1:]).all()  # Other markets are untouched
+
+
+def test_clearing_does_not_depend_on_trader_order():
+    trades = np.random.default_rng(0).integers(-5, 6, 100)
+    forward, backward = SharedMarket(100, seed=0), SharedMarket(100, seed=0)
+    clear(forward, trades)
+    clear(backward, trades[::-1])
+    assert (forward.market == backward.market).all()
+
+
+def test_crowded_boroughs_cost_more_to_reach_and_draw_more_police():
+    market = SharedMarket(100, seed=0)
+    market.location[:] = 0
+    crowding = market.crowding()
+    assert crowding[0] == 5 and (crowding[1:] == 0).all()
+    fares = market.travel_cost(np.array([0, 1]))
+    assert fares[0] > market.economy.travel_cost > fares[1]
+    assert (market.police_chance() > market.economy.police_chance).all()
+
+
+def test_traders_all_buying_one_drug_pay_more_than_a_lone_trader():
+    def cost_of_buying(n_traders):
+        market = SharedMarket(n_traders, seed=0, depth=10)
+        market.location[:] = 0
+        market.prices = market.market[market.location]
+        market.cash[:] = 10 ** 6
+        acts = {"action": np.full(n_traders, BUY), "drug": 0, "amount": 5, "location": 0}
+        market.apply_actions(acts, np.ones(n_traders, dtype=bool))
+        return (10 ** 6 - market.cash[0]) / 5
+
+    assert cost_of_buying(200) > cost_of_buying(1)
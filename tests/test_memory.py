@@ -0,0 +1,85 @@
+import random
+
+from agents import GreedyAgent
+from engine import DEFAULT_WORLD, GameEngine, GameMemory
+from prompts import PromptBuilder
+
+
+def observed(rng, days):
+    return [(rng.randrange(3), tuple(rng.randint(10, 900) for _ in DEFAULT_WORLD.drugs)) for _ in range(days)]
+
+
+def check_ranges(memory, days):
+    """Compare the folded ranges with the same figures computed from every observed day."""
+    memory.fold()
+    for location in range(len(DEFAULT_WORLD.locations)):
+        rows = [prices for where, prices in days if where == location]
+        assert memory.samples[location] == len(rows)
+        if rows:
+            columns = list(zip(*rows))
+            assert tuple(memory.lows[location]) == tuple(map(min, columns))
+            assert tuple(memory.highs[location]) == tuple(map(max, columns))
+            assert tuple(memory.mean_prices(location)) == tuple(sum(column) // len(rows) for column in columns)
+
+
+def test_observed_prices_are_queued_then_folded():
+    memory = GameMemory()
+    days = observed(random.Random(0), GameMemory.FOLD_BATCH - 1)
+    for location, prices in days:
+        memory.observe(location, prices)
+    assert sum(memory.samples) == 0 and len(memory.pending) == len(days)
+    location, prices = observed(random.Random(1), 1)[0]
+    memory.observe(location, prices)  # The batch is full: folded without being asked
+    assert not memory.pending
+    check_ranges(memory, days + [(location, prices)])
+
+
+def test_fold_matches_the_full_history_however_it_is_batched():
+    days = observed(random.Random(2), 300)
+    memory = GameMemory()
+    for i, (location, prices) in enumerate(days):
+        memory.observe(location, prices)
+        if i % 37 == 0:
+            memory.fold()
+    check_ranges(memory, days)
+
+
+def test_forks_share_until_either_side_writes():
+    rng = random.Random(3)
+    parent = GameMemory()
+    history = observed(rng, 10)
+    for location, prices in history:
+        parent.observe(location, prices)
+    parent.bought(0, 500)
+    child = parent.fork()
+    assert not parent.pending  # Folded once, not by every fork
+    assert child.samples is parent.samples
+
+    later = observed(rng, 5)
+    for location, prices in later:
+        child.observe(location, prices)
+    child.sold(0, 1, 2, 400)
+    child.patrol(1, True)
+    check_ranges(parent, history)
+    check_ranges(child, history + later)
+    assert (parent.basis[0], parent.realized, parent.raids[1]) == (500, 0, 0)
+    assert (child.basis[0], child.realized, child.raids[1]) == (250, 150, 1)
+
+    parent.lost(0)
+    assert (parent.basis[0], parent.realized) == (0, -500)
+    assert (child.basis[0], child.realized) == (250, 150)
+
+
+def test_a_game_keeps_memory_of_every_day_and_shows_it_in_prompts():
+    agent = GreedyAgent()
+    engine = GameEngine(seed=6, max_days=150)
+    acted = 0
+    while not engine.is_over():
+        turn = engine.step(agent.choose_action, agent.choose_police)
+        acted += turn['action'] is not None and not turn['jailed']
+    memory = engine.state.memory
+    memory.fold()
+    assert sum(memory.samples) == acted
+    assert sum(memory.days) == 150
+    text = PromptBuilder().action_messages(engine.state, engine.prices, None)[-1]['content']
+    assert "MEMORY realized" in text and f"SEEN {engine.state.location}" in text
@@ -0,0 +1,114 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("openai")
+
+from pool import ClientPool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MESSAGES = [{"role": "system", "content": "You are playing Drug Wars."},
+            {"role": "user", "content": "What is your next action?"}]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(port, timeout=10.0):
+    """Run ``stub_server.py`` in its own process, so it can be killed like a crashed model server."""
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "stub_server.py"), "--port", str(port),
+                                "--latency", "0"], stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            if time.monotonic() > deadline:
+                process.kill()
+                raise
+            time.sleep(0.05)
+
+
+def send(pool, count):
+    """Send ``count`` completions one after another; return how many failed."""
+    failed = 0
+    for _ in range(count):
+        try:
+            pool.complete(MESSAGES, max_tokens=32)
+        except Exception:
+            failed += 1
+    return failed
+
+
+@pytest.fixture
+def servers():
+    ports = [free_port(), free_port()]
+    processes = [start_stub(port) for port in ports]
+    yield ports, processes
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+def test_failover_to_healthy_endpoint_and_recovery(servers):
+    ports, processes = servers
+    pool = ClientPool([f"http://127.0.0.1:{port}/v1" for port in ports], timeout=5.0, failure_threshold=2,
+                      reset_timeout=1.0)
+    dead, alive = pool.endpoints
+    try:
+        assert send(pool, 4) == 0
+        assert dead.requests == alive.requests == 2
+
+        processes[0].kill()
+        processes[0].wait()
+        # Least-loaded routing keeps trying the dead server until its breaker opens...
+        assert send(pool, 6) == 2
+        assert dead.breaker.state == "open"
+        assert dead.errors == 2
+        # ...and then every request goes to the live one
+        before = dead.requests, alive.requests
+        assert send(pool, 5) == 0
+        assert (dead.requests, alive.requests) == (before[0], before[1] + 5)
+
+        processes[0] = start_stub(ports[0])
+        time.sleep(dead.breaker.reset_timeout + 0.1)
+        assert dead.breaker.state == "half_open"
+        # The recovered server has served fewest requests, so it gets the half-open trial, which closes the breaker
+        assert send(pool, 1) == 0
+        assert dead.requests == before[0] + 1
+        assert dead.breaker.state == "closed"
+        assert [status['circuit'] for status in pool.status()] == ["closed", "closed"]
+        assert all(status['in_flight'] == 0 for status in pool.status())
+    finally:
+        pool.close()
+
+
+def test_half_open_trial_failure_reopens(servers):
+    ports, processes = servers
+    pool = ClientPool([f"http://127.0.0.1:{port}/v1" for port in ports], timeout=5.0, failure_threshold=1,
+                      reset_timeout=0.5)
+    dead, alive = pool.endpoints
+    try:
+        processes[0].kill()
+        processes[0].wait()
+        assert send(pool, 3) == 1
+        assert dead.breaker.state == "open"
+
+        time.sleep(dead.breaker.reset_timeout + 0.1)
+        # Still down: the trial fails and the circuit reopens without a full threshold of new failures
+        assert send(pool, 1) == 1
+        assert dead.breaker.state == "open"
+        assert send(pool, 3) == 0
+        assert dead.errors == 2
+    finally:
+        pool.close()
@@ -0,0 +1,44 @@
+import gzip
+import json
+
+import pytest
+
+from agents import GreedyAgent, RandomAgent
+from engine import GameEngine
+from recorder import TraceMismatch, TraceRecorder, read_trace, replay
+
+
+def record(path, seed, agent, max_days=60):
+    engine = GameEngine(seed=seed, max_days=max_days)
+    recorder = TraceRecorder(str(path), engine)
+    summary = engine.run(agent.choose_action, agent.choose_police)
+    recorder.close(engine)
+    return summary
+
+
+@pytest.mark.parametrize("agent", [GreedyAgent(), RandomAgent()], ids=lambda agent: agent.name)
+def test_replay_round_trip(tmp_path, agent):
+    path = tmp_path / "game.jsonl.gz"
+    summary = record(path, 5, agent)
+    assert replay(str(path)) == summary
+
+
+def test_recording_again_replaces_the_trace(tmp_path):
+    path = tmp_path / "game.jsonl.gz"
+    record(path, 1, GreedyAgent())
+    summary = record(path, 2, GreedyAgent(), max_days=30)
+    records = list(read_trace(str(path)))
+    assert [r['type'] for r in records].count("header") == 1
+    assert records[0]['seed'] == 2
+    assert replay(str(path)) == summary
+
+
+def test_tampered_trace_is_caught(tmp_path):
+    path = tmp_path / "game.jsonl.gz"
+    record(path, 3, GreedyAgent())
+    records = list(read_trace(str(path)))
+    records[10]['checksum'] = "0" * 40
+    with gzip.open(path, "wt") as f:
+        f.writelines(json.dumps(r) + "\n" for r in records)
+    with pytest.raises(TraceMismatch, match="checksum"):
+        replay(str(path))
@@ -0,0 +1,71 @@
+import pytest
+
+pytest.importorskip("jsonschema")
+
+from engine import GameEngine
+from repair import RepairError, repair_action, repair_plan
+
+
+@pytest.fixture
+def game():
+    engine = GameEngine(seed=0)
+    engine.state['cash'] = 1000
+    engine.state['inventory']['cocaine'] = 5
+    return engine
+
+
+def repair(game, data):
+    return repair_action(data, game.state, game.prices)
+
+
+def test_over_budget_buy_is_clamped_to_what_cash_allows(game):
+    price = game.prices['weed']
+    action, fixes = repair(game, {"action": "buy", "drug_type": "weed", "amount": 10 ** 6})
+    assert action == {"action": "buy", "drug_type": "weed", "amount": 1000 // price}
+    assert any("clamped" in fix for fix in fixes)
+
+
+def test_unaffordable_buy_is_rejected(game):
+    game.state['cash'] = game.prices['weed'] - 1
+    with pytest.raises(RepairError, match="Insufficient funds"):
+        repair(game, {"action": "buy", "drug_type": "weed", "amount": 1})
+
+
+def test_over_held_sell_is_clamped_to_the_stock(game):
+    action, fixes = repair(game, {"action": "sell", "drug_type": "cocaine", "amount": 50})
+    assert action == {"action": "sell", "drug_type": "cocaine", "amount": 5}
+    assert fixes == ["amount 50 clamped to 5"]
+
+
+def test_unknown_drug_is_rejected(game):
+    with pytest.raises(RepairError, match="Unknown drug_type"):
+        repair(game, {"action": "buy", "drug_type": "unobtainium", "amount": 1})
+
+
+@pytest.mark.parametrize("data, expected", [
+    ({"Action": "purchase", "drug_type": "Weed ", "amount": "$2"}, {"action": "buy", "drug_type": "weed", "amount": 2}),
+    ({"action": "sell", "drug_type": "cocaine", "amount": "all"}, {"action": "sell", "drug_type": "cocaine", "amount": 5}),
+    ({"action": "travel", "location": "staten island", "amount": 3}, {"action": "travel", "location": "Staten Island"}),
+    ([{"action": "deposit", "amount": 100.0}], {"action": "bank", "sub_action": "deposit", "amount": 100}),
+])
+def test_loosely_written_actions_are_fixed_locally(game, data, expected):
+    assert repair(game, data)[0] == expected
+
+
+@pytest.mark.parametrize("data", ["buy weed", {"action": "fly"}, {"action": "buy", "drug_type": "weed", "amount": 1.5}])
+def test_unusable_responses_are_rejected(game, data):
+    with pytest.raises(RepairError):
+        repair(game, data)
+
+
+def test_plan_drops_leading_steps_that_are_not_possible_yet(game):
+    game.state['cash'] = 0
+    plan, fixes = repair_plan({"plan": [{"action": "buy", "drug_type": "weed", "amount": 1},
+                                        {"action": "sell", "drug_type": "cocaine", "amount": 5},
+                                        {"action": "buy", "drug_type": "weed", "amount": 3}]},
+                              game.state, game.prices)
+    assert plan == [{"action": "sell", "drug_type": "cocaine", "amount": 5},
+                    {"action": "buy", "drug_type": "weed", "amount": 3}]
+    assert fixes[0].startswith("step 1 dropped")
+    with pytest.raises(RepairError, match="No step of the plan is possible now"):
+        repair_plan({"plan": [{"action": "buy", "drug_type": "weed", "amount": 1}]}, game.state, game.prices)
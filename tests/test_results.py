@@ -0,0 +1,72 @@
+import pytest
+
+from agents import GreedyAgent, RandomAgent
+from batch import run_batch, summarize as summarize_games
+from results import QUERIES, ResultsSink, summarize
+
+SEEDS = range(6)
+DAYS = 60
+
+
+@pytest.fixture(scope="module")
+def results(tmp_path_factory):
+    """A results file with one greedy and one random run, and their batch summaries."""
+    path = str(tmp_path_factory.mktemp("results") / "results.db")
+    summaries = {}
+    for agent in (GreedyAgent(), RandomAgent()):
+        sink = ResultsSink(path, agent=agent.name, batch_size=100)
+        summaries[agent.name] = run_batch(SEEDS, agent, DAYS, workers=1, chunk_size=4, results=sink)
+        sink.close()
+    return path, summaries
+
+
+def test_by_agent_matches_the_batch_summaries(results):
+    path, summaries = results
+    rows = {row['agent']: row for row in summarize(path, "agent")}
+    assert set(rows) == {"greedy", "random"}
+    for agent, games in summaries.items():
+        expected = summarize_games(games)
+        assert rows[agent]['games'] == expected['games']
+        assert rows[agent]['mean_assets'] == pytest.approx(expected['mean_assets'])
+        assert rows[agent]['min_assets'] == expected['min_assets']
+        assert rows[agent]['in_debt'] == expected['in_debt']
+
+
+@pytest.mark.parametrize("by", ["location", "day", "action"])
+def test_turn_queries_cover_every_turn(results, by):
+    path, _ = results
+    rows = summarize(path, by)
+    assert sum(row['turns'] for row in rows) == 2 * len(SEEDS) * DAYS
+    assert sum(row['turns'] for row in summarize(path, by, agent="greedy")) == len(SEEDS) * DAYS
+
+
+def test_by_day_buckets(results):
+    path, _ = results
+    assert [row['from_day'] for row in summarize(path, "day", bucket=30)] == [1, 31]
+    assert [row['from_day'] for row in summarize(path, "day", bucket=20)] == [1, 21, 41]
+
+
+def test_by_police_and_runs(results):
+    path, _ = results
+    police = summarize(path, "police", agent="greedy")
+    assert police and all(row['agent'] == "greedy" and row['police_decision'] for row in police)
+    runs = summarize(path, "runs")
+    assert sorted(row['agent'] for row in runs) == ["greedy", "random"]
+    only = summarize(path, "agent", run_id=runs[0]['run_id'])
+    assert [row['agent'] for row in only] == [runs[0]['agent']]
+
+
+def test_every_query_runs_on_an_empty_file(tmp_path):
+    path = str(tmp_path / "empty.db")
+    ResultsSink(path).close()
+    for by in QUERIES:
+        assert summarize(path, by) == []
+
+
+def test_resumed_batch_does_not_record_finished_games_again(tmp_path):
+    path, checkpoints = str(tmp_path / "results.db"), str(tmp_path / "ckpt")
+    for resume in (False, True):
+        sink = ResultsSink(path, agent="greedy")
+        run_batch(SEEDS, GreedyAgent(), DAYS, workers=1, checkpoint_dir=checkpoints, resume=resume, results=sink)
+        sink.close()
+    assert summarize(path, "agent")[0]['games'] == len(SEEDS)
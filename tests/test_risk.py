@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from agents import RiskAgent
+from batch import run_game
+from engine import GameEngine
+from risk import RiskEvaluator
+
+
+def loan_for(cash, days_left):
+    engine = GameEngine(seed=0)
+    engine.state['cash'] = cash
+    return RiskEvaluator(samples=512).loan(engine.state, engine.prices, days_left=days_left)
+
+
+def test_a_loan_the_player_could_not_cover_is_priced_with_its_late_penalties():
+    covered, uncovered = loan_for(100_000, 300), loan_for(0, 300)
+    # Same trade, but losses nobody can repay by the due date compound for the rest of the game
+    assert uncovered['p5'] < covered['p5'] * 5 < 0
+    assert uncovered['mean'] < covered['mean']
+    # A loan the game ends before is never late
+    assert loan_for(0, 10) == loan_for(100_000, 10)
+
+
+def test_risk_agent_does_not_borrow_itself_into_ruin():
+    # Scored over ten days this game took a loan it could never repay and ended $170,788 in debt
+    summary = run_game(7, RiskAgent())
+    assert summary['total_assets'] > 0
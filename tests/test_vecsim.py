@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from vecsim import LOAN, VectorSim, heuristic_policy, sweep
+
+
+def test_heuristic_policy_borrows():
+    sim = VectorSim(500, seed=0, max_days=60)
+    borrowed = 0
+    while sim.day <= sim.max_days:
+        borrowed += int((heuristic_policy(sim)["action"] == LOAN).sum())
+        sim.step(heuristic_policy, lambda sim, encountered, fines: 0)
+    assert borrowed > 0
+
+
+@pytest.mark.parametrize("param, values", [("loan_interest_rate", [0.05, 0.2]), ("max_loan_amount", [0, 5000])])
+def test_loan_sweeps_change_the_outcome(param, values):
+    low, high = sweep(param, values, n_games=2000, seed=0, max_days=60)
+    assert low["mean_assets"] != high["mean_assets"]
@@ -0,0 +1,79 @@
+import json
+import pickle
+
+import pytest
+
+from agents import GreedyAgent
+from engine import DEFAULT_WORLD, DEFAULT_WORLD_CONFIG, TRAVEL_COST, GameEngine, World, load_world
+from worlds import generate_world
+
+CONFIG = {
+    "name": "tiny",
+    "travel_cost": 40,
+    "police_rate": 7,
+    "price_floor": 5,
+    "drugs": [{"name": "tea", "base_price": 20, "volatility": 2}, {"name": "gold", "base_price": 900}],
+    "locations": [
+        {"name": "Dock", "price_modifier": 0.5, "travel_costs": {"Hill": 15}},
+        {"name": "Hill", "police_rate": 30, "drug_modifiers": {"gold": 2}},
+    ],
+}
+
+
+def test_load_world_compiles_the_config(tmp_path):
+    path = tmp_path / "tiny.json"
+    path.write_text(json.dumps(CONFIG))
+    world = load_world(str(path))
+    assert world.drugs == ("tea", "gold") and world.locations == ("Dock", "Hill")
+    assert world.volatility == (2, 10)
+    assert world.police_rates == (7, 30)
+    assert world.travel_costs == ((40, 15), (40, 40))
+    assert world.opening_prices(0) == [10, 450]
+    assert world.opening_prices(1) == [20, 1800]
+    assert world.action_schema["properties"]["drug_type"]["enum"] == ["tea", "gold"]
+
+
+def test_classic_config_is_the_default_world():
+    assert World(DEFAULT_WORLD_CONFIG).digest == DEFAULT_WORLD.digest
+    assert DEFAULT_WORLD.price_modifiers is None
+    assert set(DEFAULT_WORLD.travel_costs[0]) == {TRAVEL_COST}
+    assert World(dict(CONFIG)).digest != DEFAULT_WORLD.digest
+
+
+@pytest.mark.parametrize("change, message", [
+    ({"drugs": []}, "at least one drug"),
+    ({"locations": [{"name": "Dock"}, {"name": "Dock"}]}, "Duplicate location"),
+    ({"locations": [{"name": "Dock", "drug_modifiers": {"salt": 2}}]}, "Unknown drug 'salt'"),
+    ({"locations": [{"name": "Dock", "travel_costs": {"Moon": 5}}]}, "Unknown location 'Moon'"),
+    ({"locations": [{"name": "Dock", "price_modifier": 0}]}, "must be positive"),
+])
+def test_invalid_configs_are_rejected(change, message):
+    with pytest.raises(ValueError, match=message):
+        World(dict(CONFIG, **change))
+
+
+def test_world_pickles_as_its_config():
+    world = World(CONFIG)
+    copy = pickle.loads(pickle.dumps(world))
+    assert copy.digest == world.digest and copy.travel_costs == world.travel_costs
+
+
+def test_travel_uses_the_worlds_fares_and_reprices():
+    engine = GameEngine(seed=0, world=World(CONFIG))
+    engine.state.location = "Dock"
+    engine.prices.values_[:] = [10, 450]
+    cash = engine.state.cash
+    engine.process_action({"action": "travel", "location": "Hill"})
+    assert engine.state.location == "Hill"
+    assert engine.state.cash == cash - 15
+    assert engine.prices.to_dict() == {"tea": 20, "gold": 1800}
+
+
+def test_generated_worlds_play_reproducibly():
+    world = World(generate_world(200, 20, seed=3))
+    assert len(world.drugs) == 200 and len(world.locations) == 20
+    agent = GreedyAgent()
+    games = [GameEngine(seed=1, max_days=60, world=world) for _ in range(2)]
+    for engine in games:
+        engine.run(agent.choose_action, agent.choose_police)
+    assert games[0].checksum() == games[1].checksum()
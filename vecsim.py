@@ -0,0 +1,283 @@
+import argparse
+import json
+
+import numpy as np
+
+from engine import (
+    DRUG_TYPES, LOCATIONS, MAX_DAYS, MAX_SAFE_TURNS, MAX_LOAN_AMOUNT, LOAN_DURATION,
+    LOAN_INTEREST_RATE, TRAVEL_COST, BRIBE_AMOUNT
+)
+
+DRUGS = list(DRUG_TYPES)
+BASE_PRICES = np.array([info["base_price"] for info in DRUG_TYPES.values()], dtype=np.int64)
+
+# Action codes, mirroring the action/sub_action pairs of action_schema
+WAIT, BUY, SELL, TRAVEL, LOAN, REPAY, DEPOSIT, WITHDRAW, QUIT = range(9)
+
+# Police option codes, in the order of engine.POLICE_OPTIONS
+PAY_FINE, LOSE_INVENTORY, GO_TO_JAIL, BRIBE = range(4)
+
+
+class Economy:
+    """Tunable economy constants; defaults match the single-game engine."""
+
+    def __init__(self, loan_interest_rate=LOAN_INTEREST_RATE, max_loan_amount=MAX_LOAN_AMOUNT,
+                 loan_duration=LOAN_DURATION, loan_penalty=0.5, price_floor=10, price_step=10,
+                 police_chance=0.05, max_safe_turns=MAX_SAFE_TURNS, fine_range=(100, 500),
+                 travel_cost=TRAVEL_COST, bribe_amount=BRIBE_AMOUNT, starting_cash=1000):
+        self.loan_interest_rate = loan_interest_rate
+        self.max_loan_amount = max_loan_amount
+        self.loan_duration = loan_duration
+        self.loan_penalty = loan_penalty
+        self.price_floor = price_floor
+        self.price_step = price_step
+        self.police_chance = police_chance
+        self.max_safe_turns = max_safe_turns
+        self.fine_range = fine_range
+        self.travel_cost = travel_cost
+        self.bribe_amount = bribe_amount
+        self.starting_cash = starting_cash
+
+
+class VectorSim:
+    """Many independent games stepped together as (games x drugs) arrays.
+
+    A policy is called once per tick as ``policy(sim)`` and returns a dict of
+    per-game arrays: ``action`` (action codes), ``drug`` (drug index),
+    ``amount`` and ``location`` (location index). A police policy is called as
+    ``police_policy(sim, encountered, fines)`` and returns option codes.
+    """
+
+    def __init__(self, n_games, seed=None, economy=None, max_days=MAX_DAYS):
+        self.n = n_games
+        self.economy = economy or Economy()
+        self.max_days = max_days
+        self.rng = np.random.default_rng(seed)
+        self.day = 1
+        self.cash = np.full(n_games, self.economy.starting_cash, dtype=np.int64)
+        self.debt = np.zeros(n_games, dtype=np.int64)
+        self.bank = np.zeros(n_games, dtype=np.int64)
+        self.loan_due = np.zeros(n_games, dtype=np.int64)  # 0 means no loan
+        self.inventory = np.zeros((n_games, len(DRUGS)), dtype=np.int64)
+        self.location = self.rng.integers(0, len(LOCATIONS), n_games)
+        self.jail = np.zeros(n_games, dtype=np.int64)
+        self.turns_in_location = np.zeros(n_games, dtype=np.int64)
+        self.prices = np.tile(BASE_PRICES, (n_games, 1))
+        self.done = np.zeros(n_games, dtype=bool)
+        self.rows = np.arange(n_games)
+
+    def update_prices(self, mask):
+        """Apply one random fluctuation to the prices of every game in ``mask``."""
+        eco = self.economy
+        fluctuation = self.rng.integers(-eco.price_step, eco.price_step + 1, self.prices.shape)
+        updated = np.maximum(eco.price_floor, self.prices + fluctuation)
+        self.prices = np.where(mask[:, None], updated, self.prices)
+
+    # Hooks for worlds where games share state; in independent games they are constants
+    def police_chance(self):
+        """Chance of an encounter for each game past MAX_SAFE_TURNS (scalar or per game)."""
+        return self.economy.police_chance
+
+    def travel_cost(self, destination):
+        """Fare to ``destination`` for each game (scalar or per game)."""
+        return self.economy.travel_cost
+
+    def clearing_prices(self, drug, trade, posted):
+        """Price each game's trade fills at, given every game's drug and signed quantity (buys positive)."""
+        return posted
+
+    def update_loan_status(self, mask):
+        """Add the late penalty to every overdue loan and extend its due date."""
+        eco = self.economy
+        overdue = mask & (self.loan_due > 0) & (self.day >= self.loan_due)
+        penalty = (self.debt * eco.loan_penalty).astype(np.int64)
+        self.debt += np.where(overdue, penalty, 0)
+        self.loan_due += np.where(overdue, eco.loan_duration, 0)
+        return overdue
+
+    def law_enforcement(self, police_policy, mask):
+        """Roll encounters for games past MAX_SAFE_TURNS and apply the chosen options."""
+        eco = self.economy
+        self.turns_in_location += mask
+        at_risk = mask & (self.turns_in_location > eco.max_safe_turns)
+        hit = at_risk & (self.rng.random(self.n) < self.police_chance())
+        if not hit.any():
+            return hit
+        fines = self.rng.integers(eco.fine_range[0], eco.fine_range[1] + 1, self.n)
+        decision = np.where(hit, police_policy(self, hit, fines), -1)
+
+        has_inventory = self.inventory.sum(axis=1) > 0
+        lose = (decision == LOSE_INVENTORY) & has_inventory
+        fined = (decision == PAY_FINE) | ((decision == LOSE_INVENTORY) & ~has_inventory)
+        self.cash = np.where(fined, np.maximum(0, self.cash - fines), self.cash)
+
+        # Lose all of one random held drug: the largest random key among held drugs
+        if lose.any():
+            keys = self.rng.random(self.inventory.shape) * (self.inventory > 0)
+            lost_drug = keys.argmax(axis=1)
+            self.inventory[self.rows[lose], lost_drug[lose]] = 0
+
+        jailed = decision == GO_TO_JAIL
+        self.jail = np.where(jailed, self.rng.integers(1, 3, self.n), self.jail)
+
+        bribing = decision == BRIBE
+        paid = bribing & (self.cash >= eco.bribe_amount)
+        self.cash -= np.where(paid, eco.bribe_amount, 0)
+        self.jail = np.where(bribing & ~paid, 1, self.jail)
+        return hit
+
+    def apply_actions(self, acts, mask):
+        """Apply one action per game for every game in ``mask``."""
+        eco = self.economy
+        kind = np.where(mask, acts["action"], WAIT)
+        drug = np.clip(acts.get("drug", 0), 0, len(DRUGS) - 1) * np.ones(self.n, dtype=np.int64)
+        amount = np.asarray(acts.get("amount", 0)) * np.ones(self.n, dtype=np.int64)
+        destination = np.asarray(acts.get("location", 0)) * np.ones(self.n, dtype=np.int64)
+        valid_amount = amount >= 1
+        price = self.prices[self.rows, drug]
+        held = self.inventory[self.rows, drug]
+
+        buy = (kind == BUY) & valid_amount & (self.cash >= price * amount)
+        sell = (kind == SELL) & valid_amount & (held >= amount)
+        trade = np.where(buy, amount, 0) - np.where(sell, amount, 0)
+        price = self.clearing_prices(drug, trade, price)
+        # A buy whose clearing price came out above the posted one fills as far as the cash goes
+        trade = np.where(trade > 0, np.minimum(trade, self.cash // price), trade)
+        self.cash -= trade * price
+        self.inventory[self.rows, drug] += trade
+
+        travelling = kind == TRAVEL
+        self.turns_in_location = np.where(travelling, 0, self.turns_in_location)
+        fare = self.travel_cost(destination)
+        moved = travelling & (destination != self.location) & (self.cash >= fare)
+        self.cash -= np.where(moved, fare, 0)
+        self.location = np.where(moved, destination, self.location)
+
+        loan = (kind == LOAN) & valid_amount & (amount <= eco.max_loan_amount) & (self.debt == 0)
+        self.cash += np.where(loan, amount, 0)
+        self.debt = np.where(loan, amount, self.debt)
+        self.loan_due = np.where(loan, self.day + eco.loan_duration, self.loan_due)
+
+        repay = (kind == REPAY) & valid_amount
+        total_due = self.debt + (self.debt * eco.loan_interest_rate).astype(np.int64)
+        repayment = np.where(repay, np.minimum(np.minimum(amount, total_due), self.cash), 0)
+        self.debt -= repayment
+        self.cash -= repayment
+        cleared = repay & (self.debt <= 0)
+        self.debt = np.where(cleared, 0, self.debt)
+        self.loan_due = np.where(cleared, 0, self.loan_due)
+
+        deposit = (kind == DEPOSIT) & valid_amount & (amount <= self.cash)
+        withdraw = (kind == WITHDRAW) & valid_amount & (amount <= self.bank)
+        moved_to_bank = np.where(deposit, amount, 0) - np.where(withdraw, amount, 0)
+        self.cash -= moved_to_bank
+        self.bank += moved_to_bank
+
+        self.done |= kind == QUIT
+
+    def step(self, policy, police_policy):
+        """Advance every unfinished game by one day."""
+        active = ~self.done
+        self.update_loan_status(active)
+        self.law_enforcement(police_policy, active)
+
+        # Jailed games lose the day without acting or moving prices
+        jailed = active & (self.jail > 0)
+        self.jail -= jailed
+        acting = active & ~jailed
+        self.apply_actions(policy(self), acting)
+        self.update_prices(acting & ~self.done)
+        self.day += 1
+
+    def run(self, policy, police_policy):
+        while self.day <= self.max_days and not self.done.all():
+            self.step(policy, police_policy)
+        return self.total_assets()
+
+    def total_assets(self):
+        return self.cash + self.bank + (self.inventory * self.prices).sum(axis=1) - self.debt
+
+
+def heuristic_policy(sim):
+    """Scripted trader: move on before the police notice, sell high, buy low.
+
+    When a bargain is on offer and cash is short it borrows the maximum, if
+    the loan falls due before the game ends, and repays once it can cover
+    the interest and has no bargain to spend on, or the due date is close.
+    """
+    eco = sim.economy
+    ratio = sim.prices / BASE_PRICES
+    held = sim.inventory > 0
+
+    best_sell = np.where(held, ratio, -np.inf).argmax(axis=1)
+    sell_ratio = ratio[sim.rows, best_sell]
+    best_buy = ratio.argmin(axis=1)
+    buy_price = sim.prices[sim.rows, best_buy]
+    affordable = sim.cash // buy_price
+    bargain = ratio[sim.rows, best_buy] <= 0.9
+    total_due = sim.debt + (sim.debt * eco.loan_interest_rate).astype(np.int64)
+    due_soon = sim.day >= sim.loan_due - 2
+
+    conditions = [
+        (sim.debt > 0) & (((sim.cash >= total_due) & (~bargain | due_soon))
+                          | (due_soon & ~held.any(axis=1) & (sim.cash >= 1))),
+        held.any(axis=1) & ((sell_ratio >= 1.1) | ((sim.debt > 0) & due_soon)),
+        (sim.turns_in_location >= eco.max_safe_turns) & (sim.cash >= eco.travel_cost),
+        bargain & (sim.debt == 0) & (sim.cash >= 1) & (sim.cash < eco.max_loan_amount)
+        & (sim.day + eco.loan_duration <= sim.max_days),
+        bargain & (affordable >= 1),
+    ]
+    action = np.select(conditions, [REPAY, SELL, TRAVEL, LOAN, BUY], WAIT)
+    drug = np.where(action == SELL, best_sell, best_buy)
+    amount = np.select(
+        [action == REPAY, action == SELL, action == LOAN, action == BUY],
+        [total_due, sim.inventory[sim.rows, best_sell], np.minimum(eco.max_loan_amount, sim.cash), affordable], 0)
+    location = (sim.location + 1) % len(LOCATIONS)
+    return {"action": action, "drug": drug, "amount": amount, "location": location}
+
+
+def cheapest_police_option(sim, encountered, fines):
+    """Bribe when it is cheaper than the fine and affordable, otherwise pay the fine."""
+    eco = sim.economy
+    return np.where((sim.cash >= eco.bribe_amount) & (eco.bribe_amount < fines), BRIBE, PAY_FINE)
+
+
+def sweep(param, values, n_games=10000, seed=0, max_days=MAX_DAYS,
+          policy=heuristic_policy, police_policy=cheapest_police_option):
+    """Monte Carlo sweep of one Economy parameter; returns final-asset stats per value."""
+    results = []
+    for value in values:
+        sim = VectorSim(n_games, seed=seed, economy=Economy(**{param: value}), max_days=max_days)
+        assets = sim.run(policy, police_policy)
+        results.append({
+            param: value,
+            "mean_assets": float(assets.mean()),
+            "p10_assets": float(np.percentile(assets, 10)),
+            "median_assets": float(np.median(assets)),
+            "p90_assets": float(np.percentile(assets, 90)),
+            "in_debt": int((sim.debt > 0).sum())
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized Monte Carlo runs of the Drug Wars economy.")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=MAX_DAYS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sweep", help="Economy parameter sweep, e.g. loan_interest_rate=0.05,0.1,0.2")
+    args = parser.parse_args()
+
+    if args.sweep:
+        param, values = args.sweep.split("=", 1)
+        values = [float(v) if "." in v else int(v) for v in values.split(",")]
+        print(json.dumps(sweep(param, values, args.games, args.seed, args.days), indent=2))
+    else:
+        sim = VectorSim(args.games, seed=args.seed, max_days=args.days)
+        assets = sim.run(heuristic_policy, cheapest_police_option)
+        print(json.dumps({"games": args.games, "mean_assets": float(assets.mean()),
+                          "median_assets": float(np.median(assets))}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
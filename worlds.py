@@ -0,0 +1,48 @@
+import argparse
+import json
+import random
+
+from engine import DEFAULT_WORLD_CONFIG, World
+
+
+def generate_world(drugs, locations, seed=0, spread=0.3, police_range=(2, 10)):
+    """A random world config with ``drugs`` drugs and ``locations`` boroughs, for scale tests.
+
+    Base prices are log-uniform between $10 and $20000, each drug's daily
+    volatility is about 1% of its price, every borough scales prices by a
+    factor within ``spread`` and has its own police rate, and fares grow
+    with the distance between boroughs on a ring.
+    """
+    rng = random.Random(seed)
+    catalog = []
+    for i in range(drugs):
+        price = int(10 * 2000 ** rng.random())
+        catalog.append({"name": f"drug{i}", "base_price": price, "volatility": max(1, price // 100)})
+    names = [f"Borough {i}" for i in range(locations)]
+    places = []
+    for i, name in enumerate(names):
+        fares = {other: 50 * min(abs(i - j), locations - abs(i - j)) for j, other in enumerate(names) if j != i}
+        places.append({"name": name, "police_rate": rng.randint(*police_range),
+                       "price_modifier": round(1 + rng.uniform(-spread, spread), 3), "travel_costs": fares})
+    return {"name": f"generated-{drugs}x{locations}-{seed}", "drugs": catalog, "locations": places}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a Drug Wars world config as JSON.")
+    parser.add_argument("--drugs", type=int, help="Generate a random world with this many drugs")
+    parser.add_argument("--locations", type=int, default=10, help="Boroughs in a generated world")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", metavar="PATH", help="Write here instead of to stdout")
+    args = parser.parse_args()
+    config = generate_world(args.drugs, args.locations, args.seed) if args.drugs else DEFAULT_WORLD_CONFIG
+    World(config)  # Fail here rather than in the game if the config is invalid
+    text = json.dumps(config, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()